@@ -0,0 +1,108 @@
+"""Compares memory use and build time of the default and compact response classes.
+
+Run with ``python -m benchmarks.compact_responses`` from the repository root.
+"""
+
+import datetime
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Tuple
+
+from bson.objectid import ObjectId
+
+from pyproven.compact import (
+    CompactDocumentHistoryResponse,
+    CompactGetDocumentProofResponse,
+)
+from pyproven.history import DocumentHistoryResponse
+from pyproven.proofs import GetDocumentProofResponse
+
+
+def doc_history_document(n_documents: int, n_versions: int) -> Dict[str, Any]:
+    started = datetime.datetime(2021, 1, 1)
+    return {
+        "ok": 1,
+        "collection": "benchmark",
+        "history": [
+            {
+                "_id": ObjectId(),
+                "versions": [
+                    {
+                        "minVersion": version,
+                        "maxVersion": version + 1,
+                        "status": "Ended",
+                        "started": started,
+                        "ended": started,
+                        "document": {"_id": i, "x": version},
+                    }
+                    for version in range(n_versions)
+                ],
+            }
+            for i in range(n_documents)
+        ],
+    }
+
+
+def document_proof_document(n_proofs: int) -> Dict[str, Any]:
+    return {
+        "ok": 1,
+        "proofs": [
+            {
+                "collection": "benchmark",
+                "scope": "document",
+                "ProvenDbId": str(ObjectId()),
+                "documentId": str(i),
+                "version": 10,
+                "status": "Valid",
+                "btcTransaction": "ab" * 32,
+                "btcBlockNumber": "600000",
+                "versionProofId": "proof",
+                "documentHash": "cd" * 32,
+                "versionHash": "ef" * 32,
+                "proof": {"hash": "cd" * 32, "branches": []},
+            }
+            for i in range(n_proofs)
+        ],
+    }
+
+
+def measure(factory: Callable[[], Dict[str, Any]], cls: type) -> Tuple[float, int]:
+    """Returns the build time in seconds and the bytes allocated by the built response."""
+    document = factory()
+    tracemalloc.start()
+    started = time.perf_counter()
+    response = cls(document)
+    elapsed = time.perf_counter() - started
+    del document
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del response
+    return elapsed, current
+
+
+def main() -> None:
+    cases: List[Tuple[str, Callable[[], Dict[str, Any]], type, type]] = [
+        (
+            "docHistory 10 x 5000",
+            lambda: doc_history_document(10, 5000),
+            DocumentHistoryResponse,
+            CompactDocumentHistoryResponse,
+        ),
+        (
+            "getDocumentProof 20000",
+            lambda: document_proof_document(20000),
+            GetDocumentProofResponse,
+            CompactGetDocumentProofResponse,
+        ),
+    ]
+    print(f"{'case':<26}{'class':<10}{'build ms':>10}{'MiB':>10}")
+    for name, factory, default, compact in cases:
+        for label, cls in (("default", default), ("compact", compact)):
+            elapsed, allocated = measure(factory, cls)
+            print(
+                f"{name:<26}{label:<10}{elapsed * 1000:>10.1f}{allocated / 2 ** 20:>10.2f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+"""Deterministic fixtures shaped like real ProvenDB responses, for the replay benchmarks.
+
+A recorded fixture in ``benchmarks/fixtures/<case>.bson`` takes precedence over the synthetic one,
+see :mod:`benchmarks.replay`.
+"""
+
+import datetime
+import hashlib
+import json
+import os
+import zlib
+from typing import Any, Dict, List
+
+from bson import BSON
+from bson.objectid import ObjectId
+
+from benchmarks.replay import Recordings, load_recordings
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+
+_STARTED = datetime.datetime(2021, 1, 1)
+
+
+def _hash(*parts: Any) -> str:
+    return hashlib.sha256(repr(parts).encode()).hexdigest()
+
+
+def _object_id(i: int) -> ObjectId:
+    return ObjectId(i.to_bytes(12, "big"))
+
+
+def doc_history(n_documents: int, n_versions: int) -> Dict[str, Any]:
+    return {
+        "ok": 1,
+        "collection": "benchmark",
+        "history": [
+            {
+                "_id": _object_id(i),
+                "versions": [
+                    {
+                        "minVersion": version,
+                        "maxVersion": version + 1,
+                        "status": "Ended",
+                        "started": _STARTED + datetime.timedelta(seconds=version),
+                        "ended": _STARTED + datetime.timedelta(seconds=version + 1),
+                        "document": {
+                            "_id": _object_id(i),
+                            "name": f"document {i}",
+                            "x": version,
+                        },
+                    }
+                    for version in range(n_versions)
+                ],
+            }
+            for i in range(n_documents)
+        ],
+    }
+
+
+def receipt(seed: Any, depth: int = 12) -> Dict[str, Any]:
+    """Builds a chainpoint style receipt with a realistic number of operations."""
+    ops: List[Dict[str, Any]] = []
+    for level in range(depth):
+        ops.append({"l" if level % 2 else "r": _hash(seed, level)})
+        ops.append({"op": "sha-256"})
+    return {
+        "@context": "https://w3id.org/chainpoint/v3",
+        "type": "Chainpoint",
+        "hash": _hash(seed),
+        "hash_id_node": str(seed),
+        "hash_submitted_node_at": "2021-01-01T00:00:00Z",
+        "branches": [
+            {
+                "label": "cal_anchor_branch",
+                "ops": ops
+                + [{"anchors": [{"type": "cal", "anchor_id": "1000", "uris": []}]}],
+                "branches": [
+                    {
+                        "label": "btc_anchor_branch",
+                        "ops": ops + [{"op": "sha-256-x2"}],
+                    }
+                ],
+            }
+        ],
+    }
+
+
+def binary_receipt(seed: Any) -> bytes:
+    """Stands in for a binary proof: a compressed receipt of similar size."""
+    return zlib.compress(json.dumps(receipt(seed)).encode())
+
+
+def document_proofs(n_proofs: int) -> Dict[str, Any]:
+    return {
+        "ok": 1,
+        "proofs": [
+            {
+                "collection": "benchmark",
+                "scope": "document",
+                "ProvenDbId": str(_object_id(i)),
+                "documentId": str(_object_id(i)),
+                "version": 10,
+                "status": "Valid",
+                "btcTransaction": _hash("tx"),
+                "btcBlockNumber": "600000",
+                "versionProofId": "proof",
+                "documentHash": _hash("document", i),
+                "versionHash": _hash("version", 10),
+                "proof": receipt(i),
+            }
+            for i in range(n_proofs)
+        ],
+    }
+
+
+def list_versions(n_versions: int) -> Dict[str, Any]:
+    return {
+        "ok": 1,
+        "versions": [
+            {
+                "version": version,
+                "status": "Ended",
+                "effectiveDate": _STARTED + datetime.timedelta(seconds=version),
+            }
+            for version in range(n_versions)
+        ],
+    }
+
+
+def version_proof(binary: bool) -> Dict[str, Any]:
+    return {
+        "ok": 1,
+        "proofs": [
+            {
+                "_id": _object_id(1),
+                "proofId": "proof",
+                "version": 10,
+                "status": "Valid",
+                "hash": _hash("version", 10),
+                "proof": binary_receipt(10) if binary else receipt(10),
+            }
+        ],
+    }
+
+
+#: Synthetic response of each benchmark case, keyed by case name then command name.
+SYNTHETIC = {
+    "docHistory_small": lambda: {"docHistory": doc_history(10, 5)},
+    "docHistory_huge": lambda: {"docHistory": doc_history(10, 5000)},
+    "getDocumentProof_5000": lambda: {"getDocumentProof": document_proofs(5000)},
+    "listVersions_1000": lambda: {"listVersions": list_versions(1000)},
+    "getProof_json": lambda: {"getProof": version_proof(False)},
+    "getProof_binary": lambda: {"getProof": version_proof(True)},
+}
+
+
+def load_case(case: str) -> Recordings:
+    """Returns the recorded responses of a case, or its synthetic responses if none were recorded."""
+    path = os.path.join(FIXTURES_DIR, f"{case}.bson")
+    if os.path.exists(path):
+        return load_recordings(path)
+    return {name: BSON.encode(document) for name, document in SYNTHETIC[case]().items()}
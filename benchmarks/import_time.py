@@ -0,0 +1,117 @@
+"""Measures the cold import time of pyproven entry points, each in a fresh interpreter.
+
+Run with ``python -m benchmarks.import_time`` from the repository root. Results are written to
+``benchmarks/results/import-<label>.json``, and can be compared with an earlier run:
+
+.. code-block:: bash
+
+    python -m benchmarks.import_time --label dev --baseline benchmarks/results/import-1.1.0.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Tuple
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (case, import statement)
+CASES: List[Tuple[str, str]] = [
+    ("import_pyproven", "import pyproven"),
+    ("ProvenDB", "from pyproven import ProvenDB"),
+    ("AsyncProvenDB", "from pyproven import AsyncProvenDB"),
+    ("MemoryProofCache", "from pyproven import MemoryProofCache"),
+    ("ProvenDB_hack", "from pyproven.provendb_hack import install"),
+]
+
+# run in the child interpreter: time the statement and count the modules it loaded.
+_PROBE = """
+import json, sys, time
+before = set(sys.modules)
+started = time.perf_counter()
+{statement}
+seconds = time.perf_counter() - started
+loaded = set(sys.modules) - before
+print(json.dumps({{"seconds": seconds, "modules": len(loaded),
+                  "pymongo": "pymongo" in loaded, "asyncio": "asyncio" in loaded}}))
+"""
+
+
+def measure(statement: str, repeat: int) -> Dict[str, Any]:
+    """Returns the median import time of a statement over ``repeat`` fresh interpreters."""
+    env = dict(os.environ, PYTHONPATH=ROOT_DIR, PYTHONDONTWRITEBYTECODE="1")
+    samples = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, "-c", _PROBE.format(statement=statement)],
+            check=True,
+            capture_output=True,
+            env=env,
+            text=True,
+        ).stdout
+        samples.append(json.loads(output))
+    return {
+        "import_ms": statistics.median(sample["seconds"] for sample in samples) * 1e3,
+        "modules": samples[-1]["modules"],
+        "pymongo": samples[-1]["pymongo"],
+        "asyncio": samples[-1]["asyncio"],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--label", default=datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    )
+    parser.add_argument("--repeat", type=int, default=15)
+    parser.add_argument(
+        "--baseline", help="results file of an earlier run to compare with"
+    )
+    parser.add_argument("--threshold", type=float, default=1.25)
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {
+        "label": args.label,
+        "created": datetime.datetime.now().isoformat(),
+        "python": sys.version.split()[0],
+        "cases": {},
+    }
+    print(f"{'case':<20}{'import ms':>11}{'modules':>9}{'pymongo':>9}{'asyncio':>9}")
+    for case, statement in CASES:
+        metrics = measure(statement, args.repeat)
+        results["cases"][case] = metrics
+        print(
+            f"{case:<20}{metrics['import_ms']:>11.1f}{metrics['modules']:>9}"
+            f"{str(metrics['pymongo']):>9}{str(metrics['asyncio']):>9}"
+        )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"import-{args.label}.json")
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        regressions = [
+            f"{case}: {previous['import_ms']:.1f} -> {results['cases'][case]['import_ms']:.1f} ms"
+            for case, previous in baseline["cases"].items()
+            if case in results["cases"]
+            and results["cases"][case]["import_ms"]
+            > previous["import_ms"] * args.threshold
+        ]
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,137 @@
+"""Replay transport that answers ProvenDB commands from recorded responses, without a network.
+
+Responses are stored as raw BSON, and decoded on every call with the codec options requested,
+as pymongo does, so benchmarks over a :class:`ReplayDatabase` measure pyproven's own cost.
+Real responses can be recorded from a live ProvenDB with :class:`RecordingDatabase`:
+
+.. code-block:: python
+
+    recorder = RecordingDatabase(MongoClient(uri)[database])
+    ProvenDB(recorder).doc_history("collection", {})
+    save_recordings("benchmarks/fixtures/docHistory_small.bson", recorder.recordings)
+"""
+
+import time
+from typing import Any, Dict, Mapping, Optional, Union
+
+import bson
+from bson import BSON
+from bson.codec_options import DEFAULT_CODEC_OPTIONS, CodecOptions
+from bson.raw_bson import RawBSONDocument
+from bson.son import SON
+
+from pyproven.retry import command_name
+
+#: Raw BSON responses keyed by command name.
+Recordings = Dict[str, bytes]
+
+
+def _command_document(
+    command: Union[str, Mapping[str, Any]], value: Any, kwargs: Mapping[str, Any]
+) -> SON:
+    """Builds the command document the way :meth:`pymongo.database.Database.command` does."""
+    if isinstance(command, str):
+        document = SON([(command, value)])
+    else:
+        document = SON(command)
+    for key, option in kwargs.items():
+        if key not in ("codec_options", "read_preference", "session"):
+            document[key] = option
+    return document
+
+
+class ReplayDatabase:
+    """Stands in for a pymongo Database, answering each command with its recorded response.
+
+    :param recordings: Raw BSON responses keyed by command name.
+    :type recordings: Recordings
+    :param codec_options: Default codec options used to decode responses.
+    :type codec_options: CodecOptions, optional
+    """
+
+    def __init__(
+        self,
+        recordings: Recordings,
+        codec_options: CodecOptions = DEFAULT_CODEC_OPTIONS,
+    ):
+        self.recordings: Recordings = recordings
+        self.codec_options: CodecOptions = codec_options
+        #: Cumulative seconds spent encoding commands and decoding responses.
+        self.encode_seconds: float = 0.0
+        self.decode_seconds: float = 0.0
+        self.calls: int = 0
+
+    def command(
+        self,
+        command: Union[str, Mapping[str, Any]],
+        value: Any = 1,
+        codec_options: Optional[CodecOptions] = None,
+        **kwargs: Any,
+    ) -> Any:
+        started = time.perf_counter()
+        BSON.encode(_command_document(command, value, kwargs))
+        encoded = time.perf_counter()
+        response = bson.decode(
+            self.recordings[command_name(command)],
+            codec_options or self.codec_options,
+        )
+        self.encode_seconds += encoded - started
+        self.decode_seconds += time.perf_counter() - encoded
+        self.calls += 1
+        return response
+
+    def __getitem__(self, name: str) -> Any:
+        raise KeyError(f"ReplayDatabase only replays commands, not collection {name}.")
+
+
+class RecordingDatabase:
+    """Wraps a pymongo Database and records the raw response of every command it runs.
+
+    :param database: The database to record.
+    :type database: pymongo.database.Database
+    """
+
+    def __init__(self, database: Any):
+        self.db: Any = database
+        self.recordings: Recordings = {}
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.db, name)
+
+    def __getitem__(self, name: str) -> Any:
+        return self.db[name]
+
+    def command(
+        self,
+        command: Union[str, Mapping[str, Any]],
+        value: Any = 1,
+        codec_options: Optional[CodecOptions] = None,
+        **kwargs: Any,
+    ) -> Any:
+        raw = self.db.command(
+            command,
+            value,
+            codec_options=self.db.codec_options.with_options(
+                document_class=RawBSONDocument
+            ),
+            **kwargs,
+        )
+        self.recordings[command_name(command)] = raw.raw
+        return bson.decode(raw.raw, codec_options or self.db.codec_options)
+
+
+def save_recordings(path: str, recordings: Recordings) -> None:
+    """Writes recordings to a file of concatenated {'command', 'response'} BSON documents."""
+    with open(path, "wb") as file:
+        for name, raw in recordings.items():
+            file.write(BSON.encode({"command": name, "response": RawBSONDocument(raw)}))
+
+
+def load_recordings(path: str) -> Recordings:
+    """Reads recordings written by :func:`save_recordings`."""
+    options = CodecOptions(document_class=RawBSONDocument)
+    with open(path, "rb") as file:
+        return {
+            document["command"]: document["response"].raw
+            for document in bson.decode_file_iter(file, options)
+        }
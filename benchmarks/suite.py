@@ -0,0 +1,208 @@
+"""Offline micro-benchmarks of pyproven over replayed ProvenDB responses.
+
+For each case this measures command encoding, response class construction, the memory peak of a call
+and the end-to-end time of the ProvenDB method, along with its overhead over decoding the response.
+Results are written to ``benchmarks/results/<label>.json`` and can be compared with an earlier run:
+
+.. code-block:: bash
+
+    python -m benchmarks.suite --label 1.1.0
+    python -m benchmarks.suite --label dev --baseline benchmarks/results/1.1.0.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import bson
+import pymongo
+
+from benchmarks.fixtures import load_case
+from benchmarks.replay import ReplayDatabase
+from pyproven import ProvenDB
+from pyproven.compact import CompactDocumentHistoryResponse
+from pyproven.history import DocumentHistoryResponse
+from pyproven.proofs import GetDocumentProofResponse, GetVersionProofResponse
+from pyproven.versions import ListVersionsResponse
+
+RESULTS_DIR = os.path.join(os.path.dirname(__file__), "results")
+
+#: Metrics where a higher value in the new run is a regression.
+COMPARED_METRICS = ("encode_us", "construct_ms", "call_ms", "overhead_ms", "peak_mib")
+
+# (case, fixture, ProvenDB method call, response class)
+CASES: List[Tuple[str, str, Callable[[ProvenDB], Any], Callable[[Any], Any]]] = [
+    (
+        "docHistory_small",
+        "docHistory_small",
+        lambda pdb: pdb.doc_history("benchmark", {}),
+        DocumentHistoryResponse,
+    ),
+    (
+        "docHistory_huge",
+        "docHistory_huge",
+        lambda pdb: pdb.doc_history("benchmark", {}),
+        DocumentHistoryResponse,
+    ),
+    (
+        "docHistory_huge_compact",
+        "docHistory_huge",
+        lambda pdb: pdb.doc_history("benchmark", {}, compact=True),
+        CompactDocumentHistoryResponse,
+    ),
+    (
+        "getDocumentProof_5000",
+        "getDocumentProof_5000",
+        lambda pdb: pdb.get_document_proof("benchmark", {}, 10),
+        GetDocumentProofResponse,
+    ),
+    (
+        "listVersions_1000",
+        "listVersions_1000",
+        lambda pdb: pdb.list_versions(limit=1000),
+        ListVersionsResponse,
+    ),
+    (
+        "getProof_json",
+        "getProof_json",
+        lambda pdb: pdb.get_version_proof("proof", proof_format="json"),
+        GetVersionProofResponse,
+    ),
+    (
+        "getProof_binary",
+        "getProof_binary",
+        lambda pdb: pdb.get_version_proof("proof", proof_format="binary"),
+        GetVersionProofResponse,
+    ),
+]
+
+
+def _median_seconds(function: Callable[[], Any], repeat: int) -> float:
+    """Returns the median time of a call, looping fast calls so each sample takes at least 10ms."""
+    started = time.perf_counter()
+    function()
+    loops = max(1, int(0.01 / max(time.perf_counter() - started, 1e-9)))
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for _ in range(loops):
+            function()
+        timings.append((time.perf_counter() - started) / loops)
+    return statistics.median(timings)
+
+
+def run_case(
+    fixture: str,
+    call: Callable[[ProvenDB], Any],
+    response_class: Callable[[Any], Any],
+    repeat: int,
+) -> Dict[str, float]:
+    recordings = load_case(fixture)
+    database = ReplayDatabase(recordings)
+    pdb = ProvenDB(database)
+
+    call(pdb)
+    database.encode_seconds = database.decode_seconds = 0.0
+    database.calls = 0
+    call_seconds = _median_seconds(lambda: call(pdb), repeat)
+    encode_seconds = database.encode_seconds / database.calls
+    decode_seconds = database.decode_seconds / database.calls
+
+    (raw,) = recordings.values()
+    document = bson.decode(raw)
+    construct_seconds = _median_seconds(lambda: response_class(document), repeat)
+
+    tracemalloc.start()
+    call(pdb)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return {
+        "response_kib": len(raw) / 1024,
+        "encode_us": encode_seconds * 1e6,
+        "construct_ms": construct_seconds * 1e3,
+        "call_ms": call_seconds * 1e3,
+        "overhead_ms": (call_seconds - decode_seconds) * 1e3,
+        "peak_mib": peak / 2**20,
+    }
+
+
+def compare(
+    results: Dict[str, Any], baseline: Dict[str, Any], threshold: float
+) -> List[str]:
+    """Returns a description of every metric that regressed by more than ``threshold``."""
+    regressions = []
+    for case, metrics in results["cases"].items():
+        previous = baseline["cases"].get(case)
+        if previous is None:
+            continue
+        for metric in COMPARED_METRICS:
+            if previous.get(metric) and metrics[metric] > previous[metric] * threshold:
+                regressions.append(
+                    f"{case} {metric}: {previous[metric]:.3f} -> {metrics[metric]:.3f}"
+                    f" ({metrics[metric] / previous[metric]:.2f}x)"
+                )
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--label", default=datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
+    )
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument(
+        "--baseline", help="results file of an earlier run to compare with"
+    )
+    parser.add_argument("--threshold", type=float, default=1.25)
+    parser.add_argument("--cases", nargs="*", help="only run these cases")
+    args = parser.parse_args(argv)
+
+    results: Dict[str, Any] = {
+        "label": args.label,
+        "created": datetime.datetime.now().isoformat(),
+        "python": platform.python_version(),
+        "pymongo": pymongo.version,
+        "platform": platform.platform(),
+        "cases": {},
+    }
+    print(
+        f"{'case':<26}{'KiB':>9}{'encode us':>11}{'construct ms':>14}"
+        f"{'call ms':>10}{'overhead ms':>13}{'peak MiB':>10}"
+    )
+    for case, fixture, call, response_class in CASES:
+        if args.cases and case not in args.cases:
+            continue
+        metrics = run_case(fixture, call, response_class, args.repeat)
+        results["cases"][case] = metrics
+        print(
+            f"{case:<26}{metrics['response_kib']:>9.0f}{metrics['encode_us']:>11.1f}"
+            f"{metrics['construct_ms']:>14.2f}{metrics['call_ms']:>10.2f}"
+            f"{metrics['overhead_ms']:>13.2f}{metrics['peak_mib']:>10.2f}"
+        )
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    path = os.path.join(RESULTS_DIR, f"{args.label}.json")
+    with open(path, "w") as file:
+        json.dump(results, file, indent=2)
+    print(f"results written to {path}")
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            regressions = compare(results, json.load(file), args.threshold)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        if regressions:
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1 +1,50 @@
-from pyproven.database import ProvenDB
+"""Python interface to ProvenDB.
+
+Public classes are imported from their submodules on first access, so ``import pyproven`` does not
+load pymongo, asyncio or the response modules until they are needed.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any, Dict, List
+
+if TYPE_CHECKING:
+    from pyproven.async_database import AsyncProvenDB
+    from pyproven.cache import DiskProofCache, MemoryProofCache, ProofCache
+    from pyproven.database import ProvenDB
+    from pyproven.fleet import ProvenDBFleet
+
+# public name -> submodule that defines it.
+_LAZY_NAMES: Dict[str, str] = {
+    "ProvenDB": "pyproven.database",
+    "AsyncProvenDB": "pyproven.async_database",
+    "ProofCache": "pyproven.cache",
+    "MemoryProofCache": "pyproven.cache",
+    "DiskProofCache": "pyproven.cache",
+    "ProvenDBFleet": "pyproven.fleet",
+}
+
+__all__ = list(_LAZY_NAMES)
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY_NAMES.get(name)
+    if module is not None:
+        value = getattr(importlib.import_module(module), name)
+    elif name.startswith("_"):
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    else:
+        try:
+            # submodules are also reachable as attributes, e.g. pyproven.history
+            value = importlib.import_module(f"{__name__}.{name}")
+        except ModuleNotFoundError as err:
+            if err.name != f"{__name__}.{name}":
+                raise
+            raise AttributeError(
+                f"module {__name__!r} has no attribute {name!r}"
+            ) from None
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
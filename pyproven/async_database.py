@@ -0,0 +1,440 @@
+import asyncio
+import datetime
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from bson.son import SON
+from pymongo.errors import PyMongoError
+
+from pyproven.database import ResponseType, _apply_provendb_hack, _at_version_args
+from pyproven.enums import BulkLoadEnums
+from pyproven.metrics import CommandTimer, MetricsSink
+from pyproven.history import DocumentHistoryResponse
+from pyproven.proofs import (
+    GetDocumentProofResponse,
+    GetVersionProofResponse,
+    SubmitProofResponse,
+    VerifyProofResponse,
+)
+from pyproven.retry import DEFAULT_RETRY, RetryPolicy, RetryState
+from pyproven.templates import (
+    BULK_LOAD,
+    GET_VERSION,
+    HIDE_METADATA,
+    SET_VERSION,
+    SHOW_METADATA,
+    get_proof_template,
+    verify_proof_template,
+)
+from pyproven.storage import ListStorageResponse
+from pyproven.utilities import (
+    BulkLoadKillResponse,
+    BulkLoadStartResponse,
+    BulkLoadStatusResponse,
+    BulkLoadStopResponse,
+    CreateIgnoredResponse,
+    ExecuteForgetResponse,
+    HideMetadataResponse,
+    PrepareForgetResponse,
+    RollbackResponse,
+    ShowMetadataResponse,
+)
+from pyproven.versions import (
+    CompactResponse,
+    GetVersionResponse,
+    ListVersionsResponse,
+    SetVersionResponse,
+)
+
+
+class AsyncProvenDB:
+    """Asyncio ProvenDB Database object that wraps an asynchronous Mongo database handle,
+    such as :class:`motor.motor_asyncio.AsyncIOMotorDatabase`.
+
+    Every ProvenDB command of :class:`pyproven.database.ProvenDB` is available as a coroutine
+    returning the same response class, so many commands can be in flight on one event loop.
+
+    Only the commands themselves are wrapped. Unlike :class:`pyproven.database.ProvenDB`, this class has:
+
+    * no compact or lazy responses, every command returns the full response class;
+    * no proof cache, so :meth:`get_version_proof` and :meth:`verify_proof` always query the database;
+    * no version tracking, so :meth:`get_version` always sends getVersion and :meth:`set_version`
+      always sends setVersion, and there is no ``at_version`` context manager;
+    * no helpers built from several commands or cursors: ``bulk_ingest``, ``diff_versions``,
+      ``iter_doc_history``, ``iter_versions``, ``get_document_proofs`` and the ``*_columns`` methods.
+    """
+
+    def __init__(
+        self,
+        database: Any,
+        *args,
+        retry_policy: Optional[RetryPolicy] = None,
+        metrics: Optional[MetricsSink] = None,
+        **kwargs,
+    ):
+        """Constructor method
+
+        :param database: The asynchronous database to wrap.
+        :type database: Any
+        :param retry_policy: Policy for retrying failed commands, see :class:`pyproven.database.ProvenDB`.
+        :type retry_policy: Optional[RetryPolicy], optional
+        :param metrics: Sink receiving the latency, sizes and errors of every command, see :class:`pyproven.database.ProvenDB`.
+        :type metrics: Optional[MetricsSink], optional
+        """
+        self.db: Any = database
+        self.retry_policy: RetryPolicy = retry_policy or DEFAULT_RETRY
+        self.metrics: Optional[MetricsSink] = metrics
+        # motor encodes messages with pymongo, so the same hack applies.
+        _apply_provendb_hack(database, kwargs)
+
+    def __getattr__(self, name: str) -> Any:
+        """Calls the wrapped database object attribute or method when none could be found in self.
+
+        :param name: Name of the database attribute or method to be called.
+        :type name: str
+        :return: Value from the database attribute or method.
+        :rtype: Any
+        """
+        return getattr(self.db, name)
+
+    def __getitem__(self, name: Any) -> Any:
+        return self.db[name]
+
+    async def _command(
+        self,
+        response_class: Callable[[Any], ResponseType],
+        command: Union[str, Dict[str, Any]],
+        value: Any = 1,
+        idempotent: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> ResponseType:
+        """Awaits a ProvenDB command on the wrapped database and wraps the result in a response class.
+        See :meth:`pyproven.database.ProvenDB._command`.
+        """
+        with CommandTimer.for_command(self.metrics, command, value) as timer:
+            timer.response = await self._execute(command, value, idempotent, kwargs)
+        return response_class(timer.response)
+
+    async def _execute(
+        self,
+        command: Union[str, Dict[str, Any]],
+        value: Any,
+        idempotent: Optional[bool],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        """Awaits a command on the wrapped database, retrying it according to :attr:`retry_policy`."""
+        state = RetryState(self.retry_policy, command, idempotent)
+        while True:
+            try:
+                return await self.db.command(command, value, **kwargs)
+            except PyMongoError as err:
+                delay = state.failed(err)
+            await asyncio.sleep(delay)
+
+    async def bulk_load_start(self) -> BulkLoadStartResponse:
+        """Starts a bulk load on the database.
+        See :meth:`pyproven.database.ProvenDB.bulk_load_start`.
+
+        :raises BulkLoadAlreadyStartedError: When the database is already bulk loading.
+        :rtype: BulkLoadStartResponse
+        """
+        return await self._command(
+            BulkLoadStartResponse, BULK_LOAD[BulkLoadEnums.START].command()
+        )
+
+    async def bulk_load_stop(self) -> BulkLoadStopResponse:
+        """Stops a bulk load on a database, failing if there is any outstanding operations.
+        See :meth:`pyproven.database.ProvenDB.bulk_load_stop`.
+
+        :rtype: BulkLoadStopResponse
+        """
+        return await self._command(
+            BulkLoadStopResponse, BULK_LOAD[BulkLoadEnums.STOP].command()
+        )
+
+    async def bulk_load_kill(self) -> BulkLoadKillResponse:
+        """Stops a bulk load on a database, killing any remaining operations.
+        See :meth:`pyproven.database.ProvenDB.bulk_load_kill`.
+
+        :rtype: BulkLoadKillResponse
+        """
+        return await self._command(
+            BulkLoadKillResponse, BULK_LOAD[BulkLoadEnums.KILL].command()
+        )
+
+    async def bulk_load_status(self) -> BulkLoadStatusResponse:
+        """Returns the current bulk load status of the database.
+        See :meth:`pyproven.database.ProvenDB.bulk_load_status`.
+
+        :rtype: BulkLoadStatusResponse
+        """
+        return await self._command(
+            BulkLoadStatusResponse,
+            BULK_LOAD[BulkLoadEnums.STATUS].command(),
+            idempotent=True,
+        )
+
+    async def compact_versions(
+        self,
+        start_version: int,
+        end_version: int,
+        destroy_proofs: Optional[bool] = None,
+    ) -> CompactResponse:
+        """Compacts all proofs, versions and documents in the db between two given versions.
+        See :meth:`pyproven.database.ProvenDB.compact_versions`.
+
+        :raises CompactProofError: When no full proof exists above the range to be compacted.
+        :rtype: CompactResponse
+        """
+        command_args = SON({"startVersion": start_version, "endVersion": end_version})
+        if destroy_proofs:
+            command_args.update({"destroyProofs": destroy_proofs})
+        return await self._command(CompactResponse, "compact", command_args)
+
+    async def create_ignored(self, collection: str) -> CreateIgnoredResponse:
+        """Sets a collection to be ignored.
+        See :meth:`pyproven.database.ProvenDB.create_ignored`.
+
+        :rtype: CreateIgnoredResponse
+        """
+        return await self._command(CreateIgnoredResponse, "createIgnored", collection)
+
+    async def doc_history(
+        self,
+        collection: str,
+        filter: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> DocumentHistoryResponse:
+        """Returns the document history of a filtered collection.
+        See :meth:`pyproven.database.ProvenDB.doc_history`.
+
+        :rtype: DocumentHistoryResponse
+        """
+        command_args = SON({"collection": collection, "filter": filter})
+        if projection:
+            command_args.update({"projection": projection})
+        return await self._command(DocumentHistoryResponse, "docHistory", command_args)
+
+    def find_at_version(
+        self,
+        collection: str,
+        filter: Optional[Dict[str, Any]],
+        version: int,
+        projection: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Finds the documents of a collection as they were at a version, without sending setVersion.
+        See :meth:`pyproven.database.ProvenDB.find_at_version`.
+
+        Unlike the commands, this is not a coroutine: like the ``find`` of an asynchronous driver such as
+        motor, it sends nothing and returns a cursor, which is iterated asynchronously:
+
+        .. code-block:: python
+
+            async for document in pdb.find_at_version("orders", {}, version):
+                ...
+
+        :param collection: Name of the collection to read.
+        :type collection: str
+        :param filter: MongoDB filter selecting the documents, applied to the documents at ``version``.
+        :type filter: Optional[Dict[str, Any]]
+        :param version: The version number to read at.
+        :type version: int
+        :param projection: A projection applied by the server, defaults to all fields except the ProvenDB metadata.
+        :type projection: Optional[Dict[str, Any]], optional
+        :param kwargs: Other arguments of the wrapped collection's ``find``, e.g. sort or limit.
+        :return: The cursor returned by the wrapped collection's ``find``.
+        :rtype: Any
+        """
+        query, projection = _at_version_args(filter, int(version), projection)
+        return self.db[collection].find(query, projection, **kwargs)
+
+    async def forget_prepare(
+        self,
+        collection: str,
+        filter: Dict[str, Any],
+        min_version: Optional[int] = None,
+        max_version: Optional[int] = None,
+        inclusive_range: Optional[bool] = None,
+    ) -> PrepareForgetResponse:
+        """Prepares an operation to forget a set of documents.
+        See :meth:`pyproven.database.ProvenDB.forget_prepare`.
+
+        :rtype: PrepareForgetResponse
+        """
+        command_args = SON(
+            {
+                "collection": collection,
+                "filter": filter,
+            }
+        )
+        if min_version:
+            command_args.update({"minVersion": min_version})
+        if max_version:
+            command_args.update({"maxVersion": max_version})
+        if inclusive_range:
+            command_args.update({"inclusiveRange": inclusive_range})
+        return await self._command(
+            PrepareForgetResponse, "forget", {"prepare": command_args}
+        )
+
+    async def forget_execute(
+        self, forget_id: int, password: str
+    ) -> ExecuteForgetResponse:
+        """Executes a prepared forget operation.
+        See :meth:`pyproven.database.ProvenDB.forget_execute`.
+
+        :rtype: ExecuteForgetResponse
+        """
+        command_args = SON({"forgetId": forget_id, "password": password})
+        return await self._command(
+            ExecuteForgetResponse, "forget", {"execute": command_args}
+        )
+
+    async def get_document_proof(
+        self,
+        collection: str,
+        filter: Dict[str, Any],
+        version: int,
+        proof_format: Optional[str] = None,
+    ) -> GetDocumentProofResponse:
+        """Filters documents in a collection and returns any proofs of those documents for a given version.
+        See :meth:`pyproven.database.ProvenDB.get_document_proof`.
+
+        :rtype: GetDocumentProofResponse
+        """
+        command_args = SON(
+            {
+                "collection": collection,
+                "filter": filter,
+                "version": version,
+            }
+        )
+        if proof_format:
+            command_args.update({"proofFormat": proof_format})
+        return await self._command(
+            GetDocumentProofResponse, "getDocumentProof", command_args
+        )
+
+    async def get_version(self) -> GetVersionResponse:
+        """Gets the version the db is set to.
+        See :meth:`pyproven.database.ProvenDB.get_version`.
+
+        :rtype: GetVersionResponse
+        """
+        return await self._command(GetVersionResponse, GET_VERSION.command())
+
+    async def get_version_proof(
+        self,
+        proof_id: Union[str, int],
+        proof_format: Optional[str] = None,
+        list_collections: Optional[bool] = None,
+    ) -> GetVersionProofResponse:
+        """Gets a proof for a specific database version.
+        See :meth:`pyproven.database.ProvenDB.get_version_proof`.
+
+        :rtype: GetVersionProofResponse
+        """
+        command_args = get_proof_template(proof_format, list_collections).command(
+            proof_id
+        )
+        return await self._command(GetVersionProofResponse, command_args)
+
+    async def list_storage(self) -> ListStorageResponse:
+        """Fetches the storage size for each collection in the db.
+        See :meth:`pyproven.database.ProvenDB.list_storage`.
+
+        :rtype: ListStorageResponse
+        """
+        return await self._command(ListStorageResponse, "listStorage")
+
+    async def list_versions(
+        self,
+        start_date: Optional[datetime.datetime] = None,
+        end_date: Optional[datetime.datetime] = None,
+        limit: Optional[int] = None,
+        sort_direction: Optional[int] = None,
+    ) -> ListVersionsResponse:
+        """Retrieves a list of versions given a search parameter.
+        See :meth:`pyproven.database.ProvenDB.list_versions`.
+
+        :rtype: ListVersionsResponse
+        """
+        command_args = SON()
+        if start_date:
+            command_args.update({"startDate": start_date})
+        if end_date:
+            command_args.update({"endDate": end_date})
+        if limit:
+            command_args.update({"limit": limit})
+        if sort_direction:
+            command_args.update({"sortDirection": sort_direction})
+        return await self._command(ListVersionsResponse, {"listVersions": command_args})
+
+    async def rollback(self) -> RollbackResponse:
+        """Rolls back the database to the last valid version.
+        See :meth:`pyproven.database.ProvenDB.rollback`.
+
+        :rtype: RollbackResponse
+        """
+        return await self._command(RollbackResponse, "rollback")
+
+    async def set_version(
+        self, date: Union[str, int, datetime.datetime]
+    ) -> SetVersionResponse:
+        """Sets the database version to a given version identifier.
+        See :meth:`pyproven.database.ProvenDB.set_version`.
+
+        :rtype: SetVersionResponse
+        """
+        return await self._command(SetVersionResponse, SET_VERSION.command(date))
+
+    async def show_metadata(self) -> ShowMetadataResponse:
+        """Causes the db to also show ProvenDB metadata on documents.
+        See :meth:`pyproven.database.ProvenDB.show_metadata`.
+
+        :rtype: ShowMetadataResponse
+        """
+        return await self._command(ShowMetadataResponse, SHOW_METADATA.command())
+
+    async def hide_metadata(self) -> HideMetadataResponse:
+        """Causes the db to hide ProvenDB metadata on documents.
+        See :meth:`pyproven.database.ProvenDB.hide_metadata`.
+
+        :rtype: HideMetadataResponse
+        """
+        return await self._command(HideMetadataResponse, HIDE_METADATA.command())
+
+    async def submit_proof(
+        self,
+        version: int,
+        collections: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        anchor_type: Optional[str] = None,
+        n_checks: Optional[int] = None,
+    ) -> SubmitProofResponse:
+        """Creates a proof for a version and inserts it on the blockchain.
+        See :meth:`pyproven.database.ProvenDB.submit_proof`.
+
+        :rtype: SubmitProofResponse
+        """
+        command_args: SON = SON({"submitProof": version})
+        if collections:
+            command_args.update({"collections": collections})
+        if filter:
+            command_args.update({"filter": filter})
+        if anchor_type:
+            command_args.update({"anchorType": anchor_type})
+        if n_checks:
+            command_args.update({"nChecks": n_checks})
+        return await self._command(SubmitProofResponse, command_args)
+
+    async def verify_proof(
+        self, proof_id: str, format: Optional[str] = None
+    ) -> VerifyProofResponse:
+        """Verifies a proof previously uploaded to the blockchain.
+        See :meth:`pyproven.database.ProvenDB.verify_proof`.
+
+        :rtype: VerifyProofResponse
+        """
+        command_args = verify_proof_template(format).command(proof_id)
+        return await self._command(VerifyProofResponse, command_args)
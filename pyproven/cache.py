@@ -0,0 +1,205 @@
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Mapping, Optional, Tuple
+
+from bson import BSON
+
+from pyproven.enums import ProofStatusEnums
+
+FINAL_PROOF_STATUSES = frozenset(
+    status.value
+    for status in (
+        ProofStatusEnums.VALID,
+        ProofStatusEnums.INVALID,
+        ProofStatusEnums.FAILED,
+    )
+)
+
+
+def is_final_status(status: Optional[str]) -> bool:
+    """Returns True if a proof status can no longer change.
+
+    :param status: A proof status as returned by ProvenDB, e.g. 'valid' or 'Pending'.
+    :type status: Optional[str]
+    :rtype: bool
+    """
+    return status is not None and status.lower() in FINAL_PROOF_STATUSES
+
+
+class ProofCache(ABC):
+    """ABC for caches of :meth:`pyproven.database.ProvenDB.get_version_proof` and
+    :meth:`pyproven.database.ProvenDB.verify_proof` responses.
+
+    Documents are stored BSON encoded. Documents whose proofs have reached a final status are kept
+    until evicted by size, all other documents expire after ``pending_ttl`` seconds.
+    """
+
+    def __init__(self, max_bytes: int, pending_ttl: float = 30.0):
+        """Constructor method
+
+        :param max_bytes: Maximum total size of encoded documents held by the cache.
+        :type max_bytes: int
+        :param pending_ttl: Seconds to keep documents for proofs that are not final yet, defaults to 30.
+        :type pending_ttl: float, optional
+        """
+        self.max_bytes = max_bytes
+        self.pending_ttl = pending_ttl
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Returns a decoded copy of the document cached under ``key``, or None if it is missing or expired.
+
+        :param key: The cache key.
+        :type key: str
+        :rtype: Optional[Dict[str, Any]]
+        """
+        data = self._get(key)
+        if data is None:
+            return None
+        return BSON(data).decode()
+
+    def set(self, key: str, document: Mapping[str, Any], final: bool) -> None:
+        """Stores a response document under ``key``.
+
+        :param key: The cache key.
+        :type key: str
+        :param document: The response document to cache.
+        :type document: Mapping[str, Any]
+        :param final: True if the proofs in the document have reached a final status.
+        :type final: bool
+        """
+        expires = None if final else self._now() + self.pending_ttl
+        self._set(key, BSON.encode(document), expires)
+
+    @abstractmethod
+    def clear(self) -> None:
+        """Removes every document from the cache."""
+
+    def _now(self) -> float:
+        return time.monotonic()
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[bytes]:
+        """Returns the encoded document stored under ``key``, or None if it is missing or expired."""
+
+    @abstractmethod
+    def _set(self, key: str, data: bytes, expires: Optional[float]) -> None:
+        """Stores an encoded document, expiring at the :meth:`_now` time ``expires`` unless it is None."""
+
+
+class MemoryProofCache(ProofCache):
+    """In-memory least recently used proof cache."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, pending_ttl: float = 30.0):
+        super().__init__(max_bytes, pending_ttl)
+        self._entries: "OrderedDict[str, Tuple[bytes, Optional[float]]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+
+    def _get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            data, expires = entry
+            if expires is not None and expires <= self._now():
+                del self._entries[key]
+                self._size -= len(data)
+                return None
+            self._entries.move_to_end(key)
+            return data
+
+    def _set(self, key: str, data: bytes, expires: Optional[float]) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self._size -= len(previous[0])
+            self._entries[key] = (data, expires)
+            self._size += len(data)
+            while self._size > self.max_bytes:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+
+class DiskProofCache(ProofCache):
+    """SQLite backed least recently used proof cache that persists between processes."""
+
+    def __init__(
+        self, path: str, max_bytes: int = 1024 * 1024 * 1024, pending_ttl: float = 30.0
+    ):
+        """Constructor method
+
+        :param path: Path of the SQLite database file, created if missing.
+        :type path: str
+        """
+        # imported here so only users of the disk cache pay for loading sqlite3.
+        import sqlite3
+
+        super().__init__(max_bytes, pending_ttl)
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS proofs ("
+                "key TEXT PRIMARY KEY, data BLOB, size INTEGER, expires REAL, accessed REAL)"
+            )
+            self._connection.execute(
+                "CREATE INDEX IF NOT EXISTS proofs_accessed ON proofs (accessed)"
+            )
+
+    def clear(self) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM proofs")
+
+    def close(self) -> None:
+        """Closes the underlying SQLite connection."""
+        self._connection.close()
+
+    def _now(self) -> float:
+        # wall clock time, since entries outlive the process.
+        return time.time()
+
+    def _get(self, key: str) -> Optional[bytes]:
+        now = self._now()
+        with self._lock, self._connection:
+            row = self._connection.execute(
+                "SELECT data, expires FROM proofs WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            data, expires = row
+            if expires is not None and expires <= now:
+                self._connection.execute("DELETE FROM proofs WHERE key = ?", (key,))
+                return None
+            self._connection.execute(
+                "UPDATE proofs SET accessed = ? WHERE key = ?", (now, key)
+            )
+            return bytes(data)
+
+    def _set(self, key: str, data: bytes, expires: Optional[float]) -> None:
+        if len(data) > self.max_bytes:
+            return
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO proofs VALUES (?, ?, ?, ?, ?)",
+                (key, data, len(data), expires, self._now()),
+            )
+            (size,) = self._connection.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM proofs"
+            ).fetchone()
+            while size > self.max_bytes:
+                evicted_key, evicted_size = self._connection.execute(
+                    "SELECT key, size FROM proofs ORDER BY accessed LIMIT 1"
+                ).fetchone()
+                self._connection.execute(
+                    "DELETE FROM proofs WHERE key = ?", (evicted_key,)
+                )
+                size -= evicted_size
@@ -0,0 +1,179 @@
+import datetime
+import re
+from array import array
+from typing import Any, Dict, List, Mapping, Optional, Union
+
+Columns = Dict[str, Union[array, List[Any]]]
+
+#: Stored for missing timestamps, and read back by numpy as NaT.
+MISSING_TIMESTAMP = -(2**63)
+
+# int64 columns holding milliseconds since the unix epoch.
+TIMESTAMP_COLUMNS = frozenset(("effectiveDate", "started", "ended"))
+#: Size in bytes of the SHA-256 digests held by hash columns.
+HASH_SIZE = 32
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_MILLISECOND = datetime.timedelta(milliseconds=1)
+_HEX = re.compile(r"^[0-9a-fA-F]{%d}$" % (2 * HASH_SIZE))
+
+
+def _millis(value: Any) -> int:
+    if not isinstance(value, datetime.datetime):
+        return MISSING_TIMESTAMP
+    if value.tzinfo is not None:
+        value = value.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return (value - _EPOCH) // _MILLISECOND
+
+
+def _hash_bytes(value: Optional[str]) -> bytes:
+    if not value:
+        return b""
+    if not _HEX.match(value):
+        raise ValueError(f"expected a hex encoded SHA-256 digest, got {value!r}")
+    return bytes.fromhex(value)
+
+
+def version_columns(document: Mapping[str, Any]) -> Columns:
+    """Builds columns from a raw listVersions response without creating response objects.
+
+    :param document: The listVersions response document.
+    :type document: Mapping[str, Any]
+    :return: 'version' int64, 'status' str and 'effectiveDate' timestamp columns.
+    :rtype: Columns
+    """
+    version = array("q")
+    status = []
+    effective_date = array("q")
+    for item in document["versions"]:
+        version.append(int(item["version"]))
+        status.append(item["status"])
+        effective_date.append(_millis(item["effectiveDate"]))
+    return {"version": version, "status": status, "effectiveDate": effective_date}
+
+
+def history_columns(document: Mapping[str, Any]) -> Columns:
+    """Builds columns from a raw docHistory response without creating response objects,
+    with one row per version of each document. Document bodies are not exported.
+
+    :param document: The docHistory response document.
+    :type document: Mapping[str, Any]
+    :return: '_id' object, 'minVersion' and 'maxVersion' int64, 'status' str,
+             and 'started' and 'ended' timestamp columns.
+    :rtype: Columns
+    """
+    ids = []
+    min_version = array("q")
+    max_version = array("q")
+    status = []
+    started = array("q")
+    ended = array("q")
+    for item in document["history"]:
+        document_id = item["_id"]
+        for version in item["versions"]:
+            ids.append(document_id)
+            min_version.append(int(version["minVersion"]))
+            max_version.append(int(version["maxVersion"]))
+            status.append(version["status"])
+            started.append(_millis(version.get("started")))
+            ended.append(_millis(version.get("ended")))
+    return {
+        "_id": ids,
+        "minVersion": min_version,
+        "maxVersion": max_version,
+        "status": status,
+        "started": started,
+        "ended": ended,
+    }
+
+
+def document_proof_columns(document: Mapping[str, Any]) -> Columns:
+    """Builds columns from a raw getDocumentProof response without creating response objects.
+    Failed proofs have an 'errmsg' and empty values in every other column.
+
+    :param document: The getDocumentProof response document.
+    :type document: Mapping[str, Any]
+    :raises ValueError: When a hash is not a hex encoded SHA-256 digest.
+    :return: 'documentId', 'collection', 'status', 'versionProofId', 'btcTransaction',
+             'btcBlockNumber' and 'errmsg' object columns, a 'version' int64 column,
+             and 'documentHash' and 'versionHash' columns of 32 byte digests, empty for failed proofs.
+    :rtype: Columns
+    """
+    columns: Columns = {
+        "documentId": [],
+        "collection": [],
+        "version": array("q"),
+        "status": [],
+        "versionProofId": [],
+        "documentHash": [],
+        "versionHash": [],
+        "btcTransaction": [],
+        "btcBlockNumber": [],
+        "errmsg": [],
+    }
+    for proof in document["proofs"]:
+        errmsg = proof.get("errmsg")
+        columns["documentId"].append(proof.get("documentId"))
+        columns["collection"].append(proof.get("collection"))
+        columns["version"].append(int(proof.get("version", -1)))
+        columns["status"].append(proof.get("status"))
+        columns["versionProofId"].append(proof.get("versionProofId"))
+        columns["documentHash"].append(_hash_bytes(proof.get("documentHash")))
+        columns["versionHash"].append(_hash_bytes(proof.get("versionHash")))
+        columns["btcTransaction"].append(proof.get("btcTransaction"))
+        columns["btcBlockNumber"].append(proof.get("btcBlockNumber"))
+        columns["errmsg"].append(errmsg)
+    return columns
+
+
+def to_numpy(columns: Columns) -> Dict[str, Any]:
+    """Converts columns to numpy arrays: int64 columns without copying, timestamps as
+    ``datetime64[ms]``, hashes as fixed width ``S32`` bytes and everything else as object arrays.
+    Missing hashes are stored as 32 NUL bytes. numpy strips trailing NUL bytes when reading a
+    single ``S32`` element, so read digests from the whole array, e.g. ``hashes.view("V32")``
+    or ``hashes.view(numpy.uint8).reshape(-1, 32)``.
+    Requires the optional ``numpy`` package.
+
+    :param columns: Columns built by this module.
+    :type columns: Columns
+    :rtype: Dict[str, numpy.ndarray]
+    """
+    try:
+        import numpy  # type: ignore
+    except ImportError:
+        raise ImportError("numpy is required to convert columns to arrays.") from None
+    arrays = {}
+    for name, values in columns.items():
+        if isinstance(values, array):
+            converted = numpy.frombuffer(values, dtype=numpy.int64)
+            if name in TIMESTAMP_COLUMNS:
+                converted = converted.view("datetime64[ms]")
+            arrays[name] = converted
+        elif values and all(isinstance(value, bytes) for value in values):
+            arrays[name] = numpy.array(values, dtype=f"S{HASH_SIZE}")
+        else:
+            converted = numpy.empty(len(values), dtype=object)
+            converted[:] = values
+            arrays[name] = converted
+    return arrays
+
+
+def save_npz(columns: Columns, path: str) -> None:
+    """Writes columns to a compressed ``.npz`` file, readable with :func:`numpy.load`
+    without ``allow_pickle``. Object columns, such as '_id' or 'status', are written as
+    unicode strings, with None as the empty string, and hashes as in :func:`to_numpy`.
+
+    :param columns: Columns built by this module.
+    :type columns: Columns
+    :param path: Destination file path.
+    :type path: str
+    """
+    arrays = to_numpy(columns)
+    import numpy  # type: ignore
+
+    for name, values in arrays.items():
+        if values.dtype == object:
+            arrays[name] = numpy.array(
+                ["" if value is None else str(value) for value in values], dtype=str
+            )
+    numpy.savez_compressed(path, **arrays)
@@ -0,0 +1,216 @@
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Type
+
+from pyproven.history import (
+    DocumentHistoryItem,
+    DocumentHistoryResponse,
+    DocumentHistoryVersion,
+)
+from pyproven.proofs import (
+    FailedDocumentProof,
+    GetDocumentProofResponse,
+    GetVersionProofResponse,
+    SuccessfulDocumentProof,
+    VersionProof,
+)
+from pyproven.response import ProvenDocument
+from pyproven.versions import ListVersionDocument, ListVersionsResponse
+
+
+class CompactDocument(Mapping):
+    """ABC for compact, read-only ProvenDB documents.
+
+    Known fields are stored once, in ``__slots__``, and are available both as attributes and
+    through the read-only mapping interface. Any other field is kept in a small overflow dict.
+    Subclasses declare ``__slots__`` and ``_fields``, a tuple of (key, attribute) pairs.
+    """
+
+    __slots__ = ("_extra",)
+    _fields: Tuple[Tuple[str, str], ...] = ()
+    _attributes: Dict[str, str] = {}
+
+    def __init_subclass__(cls, **kwargs: Any):
+        super().__init_subclass__(**kwargs)
+        cls._attributes = dict(cls._fields)
+
+    def __init__(self, document: Dict[str, Any]):
+        extra: Optional[Dict[str, Any]] = None
+        attributes = self._attributes
+        for key, value in document.items():
+            attribute = attributes.get(key)
+            if attribute is not None:
+                setattr(self, attribute, value)
+            elif extra is None:
+                extra = {key: value}
+            else:
+                extra[key] = value
+        self._extra = extra
+
+    def __getitem__(self, key: str) -> Any:
+        attribute = self._attributes.get(key)
+        if attribute is not None:
+            try:
+                return getattr(self, attribute)
+            except AttributeError:
+                raise KeyError(key) from None
+        if self._extra is not None and key in self._extra:
+            return self._extra[key]
+        raise KeyError(key)
+
+    def __iter__(self) -> Iterator[str]:
+        for key, attribute in self._fields:
+            if hasattr(self, attribute):
+                yield key
+        if self._extra is not None:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return f"{type(self).__name__}({dict(self)!r})"
+
+
+class CompactDocumentHistoryVersion(CompactDocument):
+    """Compact form of :class:`pyproven.history.DocumentHistoryVersion`."""
+
+    __slots__ = ("minVersion", "maxVersion", "status", "started", "ended", "document")
+    _fields = tuple((slot, slot) for slot in __slots__)
+
+
+class CompactDocumentHistoryItem(CompactDocument):
+    """Compact form of :class:`pyproven.history.DocumentHistoryItem`."""
+
+    __slots__ = ("_id", "versions")
+    _fields = (("_id", "_id"), ("versions", "versions"))
+    versions: List[CompactDocumentHistoryVersion]
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.versions = [
+            CompactDocumentHistoryVersion(version) for version in document["versions"]
+        ]
+
+
+class CompactDocumentHistoryResponse(CompactDocument):
+    """Compact form of :class:`pyproven.history.DocumentHistoryResponse`."""
+
+    __slots__ = ("ok", "history", "collection")
+    _fields = tuple((slot, slot) for slot in __slots__)
+    history: List[CompactDocumentHistoryItem]
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.history = [
+            CompactDocumentHistoryItem(item) for item in document["history"]
+        ]
+
+
+class CompactFailedDocumentProof(CompactDocument):
+    """Compact form of :class:`pyproven.proofs.FailedDocumentProof`."""
+
+    __slots__ = ("errmsg",)
+    _fields = (("errmsg", "errmsg"),)
+
+
+class CompactSuccessfulDocumentProof(CompactDocument):
+    """Compact form of :class:`pyproven.proofs.SuccessfulDocumentProof`."""
+
+    __slots__ = (
+        "collection",
+        "scope",
+        "provenDbId",
+        "documentId",
+        "version",
+        "status",
+        "btcTransaction",
+        "btcBlockNumber",
+        "versionProofId",
+        "documentHash",
+        "versionHash",
+        "proof",
+    )
+    _fields = (("ProvenDbId", "provenDbId"),) + tuple(
+        (slot, slot) for slot in __slots__ if slot != "provenDbId"
+    )
+
+
+def _process_compact_document_proof(document: Dict[str, Any]) -> CompactDocument:
+    """Compact counterpart of :func:`pyproven.proofs._process_document_proof`."""
+    if "errmsg" in document.keys():
+        return CompactFailedDocumentProof(document)
+    else:
+        return CompactSuccessfulDocumentProof(document)
+
+
+class CompactGetDocumentProofResponse(CompactDocument):
+    """Compact form of :class:`pyproven.proofs.GetDocumentProofResponse`."""
+
+    __slots__ = ("ok", "proofs")
+    _fields = (("ok", "ok"), ("proofs", "proofs"))
+    proofs: List[CompactDocument]
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.proofs = [
+            _process_compact_document_proof(proof) for proof in document["proofs"]
+        ]
+
+
+class CompactVersionProof(CompactDocument):
+    """Compact form of :class:`pyproven.proofs.VersionProof`."""
+
+    __slots__ = ("_id", "proofId", "version", "status", "hash", "proof")
+    _fields = tuple((slot, slot) for slot in __slots__)
+
+
+class CompactGetVersionProofResponse(CompactDocument):
+    """Compact form of :class:`pyproven.proofs.GetVersionProofResponse`."""
+
+    __slots__ = ("ok", "proofs")
+    _fields = (("ok", "ok"), ("proofs", "proofs"))
+    proofs: List[CompactVersionProof]
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.proofs = [CompactVersionProof(proof) for proof in document["proofs"]]
+
+
+class CompactListVersionDocument(CompactDocument):
+    """Compact form of :class:`pyproven.versions.ListVersionDocument`."""
+
+    __slots__ = ("version", "status", "effective_date")
+    _fields = (
+        ("version", "version"),
+        ("status", "status"),
+        ("effectiveDate", "effective_date"),
+    )
+
+
+class CompactListVersionsResponse(CompactDocument):
+    """Compact form of :class:`pyproven.versions.ListVersionsResponse`."""
+
+    __slots__ = ("ok", "versions")
+    _fields = (("ok", "ok"), ("versions", "versions"))
+    versions: List[CompactListVersionDocument]
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.versions = [
+            CompactListVersionDocument(doc) for doc in document["versions"]
+        ]
+
+
+#: Compact class used in place of each response class when compact responses are enabled.
+COMPACT_RESPONSES: Dict[Type[ProvenDocument], Type[CompactDocument]] = {
+    DocumentHistoryResponse: CompactDocumentHistoryResponse,
+    DocumentHistoryItem: CompactDocumentHistoryItem,
+    DocumentHistoryVersion: CompactDocumentHistoryVersion,
+    GetDocumentProofResponse: CompactGetDocumentProofResponse,
+    FailedDocumentProof: CompactFailedDocumentProof,
+    SuccessfulDocumentProof: CompactSuccessfulDocumentProof,
+    GetVersionProofResponse: CompactGetVersionProofResponse,
+    VersionProof: CompactVersionProof,
+    ListVersionsResponse: CompactListVersionsResponse,
+    ListVersionDocument: CompactListVersionDocument,
+}
@@ -0,0 +1,349 @@
+"""Compaction of large version ranges in small steps, so storage can be reclaimed without a maintenance outage.
+
+:func:`plan_compaction` splits a range into chunks that can each be compacted on their own, and
+:func:`run_compaction` compacts them one at a time, pausing between chunks and checkpointing its
+progress so an interrupted run can be resumed:
+
+.. code-block:: python
+
+    plan = plan_compaction(pdb, 1, 250000, max_versions=5000)
+    progress = run_compaction(pdb, plan, checkpoint="compact-1-250000.json", latency_budget=2.0)
+    print(progress.nVersionsDeleted, progress.nProofsDeleted)
+"""
+
+import datetime
+import json
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo.errors import OperationFailure, PyMongoError
+
+from pyproven.database import ProvenDB
+from pyproven.exceptions import CompactProofError, CompactValueError
+from pyproven.response import ProvenDocument
+from pyproven.utilities import VERSION_PROOFS_COLLECTION
+
+# listVersions only returns the last day by default, so dates are searched from the epoch.
+_EPOCH = datetime.datetime(1970, 1, 1)
+# how close to the effectiveDate of the first version the derived start date gets.
+_DATE_PRECISION = datetime.timedelta(minutes=1)
+
+
+class CompactionChunk(ProvenDocument):
+    """Dict-like step of a :class:`CompactionPlan`. Each step compacts from the start of its segment,
+    so documents spanning earlier steps are deleted too, while only the versions from 'firstVersion'
+    to 'endVersion' are new to the step."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.startVersion: int = self["startVersion"]
+        self.firstVersion: int = self["firstVersion"]
+        self.endVersion: int = self["endVersion"]
+        self.nVersions: int = self["nVersions"]
+        self.nProofs: int = self["nProofs"]
+
+
+class CompactionPlan(ProvenDocument):
+    """Dict-like plan made by :func:`plan_compaction`, holding the proof above the range that every
+    chunk relies on, and the chunks in the order they are compacted."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.startVersion: int = self["startVersion"]
+        self.endVersion: int = self["endVersion"]
+        self.proofVersion: int = self["proofVersion"]
+        self.proofId: str = self["proofId"]
+        self.destroyProofs: bool = self["destroyProofs"]
+        self["chunks"] = [CompactionChunk(chunk) for chunk in document["chunks"]]
+        self.chunks: List[CompactionChunk] = self["chunks"]
+
+    def to_json(self) -> Dict[str, Any]:
+        """Returns the plan as plain JSON serialisable types."""
+        document = dict(self)
+        document["chunks"] = [
+            {key: int(value) for key, value in chunk.items()} for chunk in self.chunks
+        ]
+        for key in ("startVersion", "endVersion", "proofVersion"):
+            document[key] = int(document[key])
+        return document
+
+
+class CompactionProgress(ProvenDocument):
+    """Dict-like progress of :func:`run_compaction`, with the totals of every compact command run so far,
+    including those of earlier runs resumed from the same checkpoint."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.startVersion: int = self["startVersion"]
+        self.endVersion: int = self["endVersion"]
+        self.completedThrough: Optional[int] = self["completedThrough"]
+        self.nCommands: int = self["nCommands"]
+        self.nProofsDeleted: int = self["nProofsDeleted"]
+        self.nVersionsDeleted: int = self["nVersionsDeleted"]
+        self.nDocumentsDeleted: int = self["nDocumentsDeleted"]
+        self.seconds: float = self["seconds"]
+
+    @property
+    def done(self) -> bool:
+        return (
+            self.completedThrough is not None
+            and self.completedThrough >= self.endVersion
+        )
+
+
+def _covers_database(pdb: ProvenDB, proof: Any) -> bool:
+    """Returns True if a version proof covers every collection, as compact requires,
+    rather than only the collections or documents it was submitted for."""
+    scope = proof.get("scope")
+    if scope is not None:
+        return scope == "database"
+    proven = {collection["name"] for collection in proof.get("collections") or []}
+    return all(
+        name in proven
+        for name in pdb.list_collection_names()
+        if not name.startswith(("_provendb", "system."))
+    )
+
+
+def _find_anchor(pdb: ProvenDB, end_version: int) -> Any:
+    """Returns the first full proof above ``end_version`` that getProof confirms is valid."""
+    candidates = (
+        pdb[VERSION_PROOFS_COLLECTION]
+        .find({"version": {"$gt": end_version}}, {"proofId": 1, "version": 1})
+        .sort("version", 1)
+    )
+    for candidate in candidates:
+        try:
+            response = pdb.get_version_proof(
+                candidate["proofId"], list_collections=True
+            )
+        except PyMongoError:
+            continue
+        for proof in response["proofs"]:
+            if str(proof["status"]).lower() == "valid" and _covers_database(pdb, proof):
+                return proof
+    return None
+
+
+def _start_date(pdb: ProvenDB, version: int) -> datetime.datetime:
+    """Returns a date at most a minute before the effectiveDate of ``version``, found by bisecting
+    dates with single version listVersions commands, so older versions are not listed.
+    """
+    low = _EPOCH
+    high = datetime.datetime.utcnow()
+    while high - low > _DATE_PRECISION:
+        middle = low + (high - low) / 2
+        first = pdb.list_versions(middle, high, 1, 1)["versions"]
+        if first and int(first[0]["version"]) <= version:
+            low = middle
+        else:
+            high = middle
+    return low
+
+
+def plan_compaction(
+    pdb: ProvenDB,
+    start_version: int,
+    end_version: int,
+    max_versions: int = 1000,
+    destroy_proofs: bool = False,
+    start_date: Optional[datetime.datetime] = None,
+) -> CompactionPlan:
+    """Splits the compaction of a version range into chunks of at most ``max_versions`` versions.
+    The versions are listed with :meth:`pyproven.database.ProvenDB.iter_versions`, and the proofs
+    are read from the versionProofs collection. The valid proof of every collection above the range,
+    which ProvenDB requires before compacting, is confirmed with :meth:`pyproven.database.ProvenDB.get_version_proof`.
+
+    Unless ``destroy_proofs`` is set, proven versions inside the range are kept: the range is split
+    into segments between them, and each segment is compacted on its own.
+
+    :param pdb: The ProvenDB object of the database to compact.
+    :type pdb: ProvenDB
+    :param start_version: The first version to compact.
+    :type start_version: int
+    :param end_version: The last version to compact.
+    :type end_version: int
+    :param max_versions: Most versions compacted by one command, defaults to 1000
+    :type max_versions: int, optional
+    :param destroy_proofs: If True, proofs inside the range are deleted, defaults to False
+    :type destroy_proofs: bool, optional
+    :param start_date: A date at or before ``start_version``, defaults to a date found by bisecting
+                       :meth:`pyproven.database.ProvenDB.list_versions`, so older versions are not listed.
+    :type start_date: Optional[datetime.datetime], optional
+    :raises CompactValueError: When the version range is empty.
+    :raises CompactProofError: When there is no valid proof of every collection above the range.
+    :return: A dict-like object holding the chunks to compact.
+    :rtype: CompactionPlan
+    """
+    if end_version < start_version:
+        raise CompactValueError(OperationFailure("Invalid version range to compact"))
+    if max_versions < 1:
+        raise ValueError("max_versions must be at least 1.")
+    anchor = _find_anchor(pdb, end_version)
+    if anchor is None:
+        raise CompactProofError(
+            OperationFailure(
+                f"There must be a valid proof above version {end_version}."
+            )
+        )
+    proof_counts: Dict[int, int] = {}
+    for proof in pdb[VERSION_PROOFS_COLLECTION].find(
+        {"version": {"$gte": start_version, "$lte": end_version}}, {"version": 1}
+    ):
+        version = int(proof["version"])
+        proof_counts[version] = proof_counts.get(version, 0) + 1
+
+    chunks: List[Dict[str, Any]] = []
+    segment_start: Optional[int] = None
+    chunk: Optional[Dict[str, Any]] = None
+    if start_date is None:
+        start_date = _start_date(pdb, start_version)
+    for listed in pdb.iter_versions(start_date, None, max(max_versions, 100)):
+        version = int(listed["version"])
+        if version < start_version:
+            continue
+        if version > end_version:
+            break
+        if not destroy_proofs and version in proof_counts:
+            segment_start = chunk = None
+            continue
+        if segment_start is None:
+            segment_start = version
+        if chunk is None or chunk["nVersions"] >= max_versions:
+            chunk = {
+                "startVersion": segment_start,
+                "firstVersion": version,
+                "endVersion": version,
+                "nVersions": 0,
+                "nProofs": 0,
+            }
+            chunks.append(chunk)
+        chunk["endVersion"] = version
+        chunk["nVersions"] += 1
+        chunk["nProofs"] += proof_counts.get(version, 0)
+    return CompactionPlan(
+        {
+            "startVersion": start_version,
+            "endVersion": end_version,
+            "proofVersion": anchor["version"],
+            "proofId": anchor["proofId"],
+            "destroyProofs": destroy_proofs,
+            "chunks": chunks,
+        }
+    )
+
+
+def _read_checkpoint(path: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+def _write_checkpoint(
+    path: str, plan: CompactionPlan, progress: Dict[str, Any]
+) -> None:
+    # written to a temporary file first, so an interrupted write leaves the last checkpoint intact.
+    temporary = f"{path}.tmp"
+    with open(temporary, "w") as file:
+        json.dump({"plan": plan.to_json(), "progress": progress}, file)
+    os.replace(temporary, path)
+
+
+def run_compaction(
+    pdb: ProvenDB,
+    plan: Optional[CompactionPlan] = None,
+    checkpoint: Optional[str] = None,
+    latency_budget: float = 1.0,
+    pause_ratio: float = 1.0,
+    on_progress: Optional[Callable[[CompactionProgress], Any]] = None,
+) -> CompactionProgress:
+    """Compacts the chunks of a plan one at a time, leaving the database to other clients in between.
+
+    After each compact command the run sleeps for ``pause_ratio`` times as long as the command took,
+    so compaction uses at most half of the time by default. Commands taking longer than
+    ``latency_budget`` seconds make the following commands cover proportionally fewer versions,
+    and fast commands let them grow back to the planned chunks.
+
+    With a ``checkpoint`` file, progress is saved after every command. Running again with the same
+    checkpoint, with or without the plan, continues after the last compacted version.
+
+    :param pdb: The ProvenDB object of the database to compact.
+    :type pdb: ProvenDB
+    :param plan: The plan made by :func:`plan_compaction`, defaults to the plan saved in ``checkpoint``.
+    :type plan: Optional[CompactionPlan], optional
+    :param checkpoint: Path of a JSON file recording the plan and progress, defaults to none.
+    :type checkpoint: Optional[str], optional
+    :param latency_budget: Longest time in seconds a single compact command should take, defaults to 1.0
+    :type latency_budget: float, optional
+    :param pause_ratio: Time slept after each command, relative to the time it took, defaults to 1.0
+    :type pause_ratio: float, optional
+    :param on_progress: Called with the progress after every compact command.
+    :type on_progress: Optional[Callable[[CompactionProgress], Any]], optional
+    :raises CompactProofError: When ProvenDB no longer has a valid proof above a chunk.
+    :return: A dict-like object holding the cumulative deletion counts.
+    :rtype: CompactionProgress
+    """
+    saved = _read_checkpoint(checkpoint) if checkpoint else None
+    if plan is None:
+        if saved is None:
+            raise ValueError(
+                "A plan is required when there is no checkpoint to resume."
+            )
+        plan = CompactionPlan(saved["plan"])
+    progress: Dict[str, Any] = {
+        "startVersion": plan.startVersion,
+        "endVersion": plan.endVersion,
+        "completedThrough": None,
+        "nCommands": 0,
+        "nProofsDeleted": 0,
+        "nVersionsDeleted": 0,
+        "nDocumentsDeleted": 0,
+        "seconds": 0.0,
+    }
+    if saved is not None and saved["plan"] == plan.to_json():
+        progress.update(saved["progress"])
+
+    max_span: Optional[int] = None
+    for chunk in plan.chunks:
+        completed = progress["completedThrough"]
+        first = chunk.firstVersion
+        if completed is not None:
+            if completed >= chunk.endVersion:
+                continue
+            first = max(first, completed + 1)
+        while first <= chunk.endVersion:
+            end = chunk.endVersion
+            if max_span is not None:
+                end = min(end, first + max_span - 1)
+            started = time.perf_counter()
+            response = pdb.compact_versions(
+                chunk.startVersion, end, destroy_proofs=plan.destroyProofs or None
+            )
+            elapsed = time.perf_counter() - started
+            progress["completedThrough"] = end
+            progress["nCommands"] += 1
+            progress["nProofsDeleted"] += response.nProofsDeleted
+            progress["nVersionsDeleted"] += response.nVersionsDeleted
+            progress["nDocumentsDeleted"] += response.get("nDocumentsDeleted", 0)
+            progress["seconds"] += elapsed
+            if checkpoint:
+                _write_checkpoint(checkpoint, plan, progress)
+            if on_progress is not None:
+                on_progress(CompactionProgress(progress))
+            span = end - first + 1
+            if elapsed > latency_budget:
+                max_span = max(1, int(span * latency_budget / elapsed))
+            elif max_span is not None and elapsed < latency_budget / 2:
+                max_span *= 2
+            first = end + 1
+            if pause_ratio > 0:
+                time.sleep(elapsed * pause_ratio)
+    # versions after the last chunk are proven or no longer exist, so the range is complete.
+    if progress["completedThrough"] != plan.endVersion:
+        progress["completedThrough"] = plan.endVersion
+        if checkpoint:
+            _write_checkpoint(checkpoint, plan, progress)
+    return CompactionProgress(progress)
@@ -1,99 +1,280 @@
 from collections import UserDict
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
 import datetime
+import itertools
+import logging
+import time
 
 from pymongo.collection import Collection
 from pyproven import exceptions
-from pyproven.storage import ListStorageResponse
+from pyproven.cache import ProofCache, is_final_status
 
 from bson.son import SON
-from pyproven.proofs import (
-    GetDocumentProofResponse,
-    GetVersionProofResponse,
-    SubmitProofResponse,
-    VerifyProofResponse,
-    _process_document_proof,
-)
 
 
-from typing import Any, List, Optional, TypeVar, Union, Dict
+from typing import (
+    TYPE_CHECKING,
+    Any,
+    Callable,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Type,
+    TypeVar,
+    Union,
+    Dict,
+)
 
 from pymongo.database import Database as PymongoDatabase
 from pymongo.errors import PyMongoError
 
-from pyproven.history import DocumentHistoryResponse
-from pyproven.exceptions import (
-    BulkLoadAlreadyStartedError,
-    CompactProofError,
-    CompactValueError,
-    extract_error_info,
-)
-from pyproven.versions import (
-    GetVersionResponse,
-    SetVersionResponse,
-    CompactResponse,
-    ListVersionsResponse,
-)
-
-from pyproven.utilities import (
-    BulkLoadKillResponse,
-    BulkLoadStartResponse,
-    BulkLoadStatusResponse,
-    BulkLoadStopResponse,
-    CreateIgnoredResponse,
-    ExecuteForgetResponse,
-    HideMetadataResponse,
-    PrepareForgetResponse,
-    RollbackResponse,
-    ShowMetadataResponse,
-)
+from pyproven.exceptions import CompactValueError
+from pyproven.metrics import CommandTimer, MetricsSink
+from pyproven.retry import DEFAULT_RETRY, RetryPolicy, RetryState
 from pyproven.enums import BulkLoadEnums
 
 from bson import BSON
+from bson.objectid import ObjectId
+
+# the response classes are only needed for annotations here, and are imported by the methods
+# returning them, as are the columnar, compact, hashing and template modules, so importing
+# ProvenDB stays cheap.
+if TYPE_CHECKING:
+    from pyproven.columnar import Columns
+    from pyproven.history import DocumentHistoryResponse, DocumentHistoryVersion
+    from pyproven.proofs import (
+        GetDocumentProofResponse,
+        GetVersionProofResponse,
+        SubmitProofResponse,
+        VerifyProofResponse,
+    )
+    from pyproven.storage import ListStorageResponse
+    from pyproven.utilities import (
+        BulkIngestSummary,
+        BulkLoadKillResponse,
+        BulkLoadStartResponse,
+        BulkLoadStatusResponse,
+        BulkLoadStopResponse,
+        CreateIgnoredResponse,
+        ExecuteForgetResponse,
+        HideMetadataResponse,
+        PrepareForgetResponse,
+        RollbackResponse,
+        ShowMetadataResponse,
+    )
+    from pyproven.versions import (
+        CompactResponse,
+        GetVersionResponse,
+        ListVersionDocument,
+        ListVersionsResponse,
+        SetVersionResponse,
+        VersionChange,
+    )
+
+ResponseType = TypeVar("ResponseType")
+
+_logger = logging.getLogger(__name__)
+
+
+def _apply_provendb_hack(database: Any, kwargs: Dict[str, Any]) -> None:
+    """Encodes the commands sent to ``database`` with :func:`pyproven.provendb_hack.fix_op_msg`
+    when a client is constructed with ``provendb_hack=True``."""
+    if kwargs.get("provendb_hack"):
+        from pyproven.provendb_hack import install
+
+        install(database.client, database.name)
+
+
+def _batched(documents: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Any]]:
+    """Lazily splits an iterable of documents into lists of at most ``size`` documents."""
+    iterator = iter(documents)
+    while True:
+        batch = list(itertools.islice(iterator, size))
+        if not batch:
+            return
+        yield batch
 
 
-def _fix_op_msg(
-    flags, command, dbname, read_preference, slave_ok, check_keys, opts, ctx=None
-):
-    """Temporary hack to overwrite the _op_msg function in pymongo to work around a current bug with ProvenDB. This has been reported to the developers and should be fixed soon."""
-    import pymongo.message
-
-    command["$db"] = dbname
-    name = next(iter(command))
-    try:
-        identifier = pymongo.message._FIELD_MAP.get(name)
-        docs = command.pop(identifier)
-    except KeyError:
-        identifier = ""
-        docs = None
-    try:
-        if ctx:
-            return pymongo.message._op_msg_compressed(
-                flags, command, identifier, docs, check_keys, opts, ctx
+def _insert_batch(
+    collection: Collection,
+    batch: List[Dict[str, Any]],
+    ordered: bool,
+    metrics: Optional[MetricsSink],
+) -> Tuple[int, int]:
+    """Inserts a single batch, returning the number of documents and their encoded size in bytes.
+    Documents are encoded once, here, and sent as raw BSON, so their size is known without encoding
+    them again. As insert_many would, an ``_id`` is added first to documents without one.
+    """
+    from bson.raw_bson import RawBSONDocument
+
+    raws = []
+    for document in batch:
+        if not isinstance(document, RawBSONDocument):
+            if "_id" not in document:
+                document["_id"] = ObjectId()
+            document = RawBSONDocument(
+                BSON.encode(
+                    document, check_keys=True, codec_options=collection.codec_options
+                )
             )
-        return pymongo.message._op_msg_uncompressed(
-            flags, command, identifier, docs, check_keys, opts
-        )
-    finally:
-        # Add the field back to the command.
-        if identifier:
-            command[identifier] = docs
+        raws.append(document)
+    n_bytes = sum(len(document.raw) for document in raws)
+    with CommandTimer(metrics, "insert", n_bytes):
+        collection.insert_many(raws, ordered=ordered)
+    return len(raws), n_bytes
+
+
+def _doc_history_args(
+    collection: str, filter: Dict[str, Any], projection: Optional[Dict[str, Any]]
+) -> SON:
+    command_args = SON({"collection": collection, "filter": filter})
+    if projection:
+        command_args.update({"projection": projection})
+    return command_args
+
+
+def _document_proof_args(
+    collection: str, filter: Dict[str, Any], version: int, proof_format: Optional[str]
+) -> SON:
+    command_args = SON(
+        {
+            "collection": collection,
+            "filter": filter,
+            "version": version,
+        }
+    )
+    if proof_format:
+        command_args.update({"proofFormat": proof_format})
+    return command_args
+
+
+def _at_version_args(
+    filter: Optional[Dict[str, Any]], version: int, projection: Optional[Dict[str, Any]]
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """Returns the query and projection of a find for the documents that existed at a version."""
+    from pyproven.hashing import METADATA_FIELD
+
+    at_version: Dict[str, Any] = {
+        f"{METADATA_FIELD}.minVersion": {"$lte": version},
+        f"{METADATA_FIELD}.maxVersion": {"$gte": version},
+    }
+    query = {"$and": [filter, at_version]} if filter else at_version
+    # metadata is left out, unless asked for, as it would be when reading with setVersion.
+    if not projection:
+        projection = {METADATA_FIELD: 0}
+    elif not any(value for key, value in projection.items() if key != "_id"):
+        projection = dict(projection, **{METADATA_FIELD: 0})
+    return query, projection
+
+
+def _naive_utc(date: datetime.datetime) -> datetime.datetime:
+    """Returns a date as a naive UTC datetime, as pymongo decodes BSON dates by default,
+    so dates read with and without ``tz_aware`` codec options can be compared."""
+    if date.tzinfo is None:
+        return date
+    return date.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+
+
+def _list_versions_args(
+    start_date: Optional[datetime.datetime],
+    end_date: Optional[datetime.datetime],
+    limit: Optional[int],
+    sort_direction: Optional[int],
+) -> SON:
+    command_args = SON()
+    if start_date:
+        command_args.update({"startDate": start_date})
+    if end_date:
+        command_args.update({"endDate": end_date})
+    if limit:
+        command_args.update({"limit": limit})
+    if sort_direction:
+        command_args.update({"sortDirection": sort_direction})
+    return command_args
+
+
+def _version_range_filter(
+    span_start: Optional[int],
+    span_end: Optional[int],
+    min_version: Optional[int],
+    max_version: Optional[int],
+) -> Dict[str, Any]:
+    """Returns a filter on the ProvenDB metadata of document versions that started in
+    ``[span_start, span_end)`` and overlap ``[min_version, max_version]``, any bound may be None.
+    """
+    from pyproven.hashing import METADATA_FIELD
+
+    started: Dict[str, Any] = {}
+    if span_start is not None:
+        started["$gte"] = span_start
+    if span_end is not None:
+        started["$lt"] = span_end
+    if max_version is not None:
+        started["$lte"] = max_version
+    versions: Dict[str, Any] = {}
+    if started:
+        versions[f"{METADATA_FIELD}.minVersion"] = started
+    if min_version is not None:
+        versions[f"{METADATA_FIELD}.maxVersion"] = {"$gte": min_version}
+    return versions
 
 
 class ProvenDB:
     """Proven DB Database object that wraps the original pymongo Database object. """
 
-    def __init__(self, database: PymongoDatabase, *args, **kwargs):
-        """Constructor method"""
+    def __init__(
+        self,
+        database: PymongoDatabase,
+        *args,
+        proof_cache: Optional[ProofCache] = None,
+        compact: bool = False,
+        lazy: bool = False,
+        retry_policy: Optional[RetryPolicy] = None,
+        metrics: Optional[MetricsSink] = None,
+        **kwargs,
+    ):
+        """Constructor method
+
+        :param database: The pymongo database to wrap.
+        :type database: PymongoDatabase
+        :param proof_cache: Cache used by :meth:`get_version_proof` and :meth:`verify_proof`, defaults to no caching.
+        :type proof_cache: Optional[ProofCache], optional
+        :param compact: If True, commands with large responses return the compact, read-only
+                        classes of :mod:`pyproven.compact`, defaults to False.
+        :type compact: bool, optional
+        :param lazy: If True, commands with large responses are decoded lazily, see :meth:`_lazy_options`.
+                     Defaults to False.
+        :type lazy: bool, optional
+        :param retry_policy: Policy for retrying failed commands, defaults to :data:`pyproven.retry.DEFAULT_RETRY`,
+                             which retries idempotent reads on transient errors and runs every other command once.
+                             Pass :data:`pyproven.retry.NO_RETRY` to disable retries.
+        :type retry_policy: Optional[RetryPolicy], optional
+        :param metrics: Sink receiving the latency, sizes and errors of every command, see
+                        :class:`pyproven.metrics.InMemoryMetrics`. Defaults to no metrics.
+                        The insert batches of :meth:`bulk_ingest` are reported as 'insert'. Reads through
+                        cursors, as in :meth:`find_at_version`, :meth:`diff_versions` and :meth:`iter_doc_history`,
+                        are not measured; use :mod:`pymongo.monitoring` for those.
+        :type metrics: Optional[MetricsSink], optional
+        """
         self.db: PymongoDatabase = database
+        self.proof_cache: Optional[ProofCache] = proof_cache
+        self.compact: bool = compact
+        self.lazy: bool = lazy
+        self.retry_policy: RetryPolicy = retry_policy or DEFAULT_RETRY
+        self.metrics: Optional[MetricsSink] = metrics
+        #: Last version number the session was seen at, or None if unknown.
+        self.current_version: Optional[float] = None
+        # Either 'current', the version number the session is pinned to, or None if unknown.
+        self._version_setting: Union[None, str, int] = None
+        self._version_status: Optional[str] = None
+        self._set_version_response: Optional[SetVersionResponse] = None
         # hack to temp fix issue between pymongo and provendb instances.
         # TODO remove once fix is pushed to production provendbs.
-        try:
-            if kwargs["provendb_hack"]:
-                import pymongo.message
-
-                pymongo.message._op_msg = _fix_op_msg
-        except:
-            pass
+        _apply_provendb_hack(database, kwargs)
 
     def __getattr__(self, name: str) -> Any:
         """Calls :class:`pymongo.database.Database` object attribute or method when none could be found in self.
@@ -108,7 +289,201 @@ class ProvenDB:
     def __getitem__(self, name: Any) -> Collection:
         return self.db[name]
 
-    def bulk_load_start(self) -> BulkLoadStartResponse:
+    def _command(
+        self,
+        response_class: Callable[[Any], ResponseType],
+        command: Union[str, Dict[str, Any]],
+        value: Any = 1,
+        idempotent: Optional[bool] = None,
+        **kwargs: Any,
+    ) -> ResponseType:
+        """Runs a ProvenDB command on the wrapped database and wraps the result in a response class.
+        Every ProvenDB command issued by this object goes through this method.
+
+        Failed commands are retried according to :attr:`retry_policy`, and errors that match
+        a pyproven exception are raised as that exception, see :func:`pyproven.exceptions.translate_error`.
+        Commands are reported to :attr:`metrics` when it is set.
+
+        :param response_class: The response class, or any callable, used to wrap the returned document.
+        :type response_class: Callable[[Any], ResponseType]
+        :param command: Name of the command, or a command document, as accepted by :meth:`pymongo.database.Database.command`.
+        :type command: Union[str, Dict[str, Any]]
+        :param value: Value of the command when ``command`` is a string, defaults to 1
+        :type value: Any, optional
+        :param idempotent: Whether the command is safe to run more than once,
+                           defaults to :meth:`pyproven.retry.RetryPolicy.is_idempotent`.
+        :type idempotent: Optional[bool], optional
+        :return: The response document wrapped in ``response_class``.
+        :rtype: ResponseType
+        """
+        with CommandTimer.for_command(self.metrics, command, value) as timer:
+            timer.response = self._execute(command, value, idempotent, kwargs)
+        return response_class(timer.response)
+
+    def _execute(
+        self,
+        command: Union[str, Dict[str, Any]],
+        value: Any,
+        idempotent: Optional[bool],
+        kwargs: Dict[str, Any],
+    ) -> Any:
+        """Runs a command on the wrapped database, retrying it according to :attr:`retry_policy`."""
+        state = RetryState(self.retry_policy, command, idempotent)
+        while True:
+            try:
+                return self.db.command(command, value, **kwargs)
+            except PyMongoError as err:
+                delay = state.failed(err)
+            time.sleep(delay)
+
+    def _response_class(
+        self, response_class: Type[ResponseType], compact: Optional[bool]
+    ) -> Type[ResponseType]:
+        """Returns the compact counterpart of ``response_class`` when compact responses are requested
+        for this call, or for the client when ``compact`` is None."""
+        from pyproven.compact import COMPACT_RESPONSES
+
+        if self.compact if compact is None else compact:
+            return COMPACT_RESPONSES.get(response_class, response_class)  # type: ignore
+        return response_class
+
+    def _lazy_options(self, lazy: Optional[bool]) -> Dict[str, Any]:
+        """Returns the command options that decode a response lazily, when lazy decoding is requested
+        for this call, or for the client when ``lazy`` is None.
+
+        Lazy responses are read with :class:`bson.raw_bson.RawBSONDocument` codec options, so nested
+        documents such as :attr:`pyproven.history.DocumentHistoryVersion.document` or
+        :attr:`pyproven.proofs.SuccessfulDocumentProof.proof` stay as read-only raw BSON
+        and are only decoded when first accessed."""
+        from bson.raw_bson import RawBSONDocument
+
+        if self.lazy if lazy is None else lazy:
+            return {
+                "codec_options": self.db.codec_options.with_options(
+                    document_class=RawBSONDocument
+                )
+            }
+        return {}
+
+    def _track_version(
+        self, setting: Union[None, str, int], version: Optional[float], status=None
+    ) -> None:
+        """Records the version state of the session after a version changing command."""
+        self._version_setting = setting
+        self.current_version = version
+        self._version_status = status
+        self._set_version_response = None
+
+    @contextmanager
+    def at_version(
+        self, date: Union[str, int, datetime.datetime]
+    ) -> Iterator["SetVersionResponse"]:
+        """Context manager that sets the database version for the duration of the block,
+        restoring the previous version on exit. No setVersion command is sent when the
+        session is already pinned to the requested version.
+
+        .. code-block:: python
+
+            with pdb.at_version(5):
+                documents = list(pdb["collection"].find({}))
+
+        :param date: Version number, string literal 'current', or :class:`datetime.datetime` object.
+        :type date: Union[str,int,datetime]
+        :return: The response of the (possibly skipped) setVersion command.
+        :rtype: Iterator[SetVersionResponse]
+        """
+        if self._version_setting is None:
+            self.get_version()
+        previous = self._version_setting
+        response = self.set_version(date)
+        try:
+            yield response
+        finally:
+            if previous is not None and previous != self._version_setting:
+                self.set_version(previous)
+
+    def bulk_ingest(
+        self,
+        collection: Union[str, Collection],
+        documents: Iterable[Dict[str, Any]],
+        batch_size: int = 1000,
+        workers: int = 4,
+        ordered: bool = False,
+    ) -> "BulkIngestSummary":
+        """Inserts any iterable of documents inside a single bulk load, so the whole ingest creates one version.
+        Documents are consumed lazily and inserted in parallel batches, with at most ``2 * workers``
+        batches held in memory at once. The bulk load is stopped once every batch is inserted,
+        or killed if any batch fails or the ingest is interrupted.
+        See https://provendb.readme.io/docs/bulkload
+
+        :param collection: Name of the collection, or the collection object, to insert into.
+        :type collection: Union[str, Collection]
+        :param documents: Any iterable or generator of documents to insert.
+        :type documents: Iterable[Dict[str, Any]]
+        :param batch_size: Number of documents sent in each insert_many call, defaults to 1000
+        :type batch_size: int, optional
+        :param workers: Number of threads inserting batches concurrently, defaults to 4
+        :type workers: int, optional
+        :param ordered: Passed to :meth:`pymongo.collection.Collection.insert_many`, defaults to False
+        :type ordered: bool, optional
+        :raises BulkLoadAlreadyStartedError: When the database is already bulk loading.
+        :return: A dict-like object holding the bulk load version, document and byte counts and throughput.
+        :rtype: BulkIngestSummary
+        """
+        from pyproven.utilities import BulkIngestSummary
+
+        target = self.db[collection] if isinstance(collection, str) else collection
+        start_response = self.bulk_load_start()
+        n_documents = 0
+        n_bytes = 0
+        started = time.perf_counter()
+        try:
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                pending: Set[Future] = set()
+                try:
+                    for batch in _batched(documents, batch_size):
+                        if len(pending) >= 2 * workers:
+                            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                            for future in done:
+                                batch_documents, batch_bytes = future.result()
+                                n_documents += batch_documents
+                                n_bytes += batch_bytes
+                        pending.add(
+                            executor.submit(
+                                _insert_batch, target, batch, ordered, self.metrics
+                            )
+                        )
+                    for future in pending:
+                        batch_documents, batch_bytes = future.result()
+                        n_documents += batch_documents
+                        n_bytes += batch_bytes
+                except BaseException:
+                    for future in pending:
+                        future.cancel()
+                    raise
+        except BaseException as err:
+            try:
+                self.bulk_load_kill()
+            except Exception:
+                # the error that stopped the ingest is the one raised, the failed kill is only logged.
+                _logger.exception(
+                    "bulk_load_kill failed after bulk_ingest raised %r", err
+                )
+            raise
+        self.bulk_load_stop()
+        seconds = time.perf_counter() - started
+        return BulkIngestSummary(
+            {
+                "version": start_response.version,
+                "documentsInserted": n_documents,
+                "bytesInserted": n_bytes,
+                "seconds": seconds,
+                "documentsPerSecond": n_documents / seconds if seconds else 0.0,
+                "bytesPerSecond": n_bytes / seconds if seconds else 0.0,
+            }
+        )
+
+    def bulk_load_start(self) -> "BulkLoadStartResponse":
         """Starts a bulk load on the database. Bulk loads allow multiple inserts without incrementing the version.
         See https://provendb.readme.io/docs/bulkload
 
@@ -116,19 +491,16 @@ class ProvenDB:
         :return: A dict-like object that holds the current version.
         :rtype: BulkLoadStartResponse
         """
-        try:
-            response = self.db.command("bulkLoad", BulkLoadEnums.START.value)
-            return BulkLoadStartResponse(response)
-        except PyMongoError as err:
-            if (
-                extract_error_info(err)["errmsg"]
-                == "unable to start bulk load when bulk load already in progress"
-            ):
-                raise BulkLoadAlreadyStartedError(err) from None
-            else:
-                raise
+        from pyproven.templates import BULK_LOAD
+        from pyproven.utilities import BulkLoadStartResponse
+
+        response = self._command(
+            BulkLoadStartResponse, BULK_LOAD[BulkLoadEnums.START].command()
+        )
+        self._track_version("current", response.version)
+        return response
 
-    def bulk_load_stop(self) -> BulkLoadStopResponse:
+    def bulk_load_stop(self) -> "BulkLoadStopResponse":
         """Stops a bulk load on a database, failing if there is any outstanding operations.
         See https://provendb.readme.io/docs/bulkload
 
@@ -137,10 +509,14 @@ class ProvenDB:
         :return: A dict-like object representing the response from the database.
         :rtype: BulkLoadStopResponse
         """
-        response = self.db.command("bulkLoad", BulkLoadEnums.STOP.value)
-        return BulkLoadStopResponse(response)
+        from pyproven.templates import BULK_LOAD
+        from pyproven.utilities import BulkLoadStopResponse
 
-    def bulk_load_kill(self) -> BulkLoadKillResponse:
+        return self._command(
+            BulkLoadStopResponse, BULK_LOAD[BulkLoadEnums.STOP].command()
+        )
+
+    def bulk_load_kill(self) -> "BulkLoadKillResponse":
         """Stops a bulk load on a database, killing any remaining operations.
         See https://provendb.readme.io/docs/bulkload
 
@@ -149,10 +525,14 @@ class ProvenDB:
         :return: A dict-like object containing the response from the database.
         :rtype: BulkLoadKillResponse
         """
-        response = self.db.command("bulkLoad", BulkLoadEnums.KILL.value)
-        return BulkLoadKillResponse(response)
+        from pyproven.templates import BULK_LOAD
+        from pyproven.utilities import BulkLoadKillResponse
+
+        return self._command(
+            BulkLoadKillResponse, BULK_LOAD[BulkLoadEnums.KILL].command()
+        )
 
-    def bulk_load_status(self) -> BulkLoadStatusResponse:
+    def bulk_load_status(self) -> "BulkLoadStatusResponse":
         """Returns the current bulk load status of the database.
         See https://provendb.readme.io/docs/bulkload
 
@@ -160,15 +540,21 @@ class ProvenDB:
         :return: A dict-like object holding the current bulk load status of the database.
         :rtype: BulkLoadStatusResponse
         """
-        response = self.db.command("bulkLoad", BulkLoadEnums.STATUS.value)
-        return BulkLoadStatusResponse(response)
+        from pyproven.templates import BULK_LOAD
+        from pyproven.utilities import BulkLoadStatusResponse
+
+        return self._command(
+            BulkLoadStatusResponse,
+            BULK_LOAD[BulkLoadEnums.STATUS].command(),
+            idempotent=True,
+        )
 
     def compact_versions(
         self,
         start_version: int,
         end_version: int,
         destroy_proofs: Optional[bool] = None,
-    ) -> CompactResponse:
+    ) -> "CompactResponse":
         """Compacts all proofs, versions and documents in the db between two given versions,
         deleting all data that only exists between the two versions.
         See https://provendb.readme.io/docs/compact
@@ -181,23 +567,14 @@ class ProvenDB:
         :return: A dict-like object containing the number of deleted proofs, versions and documents.
         :rtype: CompactResponse
         """
+        from pyproven.versions import CompactResponse
+
         command_args = SON({"startVersion": start_version, "endVersion": end_version})
         if destroy_proofs:
             command_args.update({"destroyProofs": destroy_proofs})
-        try:
-            response = self.db.command("compact", command_args)
-            return CompactResponse(response)
-        except PyMongoError as err:
-            error_msg = extract_error_info(err)["errmsg"]
-            if (
-                error_msg
-                == "There must be a full proof above the range to be compacted"
-            ):
-                raise CompactProofError(err)
-            else:
-                raise
+        return self._command(CompactResponse, "compact", command_args)
 
-    def create_ignored(self, collection: str) -> CreateIgnoredResponse:
+    def create_ignored(self, collection: str) -> "CreateIgnoredResponse":
         """Sets a collection to be ignored; it will  be identical among versions, not include metadata,
         and not included in proofs.
         See https://provendb.readme.io/docs/ignored-collections
@@ -208,12 +585,140 @@ class ProvenDB:
         :raises CreateIgnoredException: pyproven exception when database fails to ignore the given collection.
         :rtype: CreateIgnoredResponse
         """
-        response = self.db.command("createIgnored", collection)
-        return CreateIgnoredResponse(response)
+        from pyproven.utilities import CreateIgnoredResponse
+
+        return self._command(CreateIgnoredResponse, "createIgnored", collection)
+
+    def diff_versions(
+        self,
+        collection: str,
+        from_version: int,
+        to_version: int,
+        filter: Optional[Dict[str, Any]] = None,
+        projection: Optional[Dict[str, Any]] = None,
+        batch_size: Optional[int] = None,
+    ) -> Iterator["VersionChange"]:
+        """Streams the documents of a collection that changed between two versions.
+        Only the versions of documents that start or end between the two versions are read,
+        selected by the minVersion and maxVersion of their ProvenDB metadata, so the cost grows
+        with the number of changes rather than the size of the collection. Versions whose
+        document hash is unchanged are skipped.
+        Like :meth:`find_at_version`, the metadata filter returns every version along with its metadata,
+        so the session version and :meth:`show_metadata` state are left unchanged.
+
+        :param collection: Name of the collection to compare.
+        :type collection: str
+        :param from_version: The version to compare from.
+        :type from_version: int
+        :param to_version: The version to compare to, which may be before ``from_version``.
+        :type to_version: int
+        :param filter: MongoDB filter limiting the documents compared, defaults to all documents.
+        :type filter: Optional[Dict[str, Any]], optional
+        :param projection: A projection applied by the server, defaults to all fields.
+                           The ProvenDB metadata is always included, and an excluded _id is
+                           only removed from 'before' and 'after'.
+        :type projection: Optional[Dict[str, Any]], optional
+        :param batch_size: Number of documents per batch of the underlying cursor, defaults to the server default.
+        :type batch_size: Optional[int], optional
+        :return: The changed documents, ordered by _id, with their metadata.
+        :rtype: Iterator[VersionChange]
+        """
+        from pyproven.hashing import METADATA_FIELD
+        from pyproven.versions import VersionChange
+
+        lower, upper = sorted((int(from_version), int(to_version)))
+        if lower == upper:
+            return
+        min_field = f"{METADATA_FIELD}.minVersion"
+        max_field = f"{METADATA_FIELD}.maxVersion"
+        changed = {
+            "$or": [
+                # versions that existed at the lower version and ended before the upper one.
+                {min_field: {"$lte": lower}, max_field: {"$gte": lower, "$lt": upper}},
+                # versions that started after the lower version and exist at the upper one.
+                {min_field: {"$gt": lower, "$lte": upper}, max_field: {"$gte": upper}},
+            ]
+        }
+        query = {"$and": [filter, changed]} if filter else changed
+        # _id and metadata pair the versions of each document, so neither is projected out
+        # by the server. An excluded _id is removed from the changes afterwards.
+        hide_id = projection is not None and not projection.get("_id", True)
+        if projection:
+            fields = {
+                key: value
+                for key, value in projection.items()
+                if key not in ("_id", METADATA_FIELD)
+            }
+            if any(fields.values()):
+                projection = dict(fields, **{"_id": 1, METADATA_FIELD: 1})
+            else:
+                projection = fields or None
+        reverse = from_version > to_version
+
+        def change(_id: Any, lower_doc: Any, upper_doc: Any) -> Optional[VersionChange]:
+            before, after = (
+                (upper_doc, lower_doc) if reverse else (lower_doc, upper_doc)
+            )
+            if before is None:
+                operation = "insert"
+            elif after is None:
+                operation = "delete"
+            elif before[METADATA_FIELD].get("hash") == after[METADATA_FIELD].get(
+                "hash"
+            ):
+                return None
+            else:
+                operation = "update"
+            if hide_id:
+                before, after = (
+                    (
+                        None
+                        if document is None
+                        else {
+                            key: item for key, item in document.items() if key != "_id"
+                        }
+                    )
+                    for document in (before, after)
+                )
+            return VersionChange(
+                {
+                    "_id": _id,
+                    "operationType": operation,
+                    "before": before,
+                    "after": after,
+                }
+            )
+
+        cursor = self.db[collection].find(query, projection).sort("_id", 1)
+        if batch_size:
+            cursor = cursor.batch_size(batch_size)
+        current: Any = None
+        lower_doc = upper_doc = None
+        for document in cursor:
+            if lower_doc is not None or upper_doc is not None:
+                if document["_id"] != current:
+                    result = change(current, lower_doc, upper_doc)
+                    if result is not None:
+                        yield result
+                    lower_doc = upper_doc = None
+            current = document["_id"]
+            if document[METADATA_FIELD]["minVersion"] <= lower:
+                lower_doc = document
+            else:
+                upper_doc = document
+        if lower_doc is not None or upper_doc is not None:
+            result = change(current, lower_doc, upper_doc)
+            if result is not None:
+                yield result
 
     def doc_history(
-        self, collection: str, filter: Dict[str, Any], projection: Dict[str, Any] = None
-    ) -> DocumentHistoryResponse:
+        self,
+        collection: str,
+        filter: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        compact: Optional[bool] = None,
+        lazy: Optional[bool] = None,
+    ) -> "DocumentHistoryResponse":
         """Returns the document history of a filtered collection.
         See https://provendb.readme.io/docs/dochistory
 
@@ -224,16 +729,183 @@ class ProvenDB:
         :param projection: A projection document that specifies fields to retrieve from documents.
                            defaults to returning all fields.
         :type projection: Dict[str,Any], optional
+        :param compact: If True return a compact, read-only response, defaults to the client setting.
+        :type compact: Optional[bool], optional
+        :param lazy: If True decode nested documents only when accessed, defaults to the client setting.
+        :type lazy: Optional[bool], optional
         :raises DocumentHistoryException: pyproven exception when ProvenDB fails to retrieve
                                           the given document history.
         :return: A dict-like object representing the ProvenDB return document.
         :rtype: DocumentHistoryResponse
         """
-        command_args = SON({"collection": collection, "filter": filter})
-        if projection:
-            command_args.update({"projection": projection})
-        response = self.db.command("docHistory", command_args)
-        return DocumentHistoryResponse(response)
+        from pyproven.history import DocumentHistoryResponse
+
+        return self._command(
+            self._response_class(DocumentHistoryResponse, compact),
+            "docHistory",
+            _doc_history_args(collection, filter, projection),
+            **self._lazy_options(lazy),
+        )
+
+    def doc_history_columns(
+        self,
+        collection: str,
+        filter: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+    ) -> "Columns":
+        """Returns the document history of a filtered collection as columns, one row per version,
+        without building response objects. See :func:`pyproven.columnar.history_columns`.
+
+        :param collection: Name of collection to find history.
+        :type collection: str
+        :param filter: MongoDB document filter to search for specific documents in the collection.
+        :type filter: Dict[str,Any]
+        :param projection: A projection document that specifies fields to retrieve from documents.
+        :type projection: Optional[Dict[str,Any]], optional
+        :rtype: Columns
+        """
+        from pyproven.columnar import history_columns
+
+        return self._command(
+            history_columns,
+            "docHistory",
+            _doc_history_args(collection, filter, projection),
+        )
+
+    def iter_doc_history(
+        self,
+        collection: str,
+        filter: Dict[str, Any],
+        projection: Optional[Dict[str, Any]] = None,
+        window_size: int = 100,
+        min_version: Optional[int] = None,
+        max_version: Optional[int] = None,
+        compact: Optional[bool] = None,
+        lazy: Optional[bool] = None,
+        version_span: Optional[int] = None,
+    ) -> Iterator[Tuple[Any, "DocumentHistoryVersion"]]:
+        """Streams the document history of a filtered collection in constant memory.
+        Instead of a single docHistory command, the matching documents are split into consecutive
+        ``_id`` ranges of ``window_size`` documents and a docHistory command is sent per range,
+        so only one window of history is held in memory.
+        The ranges cover the whole ``_id`` space, so deleted documents are included, and assume
+        that all ``_id`` values in the collection are of the same type.
+
+        A window still holds every version of its documents, so documents with many versions can make
+        a response reach the 16MB limit. ``version_span`` splits each window further, by the version
+        each document version started at, into spans of that many versions, with a docHistory command per span.
+        ``min_version`` and ``max_version`` are applied by the server too. When any of the three is given,
+        the filter is matched against each version rather than against any version of a document.
+        See https://provendb.readme.io/docs/dochistory
+
+        :param collection: Name of collection to find history.
+        :type collection: str
+        :param filter: MongoDB document filter to search for specific documents in the collection.
+        :type filter: Dict[str,Any]
+        :param projection: A projection document applied by the server, defaults to returning all fields.
+        :type projection: Optional[Dict[str,Any]], optional
+        :param window_size: Number of current documents whose history is fetched per command, defaults to 100
+        :type window_size: int, optional
+        :param min_version: Skip versions of documents that ended before this version, defaults to None
+        :type min_version: Optional[int], optional
+        :param max_version: Skip versions of documents that started after this version, defaults to None
+        :type max_version: Optional[int], optional
+        :param compact: If True yield compact, read-only versions, defaults to the client setting.
+        :type compact: Optional[bool], optional
+        :param lazy: If True decode nested documents only when accessed, defaults to the client setting.
+        :type lazy: Optional[bool], optional
+        :param version_span: Number of versions whose document versions are fetched per command,
+                             defaults to None for every version of a window at once.
+        :type version_span: Optional[int], optional
+        :return: (document _id, version) pairs, by ascending ``_id`` window, then by version span,
+                 so the versions of each document are in order.
+        :rtype: Iterator[Tuple[Any, DocumentHistoryVersion]]
+        """
+        spans: List[Tuple[Optional[int], Optional[int]]] = [(None, None)]
+        if version_span is not None:
+            first = min_version or 1
+            last = (
+                int(self.get_version().version) if max_version is None else max_version
+            )
+            # the first span takes versions started before min_version and the last any started
+            # after the current version, so every version is fetched exactly once.
+            cuts: List[Optional[int]] = list(
+                range(first + version_span, last + 1, version_span)
+            )
+            spans = list(zip([None] + cuts, cuts + [None]))
+        lower: Any = None
+        while True:
+            lower_filter = {} if lower is None else {"_id": {"$gt": lower}}
+            boundary = next(
+                self.db[collection]
+                .find({"$and": [filter, lower_filter]}, {"_id": 1})
+                .sort("_id", 1)
+                .skip(window_size - 1)
+                .limit(1),
+                None,
+            )
+            upper = None if boundary is None else boundary["_id"]
+            id_range = {}
+            if lower is not None:
+                id_range["$gt"] = lower
+            if upper is not None:
+                id_range["$lte"] = upper
+            for span_start, span_end in spans:
+                clauses = [filter]
+                if id_range:
+                    clauses.append({"_id": id_range})
+                versions = _version_range_filter(
+                    span_start, span_end, min_version, max_version
+                )
+                if versions:
+                    clauses.append(versions)
+                window = {"$and": clauses} if len(clauses) > 1 else filter
+                response = self.doc_history(
+                    collection, window, projection, compact, lazy
+                )
+                for item in response.history:
+                    for version in item.versions:
+                        if min_version is not None and version.maxVersion < min_version:
+                            continue
+                        if max_version is not None and version.minVersion > max_version:
+                            continue
+                        yield item._id, version
+            if upper is None:
+                return
+            lower = upper
+
+    def find_at_version(
+        self,
+        collection: str,
+        filter: Optional[Dict[str, Any]],
+        version: int,
+        projection: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Finds the documents of a collection as they were at a version, without sending setVersion.
+        The filter is combined with a filter on the version range in the ProvenDB metadata of each
+        document, so the session version is unchanged, and reads at many versions can run
+        concurrently on one client. Ignored collections have no metadata, so nothing is found in them.
+
+        .. code-block:: python
+
+            with ThreadPoolExecutor() as executor:
+                counts = executor.map(lambda v: len(list(pdb.find_at_version("orders", {}, v))), versions)
+
+        :param collection: Name of the collection to read.
+        :type collection: str
+        :param filter: MongoDB filter selecting the documents, applied to the documents at ``version``.
+        :type filter: Optional[Dict[str, Any]]
+        :param version: The version number to read at.
+        :type version: int
+        :param projection: A projection applied by the server, defaults to all fields except the ProvenDB metadata.
+        :type projection: Optional[Dict[str, Any]], optional
+        :param kwargs: Other arguments of :meth:`pymongo.collection.Collection.find`, e.g. sort or limit.
+        :return: A cursor over the matching documents at ``version``.
+        :rtype: pymongo.cursor.Cursor
+        """
+        query, projection = _at_version_args(filter, int(version), projection)
+        return self.db[collection].find(query, projection, **kwargs)
 
     def forget_prepare(
         self,
@@ -242,7 +914,7 @@ class ProvenDB:
         min_version: Optional[int] = None,
         max_version: Optional[int] = None,
         inclusive_range: Optional[bool] = None,
-    ) -> PrepareForgetResponse:
+    ) -> "PrepareForgetResponse":
         """Prepares an operation to forget a set of documents. This will erase the data but preserve hashes so as to verify proofs.
         See https://provendb.readme.io/docs/forget
 
@@ -260,6 +932,8 @@ class ProvenDB:
         :return: A dict-like object that holds the forget password as well as forget summary.
         :rtype: PrepareForgetResponse
         """
+        from pyproven.utilities import PrepareForgetResponse
+
         command_args = SON(
             {
                 "collection": collection,
@@ -272,10 +946,9 @@ class ProvenDB:
             command_args.update({"maxVersion": max_version})
         if inclusive_range:
             command_args.update({"inclusiveRange": inclusive_range})
-        response = self.db.command("forget", {"prepare": command_args})
-        return PrepareForgetResponse(response)
+        return self._command(PrepareForgetResponse, "forget", {"prepare": command_args})
 
-    def forget_execute(self, forget_id: int, password: str) -> ExecuteForgetResponse:
+    def forget_execute(self, forget_id: int, password: str) -> "ExecuteForgetResponse":
         """Executes a prepared forget operation, deleting data but preserving hashes.
         See https://provendb.readme.io/docs/forget
 
@@ -287,9 +960,10 @@ class ProvenDB:
         :return: A dict-like object returning the status and summary of the forget operation.
         :rtype: ExecuteForgetResponse
         """
+        from pyproven.utilities import ExecuteForgetResponse
+
         command_args = SON({"forgetId": forget_id, "password": password})
-        response = self.db.command("forget", {"execute": command_args})
-        return ExecuteForgetResponse(response)
+        return self._command(ExecuteForgetResponse, "forget", {"execute": command_args})
 
     def get_document_proof(
         self,
@@ -297,7 +971,9 @@ class ProvenDB:
         filter: Dict[str, Any],
         version: int,
         proof_format: Optional[str] = None,
-    ) -> GetDocumentProofResponse:
+        compact: Optional[bool] = None,
+        lazy: Optional[bool] = None,
+    ) -> "GetDocumentProofResponse":
         """Filters documents in a collection and returns any proofs of those documents for a given version.
         See: https://provendb.readme.io/docs/getdocumentproof
         :param collection: The name of the collection to filter.
@@ -308,39 +984,140 @@ class ProvenDB:
         :type version: int
         :param proof_format: The format of the proof, either 'binary' or 'json', defaults to "json"
         :type proof_format: str
+        :param compact: If True return a compact, read-only response, defaults to the client setting.
+        :type compact: Optional[bool], optional
+        :param lazy: If True decode nested documents only when accessed, defaults to the client setting.
+        :type lazy: Optional[bool], optional
         :raises GetDocumentProofException: [description]
         :return: A dict-like object containing an array of document proof documents.
         :rtype: GetDocumentProofResponse
         """
-        command_args = SON(
-            {
-                "collection": collection,
-                "filter": filter,
-                "version": version,
-            }
+        from pyproven.proofs import GetDocumentProofResponse
+
+        return self._command(
+            self._response_class(GetDocumentProofResponse, compact),
+            "getDocumentProof",
+            _document_proof_args(collection, filter, version, proof_format),
+            **self._lazy_options(lazy),
+        )
+
+    def get_document_proof_columns(
+        self,
+        collection: str,
+        filter: Dict[str, Any],
+        version: int,
+    ) -> "Columns":
+        """Returns the proofs of filtered documents for a given version as columns,
+        without building response objects. See :func:`pyproven.columnar.document_proof_columns`.
+
+        :param collection: The name of the collection to filter.
+        :type collection: str
+        :param filter: A mongodb filter that subsets the collection.
+        :type filter: Dict[str, Any]
+        :param version: The version number to fetch proofs for.
+        :type version: int
+        :rtype: Columns
+        """
+        from pyproven.columnar import document_proof_columns
+
+        return self._command(
+            document_proof_columns,
+            "getDocumentProof",
+            _document_proof_args(collection, filter, version, None),
         )
-        if proof_format:
-            command_args.update({"proofFormat": proof_format})
-        response = self.db.command("getDocumentProof", command_args)
-        return GetDocumentProofResponse(response)
 
-    def get_version(self) -> GetVersionResponse:
+    def get_document_proofs(
+        self,
+        requests: Iterable[Tuple[str, Dict[str, Any], int]],
+        proof_format: Optional[str] = None,
+        workers: int = 8,
+        compact: Optional[bool] = None,
+        lazy: Optional[bool] = None,
+    ) -> List["GetDocumentProofResponse"]:
+        """Runs :meth:`get_document_proof` for many (collection, filter, version) requests concurrently.
+        Duplicate requests are sent only once, and requests run on a bounded thread pool that shares
+        the connection pool of the underlying client.
+
+        :param requests: Iterable of (collection, filter, version) triples.
+        :type requests: Iterable[Tuple[str, Dict[str, Any], int]]
+        :param proof_format: The format of the proofs, either 'binary' or 'json', defaults to "json"
+        :type proof_format: Optional[str], optional
+        :param workers: Maximum number of getDocumentProof commands in flight at once, defaults to 8
+        :type workers: int, optional
+        :param compact: If True return a compact, read-only response, defaults to the client setting.
+        :type compact: Optional[bool], optional
+        :param lazy: If True decode nested documents only when accessed, defaults to the client setting.
+        :type lazy: Optional[bool], optional
+        :return: One response per request, in input order. Duplicate requests share the same response object.
+        :rtype: List[GetDocumentProofResponse]
+        """
+        keys: List[Tuple[str, bytes, int]] = []
+        unique: Dict[Tuple[str, bytes, int], Tuple[str, Dict[str, Any], int]] = {}
+        for collection, filter, version in requests:
+            key = (collection, BSON.encode(filter), version)
+            keys.append(key)
+            unique.setdefault(key, (collection, filter, version))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {
+                key: executor.submit(
+                    self.get_document_proof,
+                    collection,
+                    filter,
+                    version,
+                    proof_format,
+                    compact,
+                    lazy,
+                )
+                for key, (collection, filter, version) in unique.items()
+            }
+            responses = {key: future.result() for key, future in futures.items()}
+        return [responses[key] for key in keys]
+
+    def get_version(self, refresh: bool = False) -> "GetVersionResponse":
         """Gets the version the db is set to.
+        When the session is pinned to a fixed version by :meth:`set_version` the tracked version is
+        returned without querying the database.
         See https://provendb.readme.io/docs/getversion
 
+        :param refresh: If True always query the database, defaults to False
+        :type refresh: bool, optional
         :return: A dict-like object representing the ProvenDB return document.
         :raises GetVersionException: pyproven exception when db fails to return the current version.
         :rtype: GetVersionData
         """
-        response = self.db.command("getVersion", 1)
-        return GetVersionResponse(response)
+        from pyproven.templates import GET_VERSION
+        from pyproven.versions import GetVersionResponse
+
+        if (
+            not refresh
+            and self._version_setting not in (None, "current")
+            and self._version_status is not None
+        ):
+            return GetVersionResponse(
+                {
+                    "ok": 1,
+                    "response": f"The version is set to: {self._version_setting}",
+                    "version": self.current_version,
+                    "status": self._version_status,
+                }
+            )
+        response = self._command(GetVersionResponse, GET_VERSION.command())
+        if self._version_setting == "current" or "'current'" in response.response:
+            self._track_version("current", response.version, response.status)
+        else:
+            self._track_version(
+                int(response.version), response.version, response.status
+            )
+        return response
 
     def get_version_proof(
         self,
         proof_id: Union[str, int],
         proof_format: Optional[str] = None,
         list_collections: Optional[bool] = None,
-    ) -> GetVersionProofResponse:
+        compact: Optional[bool] = None,
+        lazy: Optional[bool] = None,
+    ) -> "GetVersionProofResponse":
         """Gets a proof for a specific database version.
         See https://provendb.readme.io/docs/getproof
 
@@ -350,19 +1127,39 @@ class ProvenDB:
         :type proof_format: str, optional
         :param list_collections: If True all collections in proof are listed, defaults to False.
         :type list_collections: bool, optional
+        :param compact: If True return a compact, read-only response, defaults to the client setting.
+        :type compact: Optional[bool], optional
+        :param lazy: If True decode nested documents only when accessed, defaults to the client setting.
+        :type lazy: Optional[bool], optional
         :raises GetVersionProofException:
         :return: A dict-like object holding an array of proofs.
         :rtype: GetVersionProofResponse
         """
-        command_args: SON = SON({"getProof": proof_id})
-        if proof_format:
-            command_args.update({"format": proof_format})
-        if list_collections:
-            command_args.update({"listCollections": list_collections})
-        response = self.db.command(command_args)
-        return GetVersionProofResponse(response)
+        from pyproven.proofs import GetVersionProofResponse
+        from pyproven.templates import get_proof_template
 
-    def list_storage(self) -> ListStorageResponse:
+        command_args = get_proof_template(proof_format, list_collections).command(
+            proof_id
+        )
+        response_class = self._response_class(GetVersionProofResponse, compact)
+        options = self._lazy_options(lazy)
+        if self.proof_cache is None:
+            return self._command(response_class, command_args, **options)
+        key = f"getProof:{proof_id!r}:{proof_format}:{list_collections}"
+        cached = self.proof_cache.get(key)
+        if cached is not None:
+            return response_class(cached)
+        response = self._command(response_class, command_args, **options)
+        # a later submitProof can add proofs to a version, so only proofId lookups are final.
+        final = (
+            isinstance(proof_id, str)
+            and bool(response.proofs)
+            and all(is_final_status(proof.get("status")) for proof in response.proofs)
+        )
+        self.proof_cache.set(key, response, final)
+        return response
+
+    def list_storage(self) -> "ListStorageResponse":
         """Fetches the storage size for each collection in the db.
         See https://provendb.readme.io/docs/liststorage
 
@@ -370,8 +1167,9 @@ class ProvenDB:
         each containg a single 'collection_name: collection_storage_size' key-value pair.
         :rtype: ListStorageResponse
         """
-        response = self.db.command("listStorage")
-        return ListStorageResponse(response)
+        from pyproven.storage import ListStorageResponse
+
+        return self._command(ListStorageResponse, "listStorage")
 
     def list_versions(
         self,
@@ -379,7 +1177,8 @@ class ProvenDB:
         end_date: Optional[datetime.datetime] = None,
         limit: Optional[int] = None,
         sort_direction: Optional[int] = None,
-    ) -> ListVersionsResponse:
+        compact: Optional[bool] = None,
+    ) -> "ListVersionsResponse":
         """Retrieves a list of versions given a search parameter.
         See https://provendb.readme.io/docs/listversions
 
@@ -391,66 +1190,204 @@ class ProvenDB:
         :type limit: Optional[int], optional
         :param sort_direction: -1 to retrieve versions in descending order, 1 ascending order. Defaults to -1.
         :type sort_direction: Optional[int], optional
+        :param compact: If True return a compact, read-only response, defaults to the client setting.
+        :type compact: Optional[bool], optional
         :raises ListVersionException: pyproven exception when fails to retrieve version list.
         :return: A dict-like object representing the ProvenDB response document.
         :rtype: ListVersionsResponse
         """
-        command_args = SON()
-        if start_date:
-            command_args.update({"startDate": start_date})
-        if end_date:
-            command_args.update({"endDate": end_date})
-        if limit:
-            command_args.update({"limit": limit})
-        if sort_direction:
-            command_args.update({"sortDirection": sort_direction})
-        response = self.db.command({"listVersions": command_args})
-        return ListVersionsResponse(response)
-
-    def rollback(self) -> RollbackResponse:
+        from pyproven.versions import ListVersionsResponse
+
+        return self._command(
+            self._response_class(ListVersionsResponse, compact),
+            {
+                "listVersions": _list_versions_args(
+                    start_date, end_date, limit, sort_direction
+                )
+            },
+        )
+
+    def list_versions_columns(
+        self,
+        start_date: Optional[datetime.datetime] = None,
+        end_date: Optional[datetime.datetime] = None,
+        limit: Optional[int] = None,
+        sort_direction: Optional[int] = None,
+    ) -> "Columns":
+        """Retrieves a list of versions as columns, without building response objects.
+        See :meth:`list_versions` and :func:`pyproven.columnar.version_columns`.
+
+        :rtype: Columns
+        """
+        from pyproven.columnar import version_columns
+
+        return self._command(
+            version_columns,
+            {
+                "listVersions": _list_versions_args(
+                    start_date, end_date, limit, sort_direction
+                )
+            },
+        )
+
+    def iter_versions(
+        self,
+        start_date: Optional[datetime.datetime] = None,
+        end_date: Optional[datetime.datetime] = None,
+        page_size: int = 1000,
+        sort_direction: int = 1,
+        compact: Optional[bool] = None,
+    ) -> Iterator["ListVersionDocument"]:
+        """Iterates over every version between two dates, paging through :meth:`list_versions` automatically.
+        Each page moves the date cursor to the effectiveDate of the last version received, and the
+        next page is fetched in the background while the current one is consumed. Versions sharing
+        a timestamp across a page boundary are neither duplicated nor skipped.
+        See https://provendb.readme.io/docs/listversions
+
+        :param start_date: First date to retrieve versions from, defaults to the server default.
+        :type start_date: Optional[datetime.datetime]
+        :param end_date: Last date to retrieve versions to, defaults to the server default.
+        :type end_date: Optional[datetime.datetime]
+        :param page_size: Number of versions requested per listVersions command, defaults to 1000
+        :type page_size: int, optional
+        :param sort_direction: 1 to iterate in ascending order, -1 in descending order. Defaults to 1.
+        :type sort_direction: int, optional
+        :param compact: If True yield compact, read-only versions, defaults to the client setting.
+        :type compact: Optional[bool], optional
+        :return: The version documents, in date order.
+        :rtype: Iterator[ListVersionDocument]
+        """
+        # BSON dates have millisecond precision, so stepping the cursor back by one millisecond
+        # always includes the boundary timestamp, whether the server bounds are inclusive or not.
+        step = datetime.timedelta(milliseconds=1)
+        ascending = sort_direction > 0
+        if start_date is not None:
+            start_date = _naive_utc(start_date)
+        if end_date is not None:
+            end_date = _naive_utc(end_date)
+
+        def fetch(cursor: Optional[datetime.datetime], limit: int) -> Any:
+            if ascending:
+                return self.list_versions(cursor, end_date, limit, 1, compact)
+            return self.list_versions(start_date, cursor, limit, -1, compact)
+
+        cursor = start_date if ascending else end_date
+        limit = page_size
+        # versions already yielded at or beyond the cursor, which the next page may return again.
+        seen: Dict[Any, datetime.datetime] = {}
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            page = fetch(cursor, limit)
+            while True:
+                versions = page["versions"]
+                new_versions = [
+                    version for version in versions if version["version"] not in seen
+                ]
+                for version in new_versions:
+                    seen[version["version"]] = _naive_utc(version["effectiveDate"])
+                # the server may return fewer versions than asked for, so only an empty page,
+                # a page of versions already yielded or a page past the end date ends the iteration.
+                next_page = None
+                if versions:
+                    last_date = _naive_utc(versions[-1]["effectiveDate"])
+                    next_cursor = last_date - step if ascending else last_date + step
+                    # a full page of one timestamp cannot move the cursor, so widen the page.
+                    stuck = next_cursor == cursor and len(versions) >= limit
+                    bound = end_date if ascending else start_date
+                    passed = bound is not None and (
+                        last_date > bound if ascending else last_date < bound
+                    )
+                    if (new_versions or stuck) and not passed:
+                        limit = limit * 2 if next_cursor == cursor else page_size
+                        cursor = next_cursor
+                        next_page = executor.submit(fetch, cursor, limit)
+                yield from new_versions
+                if next_page is None:
+                    return
+                seen = {
+                    number: date
+                    for number, date in seen.items()
+                    if (date >= next_cursor if ascending else date <= next_cursor)
+                }
+                page = next_page.result()
+
+    def rollback(self) -> "RollbackResponse":
         """Rolls back the database to the last valid version, cancelling any current insert, update or delete operations.
         See https://provendb.readme.io/docs/rollback
 
         :return: A dict-like object holding the 'db_name: db_version' pair the db has been rolled back to.
         :rtype: RollbackResponse
         """
-        response = self.db.command("rollback")
-        return RollbackResponse(response)
+        from pyproven.utilities import RollbackResponse
+
+        response = self._command(RollbackResponse, "rollback")
+        db_name = getattr(self.db, "name", None)
+        for rollback_version in response.version:
+            if db_name in rollback_version:
+                self._track_version("current", rollback_version[db_name])
+                break
+        else:
+            self._track_version(None, None)
+        return response
 
     def set_version(
-        self, date: Union[str, int, datetime.datetime]
-    ) -> SetVersionResponse:
+        self, date: Union[str, int, datetime.datetime], refresh: bool = False
+    ) -> "SetVersionResponse":
         """Sets the database version to a given version identifier.
+        Setting the version number the session is already pinned to returns the previous
+        response without sending the command again.
         See https://provendb.readme.io/docs/setversion
 
         :param date: Version number, string literal 'current', or :class:`datetime.datetime` object.
         :type date: Union[str,int,datetime]
+        :param refresh: If True always send the command to the database, defaults to False
+        :type refresh: bool, optional
         :raises SetVersionException: pyproven exception when db fails to set the given version.
         :return: A dict-like object representing the provenDB return document.
         :rtype: SetVersionData
         """
-        response = self.db.command("setVersion", date)
-        return SetVersionResponse(response)
+        from pyproven.templates import SET_VERSION
+        from pyproven.versions import SetVersionResponse
 
-    def show_metadata(self) -> ShowMetadataResponse:
+        if (
+            not refresh
+            and self._set_version_response is not None
+            and isinstance(date, (int, float))
+            and date == self._version_setting
+        ):
+            return self._set_version_response
+        response = self._command(SetVersionResponse, SET_VERSION.command(date))
+        if date == "current":
+            self._track_version("current", response.version, response.status)
+        else:
+            self._track_version(
+                int(response.version), response.version, response.status
+            )
+            self._set_version_response = response
+        return response
+
+    def show_metadata(self) -> "ShowMetadataResponse":
         """Causes the db to also show ProvenDB metadata on documents.
         See https://provendb.readme.io/docs/showmetadata
 
         :return: A dict-like object holding the 'ok' response from the database.
         :rtype: ShowMetadataResponse
         """
-        response = self.db.command("showMetadata", True)
-        return ShowMetadataResponse(response)
+        from pyproven.templates import SHOW_METADATA
+        from pyproven.utilities import ShowMetadataResponse
+
+        return self._command(ShowMetadataResponse, SHOW_METADATA.command())
 
-    def hide_metadata(self) -> HideMetadataResponse:
+    def hide_metadata(self) -> "HideMetadataResponse":
         """Causes the db to hide ProvenDB metadata on documents.
         See https://provendb.readme.io/docs/showmetadata
 
         :return: A dict-like object holding the 'ok' response from the database.
         :rtype: HideMetadataResponse
         """
-        response = self.db.command("showMetadata", False)
-        return HideMetadataResponse(response)
+        from pyproven.templates import HIDE_METADATA
+        from pyproven.utilities import HideMetadataResponse
+
+        return self._command(HideMetadataResponse, HIDE_METADATA.command())
 
     def submit_proof(
         self,
@@ -459,7 +1396,7 @@ class ProvenDB:
         filter: Optional[Dict[str, Any]] = None,
         anchor_type: Optional[str] = None,
         n_checks: Optional[int] = None,
-    ) -> SubmitProofResponse:
+    ) -> "SubmitProofResponse":
         """Creates a proof for a version and inserts it on the blockchain.
         See https://provendb.readme.io/docs/submitproof
 
@@ -476,6 +1413,8 @@ class ProvenDB:
         :return: A dict-like object holding the proof data.
         :rtype: SubmitProofResponse
         """
+        from pyproven.proofs import SubmitProofResponse
+
         command_args: SON = SON({"submitProof": version})
         if collections:
             command_args.update({"collections": collections})
@@ -485,12 +1424,11 @@ class ProvenDB:
             command_args.update({"anchorType": anchor_type})
         if n_checks:
             command_args.update({"nChecks": n_checks})
-        response = self.db.command(command_args)
-        return SubmitProofResponse(response)
+        return self._command(SubmitProofResponse, command_args)
 
     def verify_proof(
         self, proof_id: str, format: Optional[str] = None
-    ) -> VerifyProofResponse:
+    ) -> "VerifyProofResponse":
         """Verifies a proof previously uploaded to the blockchain.
         See https://provendb.readme.io/docs/verifyproof
 
@@ -501,8 +1439,16 @@ class ProvenDB:
         :return: A dict-like object holding the proof and proof information.
         :rtype: VerifyProofResponse
         """
-        command_args: SON = SON({"verifyProof": proof_id})
-        if format:
-            command_args.update({"format": format})
-        response = self.db.command(command_args)
-        return VerifyProofResponse(response)
+        from pyproven.proofs import VerifyProofResponse
+        from pyproven.templates import verify_proof_template
+
+        command_args = verify_proof_template(format).command(proof_id)
+        if self.proof_cache is None:
+            return self._command(VerifyProofResponse, command_args)
+        key = f"verifyProof:{proof_id!r}:{format}"
+        cached = self.proof_cache.get(key)
+        if cached is not None:
+            return VerifyProofResponse(cached)
+        response = self._command(VerifyProofResponse, command_args)
+        self.proof_cache.set(key, response, is_final_status(response.proofStatus))
+        return response
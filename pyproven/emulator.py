@@ -0,0 +1,1369 @@
+import datetime
+import hashlib
+import itertools
+import re
+import threading
+import time
+import zlib
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+import bson
+from bson import BSON
+from bson.codec_options import DEFAULT_CODEC_OPTIONS, CodecOptions
+from bson.int64 import Int64
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+from bson.son import SON
+from bson.timestamp import Timestamp
+from pymongo.errors import DuplicateKeyError, OperationFailure
+from pymongo.results import (
+    DeleteResult,
+    InsertManyResult,
+    InsertOneResult,
+    UpdateResult,
+)
+
+from pyproven.enums import BulkLoadEnums, ProofStatusEnums
+from pyproven.hashing import METADATA_FIELD
+from pyproven.utilities import VERSION_PROOFS_COLLECTION
+
+#: maxVersion of documents that are still current.
+MAX_VERSION = Int64(2**63 - 1)
+
+_COMMAND_NOT_FOUND = 59
+_BAD_VALUE = 2
+_DUPLICATE_KEY = 11000
+
+
+def _failure(errmsg: str, code: int = _BAD_VALUE) -> OperationFailure:
+    """Builds the error pymongo raises for a failed command."""
+    return OperationFailure(
+        errmsg, code, {"ok": 0.0, "errmsg": errmsg, "code": code, "codeName": ""}
+    )
+
+
+def _sha256(*parts: Union[str, bytes]) -> str:
+    digest = hashlib.sha256()
+    for part in parts:
+        digest.update(part.encode("utf-8") if isinstance(part, str) else part)
+    return digest.hexdigest()
+
+
+def _key(value: Any) -> Any:
+    """Returns a hashable key for an _id value."""
+    try:
+        hash(value)
+        return (type(value).__name__, value)
+    except TypeError:
+        return BSON.encode({"_id": value})
+
+
+class _Record:
+    """A single version of a document: its body and the range of versions it is visible in."""
+
+    __slots__ = ("raw", "_document", "min_version", "max_version", "hash", "forgotten")
+
+    def __init__(self, raw: bytes, min_version: int):
+        self.raw = raw
+        # decoded on first read, so bulk inserts only pay for encoding.
+        self._document: Optional[Dict[str, Any]] = None
+        self.min_version = min_version
+        self.max_version: int = MAX_VERSION
+        self.hash = hashlib.sha256(raw).hexdigest()
+        self.forgotten = False
+
+    @property
+    def document(self) -> Dict[str, Any]:
+        if self._document is None:
+            self._document = bson.decode(self.raw)
+        return self._document
+
+    @document.setter
+    def document(self, document: Dict[str, Any]) -> None:
+        self.raw = BSON.encode(document)
+        self._document = document
+
+    @property
+    def size(self) -> int:
+        return len(self.raw)
+
+    def visible(self, version: int) -> bool:
+        return self.min_version <= version <= self.max_version
+
+    def metadata(self) -> Dict[str, Any]:
+        metadata = {
+            "_id": self.document.get("_id"),
+            "minVersion": Int64(self.min_version),
+            "maxVersion": Int64(self.max_version),
+            "hash": self.hash,
+        }
+        if self.forgotten:
+            metadata["forgotten"] = True
+        return metadata
+
+
+# ---------------------------------------------------------------------------
+# query language
+
+
+_TYPE_ORDER = {
+    type(None): 1,
+    int: 2,
+    Int64: 2,
+    float: 2,
+    str: 3,
+    dict: 4,
+    SON: 4,
+    list: 5,
+    bytes: 6,
+    ObjectId: 7,
+    bool: 8,
+    datetime.datetime: 9,
+}
+
+
+def _sort_key(value: Any) -> Tuple[int, Any]:
+    order = _TYPE_ORDER.get(type(value), 10)
+    if order in (4, 5, 10):
+        return order, repr(value)
+    return order, value
+
+
+def _values(document: Any, path: Sequence[str]) -> List[Any]:
+    """Returns every value at a dotted path, traversing arrays like MongoDB does."""
+    if not path:
+        return [document]
+    if isinstance(document, Mapping):
+        if path[0] not in document:
+            return []
+        return _values(document[path[0]], path[1:])
+    if isinstance(document, list):
+        if path[0].isdigit():
+            index = int(path[0])
+            return _values(document[index], path[1:]) if index < len(document) else []
+        found = []
+        for item in document:
+            if isinstance(item, Mapping):
+                found.extend(_values(item, path))
+        return found
+    return []
+
+
+def _expand(values: List[Any]) -> List[Any]:
+    """Adds the elements of array values, which MongoDB also compares against."""
+    expanded = list(values)
+    for value in values:
+        if isinstance(value, list):
+            expanded.extend(value)
+    return expanded
+
+
+def _compare(value: Any, target: Any, operator: Callable[[Any, Any], bool]) -> bool:
+    if _sort_key(value)[0] != _sort_key(target)[0]:
+        return False
+    try:
+        return operator(value, target)
+    except TypeError:
+        return False
+
+
+_COMPARISONS: Dict[str, Callable[[Any, Any], bool]] = {
+    "$gt": lambda a, b: a > b,
+    "$gte": lambda a, b: a >= b,
+    "$lt": lambda a, b: a < b,
+    "$lte": lambda a, b: a <= b,
+}
+
+
+def _match_condition(values: List[Any], condition: Any) -> bool:
+    if not (
+        isinstance(condition, Mapping)
+        and condition
+        and all(key.startswith("$") for key in condition)
+    ):
+        return any(value == condition for value in _expand(values))
+    for operator, target in condition.items():
+        if operator == "$eq":
+            matched = any(value == target for value in _expand(values))
+        elif operator == "$ne":
+            matched = not any(value == target for value in _expand(values))
+        elif operator in _COMPARISONS:
+            matched = any(
+                _compare(value, target, _COMPARISONS[operator])
+                for value in _expand(values)
+            )
+        elif operator == "$in":
+            matched = any(value in target for value in _expand(values)) or (
+                not values and None in target
+            )
+        elif operator == "$nin":
+            matched = not any(value in target for value in _expand(values))
+        elif operator == "$exists":
+            matched = bool(values) == bool(target)
+        elif operator == "$not":
+            matched = not _match_condition(values, target)
+        elif operator == "$regex":
+            pattern = re.compile(target, _regex_flags(condition.get("$options", "")))
+            matched = any(
+                isinstance(value, str) and pattern.search(value) is not None
+                for value in _expand(values)
+            )
+        elif operator == "$options":
+            continue
+        elif operator == "$size":
+            matched = any(
+                isinstance(value, list) and len(value) == target for value in values
+            )
+        elif operator == "$all":
+            matched = all(
+                any(item == value for value in _expand(values)) for item in target
+            )
+        else:
+            raise _failure(f"unknown operator: {operator}")
+        if not matched:
+            return False
+    return True
+
+
+def _regex_flags(options: str) -> int:
+    flags = 0
+    for option, flag in (("i", re.I), ("m", re.M), ("s", re.S), ("x", re.X)):
+        if option in options:
+            flags |= flag
+    return flags
+
+
+def match(document: Mapping[str, Any], filter: Optional[Mapping[str, Any]]) -> bool:
+    """Returns True if a document matches a MongoDB query filter.
+
+    Supports field equality, dotted paths, and the ``$eq``, ``$ne``, ``$gt``, ``$gte``, ``$lt``, ``$lte``,
+    ``$in``, ``$nin``, ``$exists``, ``$not``, ``$regex``, ``$size``, ``$all``, ``$and``, ``$or`` and ``$nor`` operators.
+
+    :param document: The document to test.
+    :type document: Mapping[str, Any]
+    :param filter: A MongoDB query filter.
+    :type filter: Optional[Mapping[str, Any]]
+    :raises OperationFailure: When the filter uses an unsupported operator.
+    :rtype: bool
+    """
+    if not filter:
+        return True
+    for key, condition in filter.items():
+        if key == "$and":
+            if not all(match(document, item) for item in condition):
+                return False
+        elif key == "$or":
+            if not any(match(document, item) for item in condition):
+                return False
+        elif key == "$nor":
+            if any(match(document, item) for item in condition):
+                return False
+        elif key.startswith("$"):
+            raise _failure(f"unknown top level operator: {key}")
+        elif not _match_condition(_values(document, key.split(".")), condition):
+            return False
+    return True
+
+
+def _mentions_metadata(filter: Any) -> bool:
+    if isinstance(filter, Mapping):
+        return any(
+            key.startswith(METADATA_FIELD) or _mentions_metadata(value)
+            for key, value in filter.items()
+        )
+    if isinstance(filter, list):
+        return any(_mentions_metadata(item) for item in filter)
+    return False
+
+
+def _project(
+    document: Dict[str, Any], projection: Optional[Mapping[str, Any]]
+) -> Dict[str, Any]:
+    if not projection:
+        return document
+    if isinstance(projection, (list, tuple)):
+        projection = {field: 1 for field in projection}
+    include_id = bool(projection.get("_id", 1))
+    fields = {key: value for key, value in projection.items() if key != "_id"}
+    if fields and any(fields.values()):
+        projected: Dict[str, Any] = {}
+        if include_id and "_id" in document:
+            projected["_id"] = document["_id"]
+        for field in fields:
+            head, _, tail = field.partition(".")
+            if head not in document:
+                continue
+            if tail and isinstance(document[head], Mapping):
+                nested = _project(dict(document[head]), {tail: 1, "_id": 0})
+                if nested:
+                    projected.setdefault(head, {}).update(nested)
+            else:
+                projected[head] = document[head]
+        return projected
+    projected = dict(document)
+    if not include_id:
+        projected.pop("_id", None)
+    for field in fields:
+        projected.pop(field, None)
+    return projected
+
+
+def _apply_update(document: Dict[str, Any], update: Mapping[str, Any]) -> None:
+    """Applies $set, $unset, $inc, $push and $pull update operators in place."""
+    for operator, fields in update.items():
+        for path, value in fields.items():
+            *parents, last = path.split(".")
+            target = document
+            for part in parents:
+                target = target.setdefault(part, {})
+            if operator == "$set":
+                target[last] = value
+            elif operator == "$unset":
+                target.pop(last, None)
+            elif operator == "$inc":
+                target[last] = target.get(last, 0) + value
+            elif operator == "$push":
+                target.setdefault(last, []).append(value)
+            elif operator == "$pull":
+                target[last] = [item for item in target.get(last, []) if item != value]
+            else:
+                raise _failure(f"Unknown modifier: {operator}")
+
+
+# ---------------------------------------------------------------------------
+# collections
+
+
+class EmulatedCursor:
+    """Cursor over the documents of an :class:`EmulatedCollection` that match a filter."""
+
+    def __init__(
+        self,
+        collection: "EmulatedCollection",
+        filter: Optional[Mapping[str, Any]],
+        projection: Optional[Mapping[str, Any]],
+    ):
+        self._collection = collection
+        self._filter = filter
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._skip = 0
+        self._limit = 0
+        self._results: Optional[Iterator[Any]] = None
+
+    def sort(
+        self, key_or_list: Union[str, List[Tuple[str, int]]], direction: int = 1
+    ) -> "EmulatedCursor":
+        if isinstance(key_or_list, str):
+            self._sort = [(key_or_list, direction)]
+        else:
+            self._sort = list(key_or_list)
+        return self
+
+    def skip(self, skip: int) -> "EmulatedCursor":
+        self._skip = skip
+        return self
+
+    def limit(self, limit: int) -> "EmulatedCursor":
+        self._limit = limit
+        return self
+
+    def batch_size(self, batch_size: int) -> "EmulatedCursor":
+        return self
+
+    def _documents(self) -> Iterator[Any]:
+        documents: Iterable[Dict[str, Any]] = self._collection._find(self._filter)
+        if self._sort:
+            documents = list(documents)
+            for field, direction in reversed(self._sort):
+                path = field.split(".")
+                documents.sort(
+                    key=lambda document: _sort_key(
+                        (_values(document, path) or [None])[0]
+                    ),
+                    reverse=direction < 0,
+                )
+        stop = self._skip + self._limit if self._limit else None
+        for index, document in enumerate(documents):
+            if index < self._skip:
+                continue
+            if stop is not None and index >= stop:
+                break
+            yield _project(document, self._projection)
+
+    def __iter__(self) -> "EmulatedCursor":
+        return self
+
+    def __next__(self) -> Any:
+        if self._results is None:
+            # results are selected under the lock, so concurrent writes cannot change them mid-iteration.
+            with self._collection.database._lock:
+                documents = list(self._documents())
+            self._results = map(self._collection._output, documents)
+        return next(self._results)
+
+    def close(self) -> None:
+        self._results = iter(())
+
+
+class EmulatedCollection:
+    """Versioned collection of a :class:`ProvenDBEmulator`, with the subset of the
+    :class:`pymongo.collection.Collection` API pyproven uses."""
+
+    def __init__(
+        self,
+        database: "ProvenDBEmulator",
+        name: str,
+        codec_options: Optional[CodecOptions] = None,
+    ):
+        self.database = database
+        self.name = name
+        self.codec_options: CodecOptions = codec_options or database.codec_options
+        # document versions, oldest first, keyed by _id.
+        self._store: Dict[Any, List[_Record]] = database._collections.setdefault(
+            name, {}
+        )
+
+    @property
+    def full_name(self) -> str:
+        return f"{self.database.name}.{self.name}"
+
+    @property
+    def versioned(self) -> bool:
+        return self.database._versioned(self.name)
+
+    def with_options(
+        self, codec_options: Optional[CodecOptions] = None, **kwargs: Any
+    ) -> "EmulatedCollection":
+        return EmulatedCollection(self.database, self.name, codec_options)
+
+    def _output(self, document: Dict[str, Any]) -> Any:
+        return bson.decode(BSON.encode(document), self.codec_options)
+
+    def _visible(self, records: List[_Record], version: int) -> Optional[_Record]:
+        if not self.versioned:
+            return records[-1] if records[-1].max_version == MAX_VERSION else None
+        for record in reversed(records):
+            if record.visible(version):
+                return record
+            if record.max_version < version:
+                return None
+        return None
+
+    def _candidates(self, filter: Optional[Mapping[str, Any]]) -> List[List[_Record]]:
+        """Returns the documents a filter may match, looking them up by _id when the filter allows."""
+        selector = filter.get("_id") if filter else None
+        if selector is None:
+            return list(self._store.values())
+        if isinstance(selector, Mapping):
+            if set(selector) == {"$eq"}:
+                ids = [selector["$eq"]]
+            elif set(selector) == {"$in"}:
+                ids = list(selector["$in"])
+            else:
+                return list(self._store.values())
+        else:
+            ids = [selector]
+        candidates = []
+        for _id in ids:
+            records = self._store.get(_key(_id))
+            if records is not None:
+                candidates.append(records)
+        return candidates
+
+    def _find(self, filter: Optional[Mapping[str, Any]]) -> Iterator[Dict[str, Any]]:
+        database = self.database
+        if self.name == VERSION_PROOFS_COLLECTION:
+            database._settle_proofs()
+        show_metadata = database._show_metadata
+        if _mentions_metadata(filter):
+            # like ProvenDB, a filter on metadata searches every version of every document.
+            for history in list(self._store.values()):
+                for past in history:
+                    document = dict(past.document)
+                    document[METADATA_FIELD] = past.metadata()
+                    if match(document, filter):
+                        yield document
+            return
+        version = database._read_version()
+        for records in self._candidates(filter):
+            record = self._visible(records, version)
+            if record is None or not match(record.document, filter):
+                continue
+            if show_metadata:
+                document = dict(record.document)
+                document[METADATA_FIELD] = record.metadata()
+                yield document
+            else:
+                yield record.document
+
+    def find(
+        self,
+        filter: Optional[Mapping[str, Any]] = None,
+        projection: Optional[Mapping[str, Any]] = None,
+        **kwargs: Any,
+    ) -> EmulatedCursor:
+        return EmulatedCursor(self, filter, projection)
+
+    def find_one(
+        self,
+        filter: Optional[Mapping[str, Any]] = None,
+        projection: Optional[Mapping[str, Any]] = None,
+        **kwargs: Any,
+    ) -> Any:
+        return next(self.find(filter, projection).limit(1), None)
+
+    def count_documents(self, filter: Mapping[str, Any], **kwargs: Any) -> int:
+        with self.database._lock:
+            return sum(1 for _ in self._find(filter))
+
+    def _store_document(self, document: Any, version: int) -> Any:
+        if isinstance(document, RawBSONDocument):
+            raw = document.raw
+            _id = document["_id"]
+        else:
+            if "_id" not in document:
+                document["_id"] = ObjectId()
+            raw = BSON.encode(document)
+            _id = document["_id"]
+        key = _key(_id)
+        records = self._store.get(key)
+        if records is not None and self._visible(records, MAX_VERSION) is not None:
+            raise DuplicateKeyError(
+                f"E11000 duplicate key error collection: {self.full_name} index: _id_",
+                _DUPLICATE_KEY,
+            )
+        record = _Record(raw, version)
+        if records is None:
+            self._store[key] = [record]
+        else:
+            records.append(record)
+        return _id
+
+    def insert_one(self, document: Any, **kwargs: Any) -> InsertOneResult:
+        with self.database._lock:
+            version = self.database._write_version(self.name)
+            return InsertOneResult(self._store_document(document, version), True)
+
+    def insert_many(
+        self, documents: Iterable[Any], ordered: bool = True, **kwargs: Any
+    ) -> InsertManyResult:
+        inserted = []
+        error: Optional[DuplicateKeyError] = None
+        with self.database._lock:
+            version = self.database._write_version(self.name)
+            for document in documents:
+                try:
+                    inserted.append(self._store_document(document, version))
+                except DuplicateKeyError as err:
+                    error = err
+                    if ordered:
+                        break
+        if error is not None:
+            raise error
+        return InsertManyResult(inserted, True)
+
+    def _replace(
+        self, records: List[_Record], body: Dict[str, Any], version: int
+    ) -> None:
+        raw = BSON.encode(body)
+        current = records[-1]
+        if not self.versioned or current.min_version == version:
+            records[-1] = _Record(raw, current.min_version)
+        else:
+            current.max_version = version - 1
+            records.append(_Record(raw, version))
+
+    def _matching(self, filter: Mapping[str, Any], many: bool) -> List[List[_Record]]:
+        version = self.database._read_version()
+        matched = []
+        for records in self._candidates(filter):
+            record = self._visible(records, version)
+            if record is not None and match(record.document, filter):
+                matched.append(records)
+                if not many:
+                    break
+        return matched
+
+    def _update(
+        self,
+        filter: Mapping[str, Any],
+        update: Mapping[str, Any],
+        many: bool,
+        replace: bool,
+        upsert: bool,
+    ) -> UpdateResult:
+        matched = self._matching(filter, many)
+        if not matched and not upsert:
+            return UpdateResult({"n": 0, "nModified": 0}, True)
+        version = self.database._write_version(self.name)
+        for records in matched:
+            body = bson.decode(records[-1].raw)
+            if replace:
+                body = {"_id": body["_id"], **update}
+            else:
+                _apply_update(body, update)
+            self._replace(records, body, version)
+        if matched:
+            return UpdateResult({"n": len(matched), "nModified": len(matched)}, True)
+        body = {
+            key: value
+            for key, value in filter.items()
+            if not key.startswith("$") and not isinstance(value, Mapping)
+        }
+        if replace:
+            body.update(update)
+        else:
+            _apply_update(body, update)
+        upserted = self._store_document(body, version)
+        return UpdateResult({"n": 1, "nModified": 0, "upserted": upserted}, True)
+
+    def update_one(
+        self,
+        filter: Mapping[str, Any],
+        update: Mapping[str, Any],
+        upsert: bool = False,
+        **kwargs: Any,
+    ) -> UpdateResult:
+        with self.database._lock:
+            return self._update(filter, update, False, False, upsert)
+
+    def update_many(
+        self,
+        filter: Mapping[str, Any],
+        update: Mapping[str, Any],
+        upsert: bool = False,
+        **kwargs: Any,
+    ) -> UpdateResult:
+        with self.database._lock:
+            return self._update(filter, update, True, False, upsert)
+
+    def replace_one(
+        self,
+        filter: Mapping[str, Any],
+        replacement: Mapping[str, Any],
+        upsert: bool = False,
+        **kwargs: Any,
+    ) -> UpdateResult:
+        with self.database._lock:
+            return self._update(filter, replacement, False, True, upsert)
+
+    def _delete(self, filter: Mapping[str, Any], many: bool) -> DeleteResult:
+        matched = self._matching(filter, many)
+        if matched:
+            version = self.database._write_version(self.name)
+            for records in matched:
+                if self.versioned and records[-1].min_version != version:
+                    records[-1].max_version = version - 1
+                    continue
+                key = _key(records[-1].document["_id"])
+                # a version created by this same version, e.g. in a bulk load, is undone,
+                # keeping the versions before it.
+                records.pop()
+                if self.versioned and records:
+                    records[-1].max_version = version - 1
+                else:
+                    del self._store[key]
+        return DeleteResult({"n": len(matched)}, True)
+
+    def delete_one(self, filter: Mapping[str, Any], **kwargs: Any) -> DeleteResult:
+        with self.database._lock:
+            return self._delete(filter, False)
+
+    def delete_many(self, filter: Mapping[str, Any], **kwargs: Any) -> DeleteResult:
+        with self.database._lock:
+            return self._delete(filter, True)
+
+
+# ---------------------------------------------------------------------------
+# database
+
+
+class _Proof:
+    __slots__ = (
+        "proof_id",
+        "version",
+        "hash",
+        "submitted",
+        "status",
+        "full",
+        "collections",
+    )
+
+    def __init__(
+        self,
+        proof_id: str,
+        version: int,
+        hash: str,
+        submitted: float,
+        full: bool,
+        collections: List[str],
+    ):
+        self.proof_id = proof_id
+        self.version = version
+        self.hash = hash
+        self.submitted = submitted
+        self.status = ProofStatusEnums.PENDING.value
+        self.full = full
+        self.collections = collections
+
+    @property
+    def scope(self) -> str:
+        return "database" if self.full else "collection"
+
+
+class ProvenDBEmulator:
+    """In-process emulation of a ProvenDB database, which can be wrapped by
+    :class:`pyproven.database.ProvenDB` in place of a :class:`pymongo.database.Database`:
+
+    .. code-block:: python
+
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["collection"].insert_one({"x": 1})
+        pdb.submit_proof(pdb.get_version().version)
+
+    Every insert, update or delete increments the version, except during a bulk load where all writes
+    share the version the bulk load started at. Every version of every document is kept with
+    ``_provendb_metadata`` holding its version range and hash, the SHA-256 of its BSON encoding,
+    see :func:`pyproven.hashing.hash_document`. Reads see the version the session is set to, unless
+    the filter mentions ``_provendb_metadata``, in which case every version of every document is searched.
+    Such a docHistory filter returns only the versions it matches.
+
+    Proofs are stubs, with deterministic hashes and receipts that can be walked by
+    :func:`pyproven.receipts.evaluate_receipt`. They become valid ``proof_latency`` seconds after
+    submission, and are listed in the ``_provendb_versionProofs`` collection.
+    The emulator holds a single session, shared by every thread using it. Commands and collection
+    operations hold a lock while they run, so they can be called from several threads.
+
+    :param name: Name of the database, defaults to 'emulator'
+    :type name: str, optional
+    :param proof_latency: Seconds before a submitted proof becomes valid, defaults to 0.0
+    :type proof_latency: float, optional
+    :param clock: Returns the effective date of new versions, defaults to the current UTC time.
+    :type clock: Optional[Callable[[], datetime.datetime]], optional
+    """
+
+    def __init__(
+        self,
+        name: str = "emulator",
+        proof_latency: float = 0.0,
+        clock: Optional[Callable[[], datetime.datetime]] = None,
+    ):
+        self.name: str = name
+        self.codec_options: CodecOptions = DEFAULT_CODEC_OPTIONS
+        self.proof_latency: float = proof_latency
+        self._clock: Callable[[], datetime.datetime] = clock or datetime.datetime.utcnow
+        self._collections: Dict[str, Dict[Any, List[_Record]]] = {}
+        self._ignored = {VERSION_PROOFS_COLLECTION}
+        self._versions: Dict[int, datetime.datetime] = {}
+        self._version = 0
+        self._new_version()
+        # the version the session is pinned to, or None for the current version.
+        self._pinned: Optional[int] = None
+        self._show_metadata = False
+        self._bulk_load = False
+        self._proofs: Dict[str, _Proof] = {}
+        self._forgets: Dict[int, Tuple[str, List[Tuple[List[_Record], _Record]]]] = {}
+        # forget ids are never reused, even once a prepared forget has been executed.
+        self._forget_ids = itertools.count(1)
+        # nor are proof ids, so two proofs of the same version never collide.
+        self._proof_ids = itertools.count(1)
+        self._lock = threading.RLock()
+        self._commands: Dict[
+            str, Callable[[Any, Mapping[str, Any]], Dict[str, Any]]
+        ] = {
+            "getVersion": self._get_version,
+            "setVersion": self._set_version,
+            "bulkLoad": self._bulk_load_command,
+            "docHistory": self._doc_history,
+            "listVersions": self._list_versions,
+            "compact": self._compact,
+            "forget": self._forget,
+            "rollback": self._rollback,
+            "submitProof": self._submit_proof,
+            "getProof": self._get_proof,
+            "verifyProof": self._verify_proof,
+            "getDocumentProof": self._get_document_proof,
+            "showMetadata": self._show_metadata_command,
+            "createIgnored": self._create_ignored,
+            "listStorage": self._list_storage,
+        }
+
+    def __getitem__(self, name: str) -> EmulatedCollection:
+        return EmulatedCollection(self, name)
+
+    def __getattr__(self, name: str) -> EmulatedCollection:
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return EmulatedCollection(self, name)
+
+    def get_collection(
+        self, name: str, codec_options: Optional[CodecOptions] = None, **kwargs: Any
+    ) -> EmulatedCollection:
+        return EmulatedCollection(self, name, codec_options)
+
+    def list_collection_names(self, **kwargs: Any) -> List[str]:
+        with self._lock:
+            return [name for name, store in self._collections.items() if store]
+
+    def drop_collection(self, name: str, **kwargs: Any) -> None:
+        with self._lock:
+            self._collections.pop(name, None)
+
+    # -- versions --
+
+    def _new_version(self) -> int:
+        self._version += 1
+        date = self._clock().replace(tzinfo=None)
+        # dates are stored with millisecond precision, like BSON.
+        self._versions[self._version] = date.replace(
+            microsecond=date.microsecond // 1000 * 1000
+        )
+        return self._version
+
+    def _versioned(self, collection: str) -> bool:
+        return collection not in self._ignored
+
+    def _read_version(self) -> int:
+        return self._version if self._pinned is None else self._pinned
+
+    def _write_version(self, collection: str) -> int:
+        if not self._versioned(collection):
+            return 0
+        if self._pinned is not None:
+            raise _failure(
+                "Cannot modify data when the session is set to a historical version"
+            )
+        if self._bulk_load:
+            return self._version
+        return self._new_version()
+
+    def _version_for(self, date: Any) -> int:
+        if date == "current":
+            return self._version
+        if isinstance(date, datetime.datetime):
+            date = date.replace(tzinfo=None)
+            candidates = [
+                v for v, effective in self._versions.items() if effective <= date
+            ]
+            if not candidates:
+                raise _failure(f"No version exists at {date}")
+            return max(candidates)
+        version = int(date)
+        if version not in self._versions:
+            raise _failure(f"Version {version} does not exist")
+        return version
+
+    def _version_response(self) -> Dict[str, Any]:
+        if self._pinned is None:
+            return {
+                "ok": 1.0,
+                "response": "The version is set to: 'current'",
+                "version": Int64(self._version),
+                "status": "current",
+            }
+        return {
+            "ok": 1.0,
+            "response": f"The version is set to: {self._pinned}",
+            "version": Int64(self._pinned),
+            "status": "userDefined",
+        }
+
+    # -- command dispatch --
+
+    def command(
+        self,
+        command: Union[str, Mapping[str, Any]],
+        value: Any = 1,
+        codec_options: Optional[CodecOptions] = None,
+        **kwargs: Any,
+    ) -> Any:
+        """Runs a ProvenDB command, like :meth:`pymongo.database.Database.command`.
+
+        :raises OperationFailure: When the command fails or is not supported.
+        """
+        if isinstance(command, str):
+            name, arguments = command, {}
+        else:
+            name = next(iter(command))
+            value = command[name]
+            arguments = {key: item for key, item in command.items() if key != name}
+        handler = self._commands.get(name)
+        if handler is None:
+            raise _failure(f"no such command: '{name}'", _COMMAND_NOT_FOUND)
+        with self._lock:
+            response = handler(value, arguments)
+        if codec_options is not None and codec_options is not DEFAULT_CODEC_OPTIONS:
+            return bson.decode(BSON.encode(response), codec_options)
+        return response
+
+    def _get_version(self, value: Any, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        return self._version_response()
+
+    def _set_version(self, value: Any, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        version = self._version_for(value)
+        self._pinned = None if value == "current" else version
+        return self._version_response()
+
+    def _bulk_load_command(
+        self, value: Any, arguments: Mapping[str, Any]
+    ) -> Dict[str, Any]:
+        if value == BulkLoadEnums.START.value:
+            if self._bulk_load:
+                raise _failure(
+                    "unable to start bulk load when bulk load already in progress"
+                )
+            self._bulk_load = True
+            return {"ok": 1.0, "version": Int64(self._new_version())}
+        if value in (BulkLoadEnums.STOP.value, BulkLoadEnums.KILL.value):
+            if not self._bulk_load:
+                raise _failure("bulk load is not in progress")
+            self._bulk_load = False
+            return {"ok": 1.0}
+        if value == BulkLoadEnums.STATUS.value:
+            return {"ok": 1.0, "status": "on" if self._bulk_load else "off"}
+        raise _failure(f"Unknown bulkLoad option {value}")
+
+    def _started(self, version: int) -> Optional[datetime.datetime]:
+        return self._versions.get(version)
+
+    def _doc_history(self, value: Any, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        collection = EmulatedCollection(self, value["collection"])
+        filter = value.get("filter")
+        projection = value.get("projection")
+        # like find, a filter on metadata is matched against each version, so only matching versions
+        # are returned, otherwise every version of a document with a matching version is.
+        by_version = _mentions_metadata(filter)
+        history = []
+        for records in collection._store.values():
+            matching = [
+                record
+                for record in records
+                if match(
+                    (
+                        dict(record.document, **{METADATA_FIELD: record.metadata()})
+                        if by_version
+                        else record.document
+                    ),
+                    filter,
+                )
+            ]
+            if not matching:
+                continue
+            versions = []
+            for record in matching if by_version else records:
+                current = record.max_version == MAX_VERSION
+                versions.append(
+                    {
+                        "minVersion": Int64(record.min_version),
+                        "maxVersion": Int64(record.max_version),
+                        "status": "Current" if current else "Ended",
+                        "started": self._started(record.min_version),
+                        "ended": (
+                            None if current else self._started(record.max_version + 1)
+                        ),
+                        "document": _project(record.document, projection),
+                    }
+                )
+            history.append({"_id": records[-1].document["_id"], "versions": versions})
+        return {"ok": 1.0, "collection": collection.name, "history": history}
+
+    def _list_versions(
+        self, value: Any, arguments: Mapping[str, Any]
+    ) -> Dict[str, Any]:
+        start_date = value.get("startDate")
+        end_date = value.get("endDate")
+        direction = value.get("sortDirection", -1)
+        versions = [
+            (version, date)
+            for version, date in self._versions.items()
+            if (start_date is None or date >= start_date.replace(tzinfo=None))
+            and (end_date is None or date <= end_date.replace(tzinfo=None))
+        ]
+        versions.sort(reverse=direction < 0)
+        versions = versions[: value.get("limit", 10)]
+        return {
+            "ok": 1.0,
+            "versions": [
+                {
+                    "version": Int64(version),
+                    "status": "Current" if version == self._version else "Ended",
+                    "effectiveDate": date,
+                }
+                for version, date in versions
+            ],
+        }
+
+    def _compact(self, value: Any, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        start, end = int(value["startVersion"]), int(value["endVersion"])
+        if start < 1 or end < start or end >= self._version:
+            raise _failure("Invalid version range to compact")
+        self._settle_proofs()
+        if not any(
+            proof.full
+            and proof.version > end
+            and proof.status == ProofStatusEnums.VALID.value
+            for proof in self._proofs.values()
+        ):
+            raise _failure("There must be a full proof above the range to be compacted")
+        in_range = [
+            proof for proof in self._proofs.values() if start <= proof.version <= end
+        ]
+        if in_range and not value.get("destroyProofs"):
+            raise _failure("There are proofs in the range to be compacted")
+        for proof in in_range:
+            self._remove_proof(proof)
+        n_documents = 0
+        for name in list(self._collections):
+            if not self._versioned(name):
+                continue
+            for records in self._collections[name].values():
+                kept = [
+                    record
+                    for record in records
+                    if not (start <= record.min_version and record.max_version <= end)
+                ]
+                n_documents += len(records) - len(kept)
+                records[:] = kept
+            for key in [
+                key for key, records in self._collections[name].items() if not records
+            ]:
+                del self._collections[name][key]
+        n_versions = 0
+        for version in range(start, end + 1):
+            if self._versions.pop(version, None) is not None:
+                n_versions += 1
+        return {
+            "ok": 1.0,
+            "nProofsDeleted": len(in_range),
+            "nVersionsDeleted": n_versions,
+            "nDocumentsDeleted": n_documents,
+        }
+
+    def _forget(self, value: Any, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        if "prepare" in value:
+            return self._forget_prepare(value["prepare"])
+        if "execute" in value:
+            return self._forget_execute(value["execute"])
+        raise _failure("forget requires either prepare or execute")
+
+    def _forget_prepare(self, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        collection = EmulatedCollection(self, arguments["collection"])
+        min_version = arguments.get("minVersion", 0)
+        max_version = arguments.get("maxVersion", MAX_VERSION)
+        inclusive = arguments.get("inclusiveRange", True)
+        selected = []
+        for records in collection._store.values():
+            for record in records:
+                if record.forgotten or not match(record.document, arguments["filter"]):
+                    continue
+                if inclusive:
+                    # only versions of documents that exist entirely within the range.
+                    in_range = (
+                        min_version <= record.min_version
+                        and record.max_version <= max_version
+                    )
+                else:
+                    in_range = (
+                        record.min_version <= max_version
+                        and record.max_version >= min_version
+                    )
+                if in_range:
+                    selected.append((records, record))
+        forget_id = next(self._forget_ids)
+        password = _sha256("forget", str(forget_id), self.name)[:16]
+        self._forgets[forget_id] = (password, selected)
+        return {
+            "ok": 1.0,
+            "forgetId": Int64(forget_id),
+            "password": password,
+            "forgetSummary": {
+                "documentsToBeForgotten": len(selected),
+                "uniqueDocuments": len({id(records) for records, _ in selected}),
+            },
+        }
+
+    def _forget_execute(self, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        forget = self._forgets.pop(int(arguments["forgetId"]), None)
+        if forget is None:
+            raise _failure(f"No prepared forget with id {arguments['forgetId']}")
+        password, selected = forget
+        if arguments["password"] != password:
+            self._forgets[int(arguments["forgetId"])] = forget
+            raise _failure("Invalid password for forget")
+        for _, record in selected:
+            record.document = {"_id": record.document["_id"]}
+            record.forgotten = True
+        return {
+            "ok": 1.0,
+            "status": "Complete",
+            "forgetSummary": {
+                "documentsForgotten": len(selected),
+                "uniqueDocuments": len({id(records) for records, _ in selected}),
+            },
+        }
+
+    def _rollback(self, value: Any, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        self._bulk_load = False
+        self._pinned = None
+        return {"ok": 1.0, "version": [{self.name: Int64(self._version)}]}
+
+    # -- proofs --
+
+    def _version_hash(
+        self,
+        version: int,
+        collections: Optional[List[str]],
+        filter: Optional[Mapping[str, Any]],
+    ) -> str:
+        digest = hashlib.sha256(f"{self.name}:{version}".encode())
+        for name in sorted(collections or self._collections):
+            if not self._versioned(name):
+                continue
+            collection = EmulatedCollection(self, name)
+            hashes = sorted(
+                record.hash
+                for records in collection._store.values()
+                for record in [collection._visible(records, version)]
+                if record is not None and match(record.document, filter)
+            )
+            digest.update(name.encode())
+            for document_hash in hashes:
+                digest.update(document_hash.encode())
+        return digest.hexdigest()
+
+    def _receipt(self, start_hash: str, proof: _Proof) -> Dict[str, Any]:
+        return {
+            "@context": "https://w3id.org/chainpoint/v3",
+            "type": "Chainpoint",
+            "hash": start_hash,
+            "hash_id_node": proof.proof_id,
+            "branches": [
+                {
+                    "label": "provendb_emulator_branch",
+                    "ops": (
+                        []
+                        if start_hash == proof.hash
+                        else [{"r": proof.hash}, {"op": "sha-256"}]
+                    )
+                    + [
+                        {"l": _sha256("anchor", proof.proof_id)},
+                        {"op": "sha-256"},
+                        {"anchors": [{"type": "eth", "anchor_id": proof.proof_id}]},
+                    ],
+                }
+            ],
+        }
+
+    def _encode_proof(self, receipt: Dict[str, Any], format: Optional[str]) -> Any:
+        if format != "binary":
+            return receipt
+        try:
+            import msgpack  # type: ignore
+        except ImportError:
+            raise ImportError(
+                "msgpack is required to emulate binary proofs, request proofs in 'json' format instead."
+            ) from None
+        return zlib.compress(msgpack.packb(receipt))
+
+    def _settle_proofs(self) -> None:
+        deadline = time.monotonic() - self.proof_latency
+        for proof in self._proofs.values():
+            if (
+                proof.status == ProofStatusEnums.PENDING.value
+                and proof.submitted <= deadline
+            ):
+                proof.status = ProofStatusEnums.VALID.value
+                self[VERSION_PROOFS_COLLECTION].update_one(
+                    {"proofId": proof.proof_id}, {"$set": {"status": proof.status}}
+                )
+
+    def _remove_proof(self, proof: _Proof) -> None:
+        del self._proofs[proof.proof_id]
+        self[VERSION_PROOFS_COLLECTION].delete_one({"proofId": proof.proof_id})
+
+    def _submit_proof(self, value: Any, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        version = self._version_for(value)
+        collections = arguments.get("collections")
+        filter = arguments.get("filter")
+        version_hash = self._version_hash(version, collections, filter)
+        proof_id = _sha256("proof", version_hash, str(next(self._proof_ids)))[:24]
+        proof = _Proof(
+            proof_id,
+            version,
+            version_hash,
+            time.monotonic(),
+            not collections and not filter,
+            [
+                name
+                for name in collections or self.list_collection_names()
+                if self._versioned(name)
+            ],
+        )
+        self._proofs[proof_id] = proof
+        submitted = self._versions[version]
+        self[VERSION_PROOFS_COLLECTION].insert_one(
+            {
+                "proofId": proof_id,
+                "version": Int64(version),
+                "status": proof.status,
+                "hash": version_hash,
+                "submitted": submitted,
+                "scope": proof.scope,
+            }
+        )
+        return {
+            "ok": 1.0,
+            "version": Int64(version),
+            "dateTime": submitted,
+            "hash": version_hash,
+            "proofId": proof_id,
+            "status": proof.status,
+        }
+
+    def _version_proof(
+        self, proof: _Proof, format: Optional[str], list_collections: bool
+    ) -> Dict[str, Any]:
+        document: Dict[str, Any] = {
+            "_id": ObjectId(proof.proof_id),
+            "proofId": proof.proof_id,
+            "version": Int64(proof.version),
+            "status": proof.status,
+            "hash": proof.hash,
+            "scope": proof.scope,
+            "proof": self._encode_proof(self._receipt(proof.hash, proof), format),
+        }
+        if list_collections:
+            document["collections"] = [{"name": name} for name in proof.collections]
+        return document
+
+    def _get_proof(self, value: Any, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        self._settle_proofs()
+        if isinstance(value, str):
+            proofs = [self._proofs[value]] if value in self._proofs else []
+        else:
+            version = self._version_for(value)
+            proofs = [
+                proof for proof in self._proofs.values() if proof.version == version
+            ]
+        if not proofs:
+            raise _failure(f"No proof found for {value}")
+        return {
+            "ok": 1.0,
+            "proofs": [
+                self._version_proof(
+                    proof,
+                    arguments.get("format"),
+                    bool(arguments.get("listCollections")),
+                )
+                for proof in proofs
+            ],
+        }
+
+    def _verify_proof(self, value: Any, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        self._settle_proofs()
+        proof = self._proofs.get(value)
+        if proof is None:
+            raise _failure(f"No proof found for {value}")
+        return {
+            "ok": 1.0,
+            "proofId": proof.proof_id,
+            "proofStatus": proof.status,
+            "version": Int64(proof.version),
+            "proof": self._encode_proof(
+                self._receipt(proof.hash, proof), arguments.get("format")
+            ),
+        }
+
+    def _get_document_proof(
+        self, value: Any, arguments: Mapping[str, Any]
+    ) -> Dict[str, Any]:
+        self._settle_proofs()
+        version = int(value["version"])
+        collection = EmulatedCollection(self, value["collection"])
+        proof = next(
+            (
+                proof
+                for proof in self._proofs.values()
+                if proof.version == version
+                and proof.full
+                and proof.status == ProofStatusEnums.VALID.value
+            ),
+            None,
+        )
+        proofs: List[Dict[str, Any]] = []
+        for records in collection._store.values():
+            record = collection._visible(records, version)
+            if record is None or not match(record.document, value.get("filter")):
+                continue
+            if proof is None:
+                proofs.append(
+                    {"errmsg": f"No valid proof exists for version {version}"}
+                )
+                continue
+            proofs.append(
+                {
+                    "collection": collection.name,
+                    "scope": "document",
+                    "ProvenDbId": _sha256("document", record.hash)[:24],
+                    "documentId": str(record.document["_id"]),
+                    "version": Int64(version),
+                    "status": proof.status,
+                    "btcTransaction": _sha256("transaction", proof.proof_id),
+                    "btcBlockNumber": str(version),
+                    "versionProofId": proof.proof_id,
+                    "documentHash": record.hash,
+                    "versionHash": proof.hash,
+                    "proof": self._encode_proof(
+                        self._receipt(record.hash, proof), value.get("proofFormat")
+                    ),
+                }
+            )
+        return {"ok": 1.0, "proofs": proofs}
+
+    # -- other commands --
+
+    def _show_metadata_command(
+        self, value: Any, arguments: Mapping[str, Any]
+    ) -> Dict[str, Any]:
+        self._show_metadata = bool(value)
+        return {"ok": 1.0}
+
+    def _create_ignored(
+        self, value: Any, arguments: Mapping[str, Any]
+    ) -> Dict[str, Any]:
+        self._ignored.add(value)
+        now = int(time.time())
+        return {
+            "ok": 1.0,
+            "$clusterTime": {
+                "clusterTime": Timestamp(now, 1),
+                "signature": {"hash": bytes(20), "keyId": Int64(0)},
+            },
+            "operationTime": Timestamp(now, 1),
+        }
+
+    def _list_storage(self, value: Any, arguments: Mapping[str, Any]) -> Dict[str, Any]:
+        return {
+            "ok": 1.0,
+            "storageList": [
+                {
+                    name: sum(
+                        record.size for records in store.values() for record in records
+                    )
+                }
+                for name, store in self._collections.items()
+            ],
+        }
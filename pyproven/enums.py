@@ -6,3 +6,29 @@ class BulkLoadEnums(Enum):
     STOP = "stop"
     KILL = "kill"
     STATUS = "status"
+
+
+class ProofStatusEnums(Enum):
+    PENDING = "pending"
+    SUBMITTED = "submitted"
+    VALID = "valid"
+    INVALID = "invalid"
+    FAILED = "failed"
+
+
+class ErrorClassEnums(Enum):
+    #: The server is not, or is no longer, primary and rejected the command without running it.
+    NOT_PRIMARY = "not_primary"
+    #: No suitable server could be selected, so the command was never sent.
+    SERVER_SELECTION = "server_selection"
+    #: The command was interrupted by a step down or shutdown and may have partly run.
+    INTERRUPTED = "interrupted"
+    #: The connection failed or timed out and the outcome of the command is unknown.
+    NETWORK = "network"
+    #: The command exceeded its server side time limit.
+    TIMEOUT = "timeout"
+    BULK_LOAD_ALREADY_STARTED = "bulk_load_already_started"
+    COMPACT_PROOF = "compact_proof"
+    #: Any other error returned by the server.
+    COMMAND = "command"
+    UNKNOWN = "unknown"
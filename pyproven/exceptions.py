@@ -1,23 +1,129 @@
-from typing import List
+from typing import Any, Dict, Optional
 
-from pymongo.errors import PyMongoError
+from pymongo.errors import (
+    ConnectionFailure,
+    ExecutionTimeout,
+    NotPrimaryError,
+    OperationFailure,
+    PyMongoError,
+    ServerSelectionTimeoutError,
+)
 
+from pyproven.enums import ErrorClassEnums
 
-def extract_error_info(err: PyMongoError):
-    """Attempts to extract error fields from the Pymongo document."""
-    error_doc: List[str] = err._message.split("{")[1].split("}")[0].split(",")
-    ok: int = int(error_doc[0].split(": ")[1])
-    errmsg: str = error_doc[1].split(": ")[1].lstrip('"').rstrip('"')
-    code: int = int(error_doc[2].split(": ")[1])
-    codeName: str = error_doc[3].split(": ")[1].lstrip('"').rstrip('"')
-    return {"ok": ok, "errmsg": errmsg, "code": code, "codeName": codeName}
+# server codes for commands rejected because the node is not primary, the command never ran.
+NOT_PRIMARY_CODES = frozenset((10107, 13435, 13436, 10058))
+# server codes for commands interrupted by an election or shutdown, the command may have partly run.
+INTERRUPTED_CODES = frozenset((11600, 11602, 189, 91))
+# server codes for network failures between cluster members.
+NETWORK_CODES = frozenset((6, 7, 89, 9001, 262))
+TIMEOUT_CODES = frozenset((50,))
+
+#: Error classes worth retrying, as they are caused by failovers or network failures.
+TRANSIENT_ERRORS = frozenset(
+    (
+        ErrorClassEnums.NOT_PRIMARY,
+        ErrorClassEnums.SERVER_SELECTION,
+        ErrorClassEnums.INTERRUPTED,
+        ErrorClassEnums.NETWORK,
+    )
+)
+#: Transient error classes where the command is known not to have run.
+UNSENT_ERRORS = frozenset(
+    (ErrorClassEnums.NOT_PRIMARY, ErrorClassEnums.SERVER_SELECTION)
+)
+
+_ERROR_MESSAGES = {
+    "unable to start bulk load when bulk load already in progress": ErrorClassEnums.BULK_LOAD_ALREADY_STARTED,
+    "There must be a full proof above the range to be compacted": ErrorClassEnums.COMPACT_PROOF,
+}
+
+
+def extract_error_info(err: PyMongoError) -> Dict[str, Any]:
+    """Extracts the error fields returned by the server from a Pymongo error.
+
+    :param err: The error raised by pymongo.
+    :type err: PyMongoError
+    :return: The 'ok', 'errmsg', 'code' and 'codeName' fields. Errors that did not come from the
+             server, such as network errors, have 'ok' 0, their message as 'errmsg' and no code.
+    :rtype: Dict[str, Any]
+    """
+    details: Optional[Dict[str, Any]] = getattr(err, "details", None)
+    if not details:
+        return {
+            "ok": 0,
+            "errmsg": str(err),
+            "code": getattr(err, "code", None),
+            "codeName": None,
+        }
+    return {
+        "ok": details.get("ok", 0),
+        "errmsg": details.get("errmsg", str(err)),
+        "code": details.get("code", getattr(err, "code", None)),
+        "codeName": details.get("codeName"),
+    }
+
+
+def classify_error(err: PyMongoError) -> ErrorClassEnums:
+    """Classifies a Pymongo error from its type, server error code and error message.
+
+    :param err: The error raised by pymongo.
+    :type err: PyMongoError
+    :rtype: ErrorClassEnums
+    """
+    if isinstance(err, PyProvenError):
+        error_class = _PYPROVEN_ERRORS.get(type(err))
+        if error_class is not None:
+            return error_class
+    if isinstance(err, NotPrimaryError):
+        return ErrorClassEnums.NOT_PRIMARY
+    if isinstance(err, ServerSelectionTimeoutError):
+        return ErrorClassEnums.SERVER_SELECTION
+    if isinstance(err, ConnectionFailure):
+        return ErrorClassEnums.NETWORK
+    if isinstance(err, ExecutionTimeout):
+        return ErrorClassEnums.TIMEOUT
+    code = getattr(err, "code", None)
+    if code in NOT_PRIMARY_CODES:
+        return ErrorClassEnums.NOT_PRIMARY
+    if code in INTERRUPTED_CODES:
+        return ErrorClassEnums.INTERRUPTED
+    if code in NETWORK_CODES:
+        return ErrorClassEnums.NETWORK
+    if code in TIMEOUT_CODES:
+        return ErrorClassEnums.TIMEOUT
+    if isinstance(err, OperationFailure):
+        return _ERROR_MESSAGES.get(
+            extract_error_info(err)["errmsg"], ErrorClassEnums.COMMAND
+        )
+    return ErrorClassEnums.UNKNOWN
+
+
+def translate_error(err: PyMongoError) -> PyMongoError:
+    """Returns the pyproven exception matching a Pymongo error, or the error itself if there is none.
+
+    :param err: The error raised by pymongo.
+    :type err: PyMongoError
+    :rtype: PyMongoError
+    """
+    if isinstance(err, PyProvenError):
+        return err
+    error_type = _ERROR_TYPES.get(classify_error(err))
+    if error_type is None:
+        return err
+    return error_type(err)
 
 
 class PyProvenError(PyMongoError):
-    """Base class for all pyproven exceptions."""
+    """Base class for all pyproven exceptions.
+
+    The server error code and details of the original error are kept when it has them.
+    """
 
     def __init__(self, err: PyMongoError):
         super().__init__(message=err._message, error_labels=err._error_labels)
+        self.code: Optional[int] = getattr(err, "code", None)
+        self.details: Optional[Dict[str, Any]] = getattr(err, "details", None)
 
 
 class BulkLoadAlreadyStartedError(PyProvenError):
@@ -35,3 +141,12 @@ class CompactValueError(CompactError):
 
 class CompactProofError(CompactError):
     """Error raised when a proof doesn't exist above the compact range."""
+
+
+_ERROR_TYPES = {
+    ErrorClassEnums.BULK_LOAD_ALREADY_STARTED: BulkLoadAlreadyStartedError,
+    ErrorClassEnums.COMPACT_PROOF: CompactProofError,
+}
+_PYPROVEN_ERRORS = {
+    error_type: error_class for error_class, error_type in _ERROR_TYPES.items()
+}
@@ -0,0 +1,225 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Set,
+    Tuple,
+    Union,
+)
+
+from pyproven.database import ProvenDB
+from pyproven.response import ProvenDocument
+
+#: Databases of a MongoClient that are never part of a fleet.
+SYSTEM_DATABASES = frozenset(("admin", "config", "local"))
+
+
+class FleetResult(ProvenDocument):
+    """Dict-like outcome of a ProvenDB method on one database of a :class:`ProvenDBFleet`,
+    holding either its 'result' or the 'error' it raised."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.database: str = self["database"]
+        self.result: Any = self["result"]
+        self.error: Optional[BaseException] = self["error"]
+        self.seconds: float = self["seconds"]
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+    def unwrap(self) -> Any:
+        """Returns the result, or raises the error of the method.
+
+        :rtype: Any
+        """
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+
+class ProvenDBFleet:
+    """Runs ProvenDB methods across many databases of one client concurrently, for deployments
+    with a ProvenDB database per tenant. One :class:`pyproven.database.ProvenDB` is kept per database,
+    and all of them share the connection pool of the client. Results stream back as they complete:
+
+    .. code-block:: python
+
+        with ProvenDBFleet(MongoClient(uri), max_workers=32) as fleet:
+            for outcome in fleet.run(lambda pdb: pdb.submit_proof(pdb.get_version().version)):
+                if not outcome.ok:
+                    log.error("%s: %s", outcome.database, outcome.error)
+
+    :param client: The client, usually a :class:`pymongo.mongo_client.MongoClient`, holding the databases.
+    :type client: Any
+    :param databases: Names of the databases in the fleet, defaults to every database of the client
+                      except admin, config and local, listed on first use.
+    :type databases: Optional[Iterable[str]], optional
+    :param max_workers: Most methods running at once, defaults to the smaller of 32 and the
+                        connection pool size of the client.
+    :type max_workers: Optional[int], optional
+    :param provendb_kwargs: Keyword arguments of every :class:`pyproven.database.ProvenDB`, e.g. retry_policy or metrics.
+    """
+
+    def __init__(
+        self,
+        client: Any,
+        databases: Optional[Iterable[str]] = None,
+        max_workers: Optional[int] = None,
+        **provendb_kwargs: Any,
+    ):
+        if max_workers is None:
+            options = getattr(client, "options", None)
+            pool_size = getattr(
+                getattr(options, "pool_options", None), "max_pool_size", None
+            )
+            max_workers = min(32, pool_size or 32)
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1.")
+        self.client: Any = client
+        self.max_workers: int = max_workers
+        self._databases: Optional[List[str]] = (
+            None if databases is None else list(databases)
+        )
+        self._provendb_kwargs = provendb_kwargs
+        self._lock = threading.Lock()
+        self._pdbs: Dict[str, ProvenDB] = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="pyproven-fleet"
+        )
+
+    def __enter__(self) -> "ProvenDBFleet":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @property
+    def databases(self) -> List[str]:
+        """Names of the databases in the fleet.
+
+        :rtype: List[str]
+        """
+        if self._databases is None:
+            self._databases = [
+                name
+                for name in self.client.list_database_names()
+                if name not in SYSTEM_DATABASES
+            ]
+        return self._databases
+
+    def provendb(self, database: str) -> ProvenDB:
+        """Returns the ProvenDB object of a database, created on first use and reused afterwards.
+
+        :param database: Name of the database.
+        :type database: str
+        :rtype: ProvenDB
+        """
+        pdb = self._pdbs.get(database)
+        if pdb is None:
+            with self._lock:
+                pdb = self._pdbs.get(database)
+                if pdb is None:
+                    pdb = ProvenDB(self.client[database], **self._provendb_kwargs)
+                    self._pdbs[database] = pdb
+        return pdb
+
+    def _call(
+        self,
+        database: str,
+        method: Union[str, Callable[..., Any]],
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+    ) -> FleetResult:
+        started = time.perf_counter()
+        result = error = None
+        try:
+            pdb = self.provendb(database)
+            if isinstance(method, str):
+                result = getattr(pdb, method)(*args, **kwargs)
+            else:
+                result = method(pdb, *args, **kwargs)
+        except Exception as err:
+            error = err
+        return FleetResult(
+            {
+                "database": database,
+                "result": result,
+                "error": error,
+                "seconds": time.perf_counter() - started,
+            }
+        )
+
+    def run(
+        self,
+        method: Union[str, Callable[..., Any]],
+        *args: Any,
+        databases: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> Iterator[FleetResult]:
+        """Runs a ProvenDB method on every database, yielding each outcome as soon as it completes.
+        At most :attr:`max_workers` methods run at once, and errors are returned rather than raised,
+        so one failing database does not stop the others. Databases not yet started are skipped
+        if the iterator is closed early.
+
+        :param method: Name of a :class:`pyproven.database.ProvenDB` method, e.g. 'get_version',
+                       or a callable taking the ProvenDB object as its first argument.
+        :type method: Union[str, Callable[..., Any]]
+        :param args: Positional arguments of the method.
+        :param databases: The databases to run on, defaults to :attr:`databases`.
+        :type databases: Optional[Iterable[str]], optional
+        :param kwargs: Keyword arguments of the method.
+        :return: The outcome on each database, in completion order.
+        :rtype: Iterator[FleetResult]
+        """
+        names = iter(self.databases if databases is None else databases)
+        pending: Set[Future] = set()
+        try:
+            for name in names:
+                if len(pending) >= self.max_workers:
+                    done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        yield future.result()
+                pending.add(
+                    self._executor.submit(self._call, name, method, args, kwargs)
+                )
+            while pending:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def run_all(
+        self,
+        method: Union[str, Callable[..., Any]],
+        *args: Any,
+        databases: Optional[Iterable[str]] = None,
+        **kwargs: Any,
+    ) -> Dict[str, FleetResult]:
+        """Runs a ProvenDB method on every database and waits for all of them, see :meth:`run`.
+
+        :return: The outcome on each database, keyed by database name.
+        :rtype: Dict[str, FleetResult]
+        """
+        return {
+            outcome.database: outcome
+            for outcome in self.run(method, *args, databases=databases, **kwargs)
+        }
+
+    def close(self, wait: bool = True) -> None:
+        """Stops the worker threads. ProvenDB objects stay usable on their own.
+
+        :param wait: If True, blocks until running methods complete, defaults to True
+        :type wait: bool, optional
+        """
+        self._executor.shutdown(wait=wait)
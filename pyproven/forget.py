@@ -0,0 +1,298 @@
+"""Forgetting documents of many subjects at once, e.g. for a batch of erasure requests.
+
+A :class:`ForgetPipeline` merges the filters of many subjects into a few forget operations,
+prepares and executes them in parallel, and keeps an audit record of every operation:
+
+.. code-block:: python
+
+    pipeline = ForgetPipeline(pdb, workers=8, audit="erasure-audit.jsonl")
+    for request in erasure_requests:
+        pipeline.add("customers", {"customerId": request.customer_id}, expected=1)
+    summary = pipeline.run()
+    assert not summary.failures
+"""
+
+import datetime
+import time
+from collections.abc import Mapping
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+from bson import json_util
+
+from pyproven.database import ProvenDB
+from pyproven.response import ProvenDocument
+from pyproven.utilities import ExecuteForgetResponse, PrepareForgetResponse
+
+#: Status of a chunk whose forget operation was executed.
+EXECUTED = "executed"
+#: Status of a chunk that was not executed, because its prepared counts were not the expected ones.
+MISMATCHED = "mismatched"
+#: Status of a chunk whose prepare or execute command failed.
+FAILED = "failed"
+
+
+class ForgetChunk(ProvenDocument):
+    """Dict-like forget operation of a :class:`ForgetPipeline`, merging the filters of one or more subjects."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.collection: str = self["collection"]
+        self.filter: Dict[str, Any] = self["filter"]
+        self.minVersion: Optional[int] = self["minVersion"]
+        self.maxVersion: Optional[int] = self["maxVersion"]
+        self.inclusiveRange: Optional[bool] = self["inclusiveRange"]
+        self.nSubjects: int = self["nSubjects"]
+        self.expected: Optional[int] = self["expected"]
+
+
+class ForgetRecord(ProvenDocument):
+    """Dict-like audit record of one :class:`ForgetChunk`, with the summaries ProvenDB returned for it."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.status: str = self["status"]
+        self.forgetId: Optional[int] = self["forgetId"]
+        self.prepareSummary: Optional[Dict[str, Any]] = self["prepareSummary"]
+        self.executeSummary: Optional[Dict[str, Any]] = self["executeSummary"]
+        self.error: Optional[str] = self["error"]
+
+
+class ForgetPipelineSummary(ProvenDocument):
+    """Dict-like summary of a :meth:`ForgetPipeline.run`, holding the totals of the executed
+    chunks and the records of the chunks that were not executed."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.nChunks: int = self["nChunks"]
+        self.nExecuted: int = self["nExecuted"]
+        self.documentsForgotten: int = self["documentsForgotten"]
+        self.uniqueDocuments: int = self["uniqueDocuments"]
+        self.seconds: float = self["seconds"]
+        self.failures: List[ForgetRecord] = self["failures"]
+
+
+def _equality(filter: Dict[str, Any]) -> Optional[Tuple[str, List[Any]]]:
+    """Returns the field and values of a filter matching one field against values, or None."""
+    if len(filter) != 1:
+        return None
+    ((field, value),) = filter.items()
+    if field.startswith("$"):
+        return None
+    if isinstance(value, Mapping):
+        if list(value) == ["$eq"]:
+            return field, [value["$eq"]]
+        if list(value) == ["$in"]:
+            return field, list(value["$in"])
+        return None
+    return field, [value]
+
+
+class ForgetPipeline:
+    """Forgets the documents of many subjects with a few parallel forget operations.
+    See https://provendb.readme.io/docs/forget
+
+    Subjects selected by equality on the same field, e.g. ``{"customerId": 42}``, are merged into
+    ``$in`` filters of up to ``chunk_size`` values. Other filters are merged with ``$or``. Only subjects
+    with the same collection and version range are merged.
+
+    Each chunk is prepared, and executed only if the number of unique documents ProvenDB is about
+    to forget matches the sum of the ``expected`` counts of its subjects. Up to ``workers`` prepare
+    and execute commands run at once. A chunk that fails or does not match is reported without stopping
+    the others. Its prepared operation is never executed.
+
+    :param pdb: The ProvenDB object used to forget documents.
+    :type pdb: ProvenDB
+    :param chunk_size: Most subjects merged into one forget operation, defaults to 500
+    :type chunk_size: int, optional
+    :param workers: Most forget commands running at once, defaults to 4
+    :type workers: int, optional
+    :param audit: Path of a file to append an audit record to as JSON lines, or a callable
+                  receiving each :class:`ForgetRecord`. Defaults to no audit records.
+    :type audit: Union[None, str, Callable[[ForgetRecord], Any]], optional
+    """
+
+    def __init__(
+        self,
+        pdb: ProvenDB,
+        chunk_size: int = 500,
+        workers: int = 4,
+        audit: Union[None, str, Callable[[ForgetRecord], Any]] = None,
+    ):
+        if chunk_size < 1 or workers < 1:
+            raise ValueError("chunk_size and workers must be at least 1.")
+        self.pdb: ProvenDB = pdb
+        self.chunk_size: int = chunk_size
+        self.workers: int = workers
+        self.audit: Union[None, str, Callable[[ForgetRecord], Any]] = audit
+        # (collection, minVersion, maxVersion, inclusiveRange, field or None) -> [(values or filter, expected)]
+        self._groups: Dict[Tuple[Any, ...], List[Tuple[Any, Optional[int]]]] = {}
+
+    def __len__(self) -> int:
+        return sum(len(subjects) for subjects in self._groups.values())
+
+    def add(
+        self,
+        collection: str,
+        filter: Dict[str, Any],
+        min_version: Optional[int] = None,
+        max_version: Optional[int] = None,
+        inclusive_range: Optional[bool] = None,
+        expected: Optional[int] = None,
+    ) -> None:
+        """Adds the documents of a subject to be forgotten, see :meth:`pyproven.database.ProvenDB.forget_prepare`.
+
+        :param collection: The name of the collection to forget documents from.
+        :type collection: str
+        :param filter: A filter that selects the documents of the subject.
+        :type filter: Dict[str, Any]
+        :param min_version: Minimum version to forget documents in. Defaults to first version of database.
+        :type min_version: Optional[int], optional
+        :param max_version: Maximum version to forget documents to. Defaults to current version of database.
+        :type max_version: Optional[int], optional
+        :param inclusive_range: If true, forget documents that ONLY exist between the two versions, defaults to True
+        :type inclusive_range: Optional[bool], optional
+        :param expected: Number of unique documents the filter should select, defaults to not checking.
+        :type expected: Optional[int], optional
+        """
+        equality = _equality(filter)
+        field = equality[0] if equality else None
+        key = (collection, min_version, max_version, inclusive_range, field)
+        subject = equality[1] if equality else filter
+        self._groups.setdefault(key, []).append((subject, expected))
+
+    def chunks(self) -> List[ForgetChunk]:
+        """Returns the forget operations the added subjects are merged into.
+
+        :rtype: List[ForgetChunk]
+        """
+        chunks = []
+        for key, subjects in self._groups.items():
+            collection, min_version, max_version, inclusive_range, field = key
+            for index in range(0, len(subjects), self.chunk_size):
+                batch = subjects[index : index + self.chunk_size]
+                filter: Dict[str, Any]
+                if field is not None:
+                    values = [value for values, _ in batch for value in values]
+                    filter = {field: {"$in": values}}
+                elif len(batch) == 1:
+                    filter = batch[0][0]
+                else:
+                    filter = {"$or": [subject for subject, _ in batch]}
+                known = [expected for _, expected in batch if expected is not None]
+                chunks.append(
+                    ForgetChunk(
+                        {
+                            "collection": collection,
+                            "filter": filter,
+                            "minVersion": min_version,
+                            "maxVersion": max_version,
+                            "inclusiveRange": inclusive_range,
+                            "nSubjects": len(batch),
+                            "expected": (
+                                sum(known) if len(known) == len(batch) else None
+                            ),
+                        }
+                    )
+                )
+        return chunks
+
+    def _prepare(self, chunk: ForgetChunk) -> PrepareForgetResponse:
+        return self.pdb.forget_prepare(
+            chunk.collection,
+            chunk.filter,
+            chunk.minVersion,
+            chunk.maxVersion,
+            chunk.inclusiveRange,
+        )
+
+    def _execute(self, prepared: PrepareForgetResponse) -> ExecuteForgetResponse:
+        return self.pdb.forget_execute(int(prepared.forgetId), prepared.password)
+
+    def _record(
+        self,
+        chunk: ForgetChunk,
+        status: str,
+        prepared: Optional[PrepareForgetResponse] = None,
+        executed: Optional[ExecuteForgetResponse] = None,
+        error: Optional[BaseException] = None,
+    ) -> ForgetRecord:
+        record = ForgetRecord(
+            {
+                "time": datetime.datetime.now(datetime.timezone.utc),
+                "database": self.pdb.name,
+                **chunk,
+                "status": status,
+                "forgetId": prepared.forgetId if prepared else None,
+                "prepareSummary": dict(prepared.forgetSummary) if prepared else None,
+                "executeSummary": dict(executed.forgetSummary) if executed else None,
+                "executeStatus": executed.status if executed else None,
+                "error": None if error is None else repr(error),
+            }
+        )
+        if isinstance(self.audit, str):
+            with open(self.audit, "a") as file:
+                file.write(json_util.dumps(dict(record)) + "\n")
+        elif self.audit is not None:
+            self.audit(record)
+        return record
+
+    def run(self) -> ForgetPipelineSummary:
+        """Prepares and executes the forget operations of every added subject, then clears them.
+
+        :return: A dict-like object holding the totals of the executed operations and the failed ones.
+        :rtype: ForgetPipelineSummary
+        """
+        chunks = self.chunks()
+        self._groups = {}
+        started = time.perf_counter()
+        records: List[ForgetRecord] = []
+        # future -> (chunk, prepare response once the future is executing the chunk)
+        stages: Dict[Future, Tuple[ForgetChunk, Optional[PrepareForgetResponse]]] = {}
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+
+            def finish(done: Set[Future]) -> None:
+                for future in done:
+                    chunk, prepared = stages.pop(future)
+                    try:
+                        response = future.result()
+                    except Exception as err:
+                        records.append(self._record(chunk, FAILED, prepared, error=err))
+                        continue
+                    if prepared is not None:
+                        records.append(
+                            self._record(chunk, EXECUTED, prepared, response)
+                        )
+                    elif (
+                        chunk.expected is not None
+                        and response.forgetSummary.uniqueDocuments != chunk.expected
+                    ):
+                        records.append(self._record(chunk, MISMATCHED, response))
+                    else:
+                        stages[executor.submit(self._execute, response)] = (
+                            chunk,
+                            response,
+                        )
+
+            for chunk in chunks:
+                while len(stages) >= 2 * self.workers:
+                    finish(wait(stages, return_when=FIRST_COMPLETED).done)
+                stages[executor.submit(self._prepare, chunk)] = (chunk, None)
+            while stages:
+                finish(wait(stages, return_when=FIRST_COMPLETED).done)
+        executed = [record for record in records if record.status == EXECUTED]
+        return ForgetPipelineSummary(
+            {
+                "nChunks": len(chunks),
+                "nExecuted": len(executed),
+                "documentsForgotten": sum(
+                    record["executeSummary"]["documentsForgotten"]
+                    for record in executed
+                ),
+                "uniqueDocuments": sum(
+                    record["executeSummary"]["uniqueDocuments"] for record in executed
+                ),
+                "seconds": time.perf_counter() - started,
+                "failures": [record for record in records if record.status != EXECUTED],
+            }
+        )
@@ -0,0 +1,229 @@
+import hashlib
+import os
+import struct
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import (
+    Any,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from bson import BSON
+from bson.raw_bson import RawBSONDocument
+
+from pyproven.proofs import DocumentProof, SuccessfulDocumentProof
+from pyproven.response import ProvenDocument
+
+METADATA_FIELD = "_provendb_metadata"
+
+_INT32 = struct.Struct("<i")
+
+# sizes of fixed width BSON element values, keyed by element type.
+_FIXED_SIZES = {
+    0x01: 8,
+    0x06: 0,
+    0x07: 12,
+    0x08: 1,
+    0x09: 8,
+    0x0A: 0,
+    0x10: 4,
+    0x11: 8,
+    0x12: 8,
+    0x13: 16,
+    0x7F: 0,
+    0xFF: 0,
+}
+
+
+class TamperedDocument(ProvenDocument):
+    """Dict-like object describing a document whose local hash does not match its expected hash."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self._id: Any = self["_id"]
+        self.documentHash: str = self["documentHash"]
+        self.expectedHash: Optional[str] = self["expectedHash"]
+
+
+def _value_size(raw: bytes, element_type: int, offset: int) -> int:
+    """Returns the size of the BSON element value starting at ``offset``."""
+    if element_type in _FIXED_SIZES:
+        return _FIXED_SIZES[element_type]
+    if element_type in (0x02, 0x0D, 0x0E):
+        return 4 + _INT32.unpack_from(raw, offset)[0]
+    if element_type in (0x03, 0x04, 0x0F):
+        return _INT32.unpack_from(raw, offset)[0]
+    if element_type == 0x05:
+        return 5 + _INT32.unpack_from(raw, offset)[0]
+    if element_type == 0x0B:
+        pattern_end = raw.index(b"\x00", offset)
+        return raw.index(b"\x00", pattern_end + 1) + 1 - offset
+    if element_type == 0x0C:
+        return 4 + _INT32.unpack_from(raw, offset)[0] + 12
+    raise ValueError(f"Unknown BSON element type {element_type:#x}")
+
+
+def split_metadata(raw: bytes) -> Tuple[bytes, Optional[bytes]]:
+    """Removes the top level ``_provendb_metadata`` field from an encoded document without decoding it.
+
+    :param raw: A BSON encoded document.
+    :type raw: bytes
+    :return: The encoded document without metadata, and the encoded metadata document if present.
+    :rtype: Tuple[bytes, Optional[bytes]]
+    """
+    name = METADATA_FIELD.encode() + b"\x00"
+    offset = 4
+    end = len(raw) - 1
+    while offset < end:
+        element_type = raw[offset]
+        name_end = raw.index(b"\x00", offset + 1) + 1
+        value_end = name_end + _value_size(raw, element_type, name_end)
+        if element_type == 0x03 and raw[offset + 1 : name_end] == name:
+            body = raw[4:offset] + raw[value_end:end]
+            stripped = _INT32.pack(len(body) + 5) + body + b"\x00"
+            return stripped, raw[name_end:value_end]
+        offset = value_end
+    return raw, None
+
+
+def _encode(document: Union[bytes, Mapping[str, Any]]) -> bytes:
+    if isinstance(document, RawBSONDocument):
+        return document.raw
+    if isinstance(document, (bytes, bytearray)):
+        return bytes(document)
+    return BSON.encode(document)
+
+
+def hash_document(document: Union[bytes, Mapping[str, Any]]) -> str:
+    """Computes the ProvenDB document hash locally: the SHA-256 of the document's BSON encoding
+    with the ``_provendb_metadata`` field removed. Field order is significant, so documents should be
+    read as :class:`bson.raw_bson.RawBSONDocument` or with an order preserving document class.
+
+    :param document: A document, RawBSONDocument or BSON encoded bytes.
+    :type document: Union[bytes, Mapping[str, Any]]
+    :return: The hex encoded document hash.
+    :rtype: str
+    """
+    stripped, _ = split_metadata(_encode(document))
+    return hashlib.sha256(stripped).hexdigest()
+
+
+def _hash_chunk(raws: List[bytes]) -> List[Tuple[Any, str, Optional[str]]]:
+    """Hashes a chunk of encoded documents, returning their _id, hash and metadata hash."""
+    results = []
+    for raw in raws:
+        stripped, metadata = split_metadata(raw)
+        metadata_hash = None
+        if metadata is not None:
+            metadata_hash = BSON(metadata).decode().get("hash")
+        document_id = RawBSONDocument(raw).get("_id")
+        results.append(
+            (document_id, hashlib.sha256(stripped).hexdigest(), metadata_hash)
+        )
+    return results
+
+
+def hash_documents(
+    documents: Iterable[Union[bytes, Mapping[str, Any]]],
+    processes: Optional[int] = None,
+    chunk_size: int = 1000,
+) -> Iterator[Tuple[Any, str, Optional[str]]]:
+    """Lazily hashes a stream of documents in parallel chunks over a process pool.
+    At most ``2 * processes`` chunks are held in memory, so any cursor can be streamed.
+    Reading the cursor with ``RawBSONDocument`` avoids decoding documents at all:
+
+    .. code-block:: python
+
+        from bson.codec_options import CodecOptions
+        from bson.raw_bson import RawBSONDocument
+        collection = pdb["collection"].with_options(CodecOptions(RawBSONDocument))
+        for _id, document_hash, metadata_hash in hash_documents(collection.find({})):
+            ...
+
+    :param documents: Any iterable of documents, RawBSONDocuments or BSON encoded bytes.
+    :type documents: Iterable[Union[bytes, Mapping[str, Any]]]
+    :param processes: Number of worker processes, defaults to the number of CPUs.
+    :type processes: Optional[int], optional
+    :param chunk_size: Number of documents hashed by a worker at a time, defaults to 1000
+    :type chunk_size: int, optional
+    :return: (_id, document hash, metadata hash) for each document, in input order.
+             The metadata hash is None unless the document includes ``_provendb_metadata``.
+    :rtype: Iterator[Tuple[Any, str, Optional[str]]]
+    """
+    processes = processes or os.cpu_count() or 1
+    max_pending = 2 * processes
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        pending: List[Future] = []
+        chunk: List[bytes] = []
+        for document in documents:
+            chunk.append(_encode(document))
+            if len(chunk) < chunk_size:
+                continue
+            pending.append(executor.submit(_hash_chunk, chunk))
+            chunk = []
+            while len(pending) >= max_pending:
+                yield from pending.pop(0).result()
+        if chunk:
+            pending.append(executor.submit(_hash_chunk, chunk))
+        for future in pending:
+            yield from future.result()
+
+
+def document_hashes_from_proofs(proofs: Iterable[DocumentProof]) -> Dict[str, str]:
+    """Maps documentId to documentHash for each successful document proof.
+    ProvenDB gives the documentId as the string form of the document _id, e.g. ``str(ObjectId(...))``.
+
+    :param proofs: Document proofs, e.g. :attr:`pyproven.proofs.GetDocumentProofResponse.proofs`.
+    :type proofs: Iterable[DocumentProof]
+    :rtype: Dict[str, str]
+    """
+    return {
+        str(proof.documentId): proof.documentHash
+        for proof in proofs
+        if isinstance(proof, SuccessfulDocumentProof)
+    }
+
+
+def find_tampered_documents(
+    documents: Iterable[Union[bytes, Mapping[str, Any]]],
+    expected_hashes: Optional[Mapping[str, str]] = None,
+    processes: Optional[int] = None,
+    chunk_size: int = 1000,
+) -> Iterator[TamperedDocument]:
+    """Hashes a stream of documents locally and yields those whose hash differs from the expected hash.
+    See :func:`hash_documents`.
+
+    :param documents: Any iterable of documents, RawBSONDocuments or BSON encoded bytes.
+    :type documents: Iterable[Union[bytes, Mapping[str, Any]]]
+    :param expected_hashes: Expected hashes keyed by ``str(_id)``, like the documentId of a document proof,
+                            see :func:`document_hashes_from_proofs`. Defaults to the hash held in each
+                            document's ``_provendb_metadata``.
+    :type expected_hashes: Optional[Mapping[str, str]], optional
+    :param processes: Number of worker processes, defaults to the number of CPUs.
+    :type processes: Optional[int], optional
+    :param chunk_size: Number of documents hashed by a worker at a time, defaults to 1000
+    :type chunk_size: int, optional
+    :return: The documents whose local hash does not match. Documents without an expected hash are skipped.
+    :rtype: Iterator[TamperedDocument]
+    """
+    for document_id, document_hash, metadata_hash in hash_documents(
+        documents, processes, chunk_size
+    ):
+        if expected_hashes is not None:
+            expected = expected_hashes.get(str(document_id))
+        else:
+            expected = metadata_hash
+        if expected is not None and expected.lower() != document_hash:
+            yield TamperedDocument(
+                {
+                    "_id": document_id,
+                    "documentHash": document_hash,
+                    "expectedHash": expected,
+                }
+            )
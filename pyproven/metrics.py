@@ -0,0 +1,368 @@
+import bisect
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Union
+
+from bson import BSON
+from bson.son import SON
+from pymongo.errors import PyMongoError
+
+from pyproven.enums import ErrorClassEnums
+from pyproven.exceptions import classify_error
+from pyproven.retry import command_name
+
+#: Default upper bounds in seconds of the latency histogram buckets.
+LATENCY_BUCKETS = (
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+)
+#: Default upper bounds in bytes of the response size histogram buckets.
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304, 16777216)
+
+
+def command_bytes(command: Union[str, Mapping[str, Any]], value: Any = 1) -> int:
+    """Returns the size of a command once BSON encoded, as sent by :meth:`pymongo.database.Database.command`."""
+    from pyproven.templates import TemplateCommand
+
+    if isinstance(command, TemplateCommand):
+        return command.template.encoded_size(command.value)
+    if isinstance(command, str):
+        command = SON([(command, value)])
+    return len(BSON.encode(command))
+
+
+def document_bytes(document: Mapping[str, Any]) -> int:
+    """Returns the size of a BSON document, without encoding it again if it is still raw."""
+    from bson.raw_bson import RawBSONDocument
+
+    if isinstance(document, RawBSONDocument):
+        return len(document.raw)
+    return len(BSON.encode(document))
+
+
+class MetricsSink(ABC):
+    """ABC for receivers of per-command metrics from :class:`pyproven.database.ProvenDB`.
+
+    Every ProvenDB command calls :meth:`command_started` before it is sent and :meth:`command_finished`
+    once it has completed or failed, including any retries. Sinks may be called from several threads.
+    The insert batches of :meth:`pyproven.database.ProvenDB.bulk_ingest` are reported as 'insert',
+    while reads through cursors are not reported.
+    """
+
+    #: If True, request and response sizes are measured by BSON encoding, which costs time on large responses.
+    measure_bytes: bool = True
+
+    @abstractmethod
+    def command_started(self, command: str) -> None:
+        """Called when a command is about to be sent.
+
+        :param command: Name of the command, e.g. 'docHistory'.
+        :type command: str
+        """
+
+    @abstractmethod
+    def command_finished(
+        self,
+        command: str,
+        seconds: float,
+        request_bytes: Optional[int],
+        response_bytes: Optional[int],
+        error: Optional[ErrorClassEnums],
+    ) -> None:
+        """Called when a command has completed or failed.
+
+        :param command: Name of the command, e.g. 'docHistory'.
+        :type command: str
+        :param seconds: Time taken by the command, including retries.
+        :type seconds: float
+        :param request_bytes: Size of the BSON encoded command, None when sizes are not measured.
+        :type request_bytes: Optional[int]
+        :param response_bytes: Size of the BSON encoded response, None when sizes are not measured or the command failed.
+        :type response_bytes: Optional[int]
+        :param error: Class of the error the command failed with, None when it succeeded.
+        :type error: Optional[ErrorClassEnums]
+        """
+
+
+class CommandTimer:
+    """Context manager reporting one command to a :class:`MetricsSink`, used by the synchronous and
+    asynchronous clients alike. Set :attr:`response` to the response document before the block ends
+    so its size is measured. Nothing is reported when the sink is None.
+
+    .. code-block:: python
+
+        with CommandTimer(metrics, "insert", request_bytes) as timer:
+            timer.response = collection.insert_many(batch)
+
+    :param metrics: The sink to report to, or None.
+    :type metrics: Optional[MetricsSink]
+    :param command: Name of the command, e.g. 'docHistory'.
+    :type command: str
+    :param request_bytes: Size of the BSON encoded request, defaults to not measured.
+    :type request_bytes: Optional[int], optional
+    """
+
+    def __init__(
+        self,
+        metrics: Optional[MetricsSink],
+        command: str,
+        request_bytes: Optional[int] = None,
+    ):
+        self.metrics: Optional[MetricsSink] = metrics
+        self.command: str = command
+        self.request_bytes: Optional[int] = request_bytes
+        self.response: Any = None
+        self._started = 0.0
+
+    @classmethod
+    def for_command(
+        cls,
+        metrics: Optional[MetricsSink],
+        command: Union[str, Mapping[str, Any]],
+        value: Any = 1,
+    ) -> "CommandTimer":
+        """Returns a timer for a command as accepted by :meth:`pymongo.database.Database.command`,
+        measuring its encoded size when the sink measures bytes."""
+        if metrics is None:
+            return cls(None, "")
+        request_bytes = command_bytes(command, value) if metrics.measure_bytes else None
+        return cls(metrics, command_name(command), request_bytes)
+
+    def __enter__(self) -> "CommandTimer":
+        if self.metrics is not None:
+            self.metrics.command_started(self.command)
+            self._started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, traceback: Any) -> None:
+        metrics = self.metrics
+        if metrics is None:
+            return
+        seconds = time.perf_counter() - self._started
+        if exc is not None:
+            error = (
+                classify_error(exc)
+                if isinstance(exc, PyMongoError)
+                else ErrorClassEnums.UNKNOWN
+            )
+            metrics.command_finished(
+                self.command, seconds, self.request_bytes, None, error
+            )
+            return
+        response_bytes = None
+        if metrics.measure_bytes and isinstance(self.response, Mapping):
+            response_bytes = document_bytes(self.response)
+        metrics.command_finished(
+            self.command, seconds, self.request_bytes, response_bytes, None
+        )
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: Sequence[float]):
+        self.bounds = bounds
+        # one count per bucket plus the +Inf bucket, not cumulative.
+        self.counts = [0] * (len(bounds) + 1)
+        self.sum: float = 0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        cumulative = 0
+        buckets = []
+        for bound, count in zip(list(self.bounds) + [float("inf")], self.counts):
+            cumulative += count
+            buckets.append((bound, cumulative))
+        return {"buckets": buckets, "sum": self.sum, "count": self.count}
+
+
+class _CommandMetrics:
+    __slots__ = ("latency", "response_bytes", "request_bytes", "errors", "in_flight")
+
+    def __init__(self, latency_buckets: Sequence[float], size_buckets: Sequence[float]):
+        self.latency = _Histogram(latency_buckets)
+        self.response_bytes = _Histogram(size_buckets)
+        self.request_bytes = 0
+        self.errors: Dict[str, int] = {}
+        self.in_flight = 0
+
+
+class InMemoryMetrics(MetricsSink):
+    """Metrics sink that aggregates command metrics in memory.
+
+    .. code-block:: python
+
+        metrics = InMemoryMetrics()
+        pdb = ProvenDB(database, metrics=metrics)
+        ...
+        metrics.snapshot()["docHistory"]["latency"]["count"]
+        print(prometheus_text(metrics))
+
+    :param latency_buckets: Upper bounds in seconds of the latency histogram buckets, defaults to :data:`LATENCY_BUCKETS`.
+    :type latency_buckets: Sequence[float], optional
+    :param size_buckets: Upper bounds in bytes of the response size histogram buckets, defaults to :data:`SIZE_BUCKETS`.
+    :type size_buckets: Sequence[float], optional
+    :param measure_bytes: If False, request and response sizes are not measured, defaults to True
+    :type measure_bytes: bool, optional
+    """
+
+    def __init__(
+        self,
+        latency_buckets: Sequence[float] = LATENCY_BUCKETS,
+        size_buckets: Sequence[float] = SIZE_BUCKETS,
+        measure_bytes: bool = True,
+    ):
+        self.latency_buckets: Sequence[float] = sorted(latency_buckets)
+        self.size_buckets: Sequence[float] = sorted(size_buckets)
+        self.measure_bytes = measure_bytes
+        self._lock = threading.Lock()
+        self._commands: Dict[str, _CommandMetrics] = {}
+
+    def _metrics(self, command: str) -> _CommandMetrics:
+        metrics = self._commands.get(command)
+        if metrics is None:
+            metrics = _CommandMetrics(self.latency_buckets, self.size_buckets)
+            self._commands[command] = metrics
+        return metrics
+
+    def command_started(self, command: str) -> None:
+        with self._lock:
+            self._metrics(command).in_flight += 1
+
+    def command_finished(
+        self,
+        command: str,
+        seconds: float,
+        request_bytes: Optional[int],
+        response_bytes: Optional[int],
+        error: Optional[ErrorClassEnums],
+    ) -> None:
+        with self._lock:
+            metrics = self._metrics(command)
+            metrics.in_flight -= 1
+            metrics.latency.observe(seconds)
+            if request_bytes is not None:
+                metrics.request_bytes += request_bytes
+            if response_bytes is not None:
+                metrics.response_bytes.observe(response_bytes)
+            if error is not None:
+                metrics.errors[error.value] = metrics.errors.get(error.value, 0) + 1
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Returns a copy of the current metrics, keyed by command name.
+
+        Each command has a 'latency' and a 'response_bytes' histogram, each holding cumulative
+        (upper bound, count) 'buckets', a 'sum' and a 'count'. It also has the total 'request_bytes',
+        'errors' counted by error class and the number of commands currently 'in_flight'.
+
+        :rtype: Dict[str, Dict[str, Any]]
+        """
+        with self._lock:
+            return {
+                command: {
+                    "latency": metrics.latency.snapshot(),
+                    "response_bytes": metrics.response_bytes.snapshot(),
+                    "request_bytes": metrics.request_bytes,
+                    "errors": dict(metrics.errors),
+                    "in_flight": metrics.in_flight,
+                }
+                for command, metrics in self._commands.items()
+            }
+
+    def reset(self) -> None:
+        """Discards all metrics, except the number of commands in flight."""
+        with self._lock:
+            for command, metrics in self._commands.items():
+                fresh = _CommandMetrics(self.latency_buckets, self.size_buckets)
+                fresh.in_flight = metrics.in_flight
+                self._commands[command] = fresh
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if bound == float("inf") else repr(float(bound))
+
+
+def _histogram_lines(name: str, command: str, histogram: Dict[str, Any]) -> List[str]:
+    lines = [
+        f'{name}_bucket{{command="{command}",le="{_format_bound(bound)}"}} {count}'
+        for bound, count in histogram["buckets"]
+    ]
+    lines.append(f'{name}_sum{{command="{command}"}} {histogram["sum"]}')
+    lines.append(f'{name}_count{{command="{command}"}} {histogram["count"]}')
+    return lines
+
+
+def prometheus_text(metrics: InMemoryMetrics, prefix: str = "pyproven") -> str:
+    """Renders metrics in the Prometheus text exposition format.
+
+    :param metrics: The metrics to render.
+    :type metrics: InMemoryMetrics
+    :param prefix: Prefix of every metric name, defaults to 'pyproven'
+    :type prefix: str, optional
+    :rtype: str
+    """
+    snapshot = metrics.snapshot()
+    commands = sorted(snapshot)
+    latency = f"{prefix}_command_duration_seconds"
+    response = f"{prefix}_command_response_bytes"
+    request = f"{prefix}_command_request_bytes_total"
+    errors = f"{prefix}_command_errors_total"
+    in_flight = f"{prefix}_commands_in_flight"
+    lines = [
+        f"# HELP {latency} Time taken by ProvenDB commands, including retries.",
+        f"# TYPE {latency} histogram",
+    ]
+    for command in commands:
+        lines.extend(_histogram_lines(latency, command, snapshot[command]["latency"]))
+    lines += [
+        f"# HELP {response} Size of BSON encoded ProvenDB command responses.",
+        f"# TYPE {response} histogram",
+    ]
+    for command in commands:
+        lines.extend(
+            _histogram_lines(response, command, snapshot[command]["response_bytes"])
+        )
+    lines += [
+        f"# HELP {request} Total size of BSON encoded ProvenDB commands.",
+        f"# TYPE {request} counter",
+    ]
+    lines.extend(
+        f'{request}{{command="{command}"}} {snapshot[command]["request_bytes"]}'
+        for command in commands
+    )
+    lines += [
+        f"# HELP {errors} Failed ProvenDB commands by error class.",
+        f"# TYPE {errors} counter",
+    ]
+    for command in commands:
+        lines.extend(
+            f'{errors}{{command="{command}",error="{error}"}} {count}'
+            for error, count in sorted(snapshot[command]["errors"].items())
+        )
+    lines += [
+        f"# HELP {in_flight} ProvenDB commands currently in flight.",
+        f"# TYPE {in_flight} gauge",
+    ]
+    lines.extend(
+        f'{in_flight}{{command="{command}"}} {snapshot[command]["in_flight"]}'
+        for command in commands
+    )
+    return "\n".join(lines) + "\n"
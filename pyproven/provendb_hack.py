@@ -0,0 +1,199 @@
+"""Workaround for a ProvenDB bug in handling the ``$readPreference`` field of pymongo's OP_MSG commands.
+
+Only imported when a client is constructed with ``provendb_hack=True``, so pymongo is left
+untouched otherwise. The workaround is scoped: commands sent to a database of a client registered
+by :func:`install` are encoded by :func:`fix_op_msg`, while other databases, and databases of the
+same name on other clients, keep pymongo's encoder.
+"""
+
+import contextlib
+import struct
+import warnings
+import weakref
+from contextvars import ContextVar
+from typing import Any, Callable, Dict, Optional, Set
+
+import pymongo
+import pymongo.message
+from bson.codec_options import CodecOptions
+from bson.son import SON
+
+from pyproven.templates import ElementCache, TemplateCommand, encode_element
+
+_OP_MSG = 2013
+_pack_header = struct.Struct("<iiii").pack
+_pack_flags_type = struct.Struct("<IB").pack
+_pack_int = struct.Struct("<i").pack
+
+#: Names of the databases whose commands are encoded by :func:`fix_op_msg`, keyed by the id of their client.
+_databases: Dict[int, Set[str]] = {}
+# id of the client whose operation holds a connection in this thread or task, if registered.
+_current_client: ContextVar[Optional[int]] = ContextVar(
+    "pyproven_hack_client", default=None
+)
+_original_op_msg: Optional[Callable[..., Any]] = None
+# session fields repeat between commands, so their encoding is reused.
+_elements = ElementCache()
+
+
+def _template_op_msg(
+    flags: int, command: TemplateCommand, dbname: str, opts: CodecOptions
+) -> Any:
+    """Encodes a command built from a :class:`pyproven.templates.CommandTemplate`, reusing the
+    encoding of its constant fields, or returns None if the command was changed since it was built.
+    The command document is the only document of the message, so its size is also the largest
+    document size, checked by pymongo against the server's limit.
+    """
+    template = command.template
+    for key, item in template.fields.items():
+        if command[key] is not item:
+            return None
+    keys = command.keys()
+    parts = [template.encoded_fields(command[template.name], opts)]
+    for key in keys[template.n_fields :]:
+        if key != "$db":
+            parts.append(_elements.encode(key, command[key], opts))
+    parts.append(encode_element("$db", dbname))
+    body = b"".join(parts)
+    size = len(body) + 5
+    data = _pack_flags_type(flags, 0) + _pack_int(size) + body + b"\x00"
+    request_id = pymongo.message._randint()
+    return (
+        request_id,
+        _pack_header(16 + len(data), request_id, 0, _OP_MSG) + data,
+        size,
+        size,
+    )
+
+
+def fix_op_msg(
+    flags, command, dbname, read_preference, slave_ok, check_keys, opts, ctx=None
+):
+    """Temporary hack to overwrite the _op_msg function in pymongo to work around a current bug with ProvenDB.
+    This has been reported to the developers and should be fixed soon.
+
+    Unlike pymongo, no ``$readPreference`` is added, and the documents of write commands are sent
+    as a document sequence without removing them from the command.
+    Commands built from templates are encoded from their cached fields, unless compressed or
+    sent with ``check_keys``, which only pymongo's encoder applies.
+    """
+    if ctx is None and not check_keys and isinstance(command, TemplateCommand):
+        message = _template_op_msg(flags, command, dbname, opts)
+        if message is not None:
+            return message
+    command["$db"] = dbname
+    identifier = pymongo.message._FIELD_MAP.get(next(iter(command)))
+    docs = None
+    if identifier and identifier in command:
+        docs = command[identifier]
+        command = SON((key, item) for key, item in command.items() if key != identifier)
+    else:
+        identifier = ""
+    if ctx:
+        return pymongo.message._op_msg_compressed(
+            flags, command, identifier, docs, check_keys, opts, ctx
+        )
+    return pymongo.message._op_msg_uncompressed(
+        flags, command, identifier, docs, check_keys, opts
+    )
+
+
+def _scoped_op_msg(
+    flags, command, dbname, read_preference, slave_ok, check_keys, opts, ctx=None
+):
+    names = _databases.get(_current_client.get())  # type: ignore
+    encoder = fix_op_msg if names and dbname in names else _original_op_msg
+    return encoder(  # type: ignore
+        flags, command, dbname, read_preference, slave_ok, check_keys, opts, ctx
+    )
+
+
+def _pymongo_client(client: Any) -> Any:
+    if isinstance(client, pymongo.MongoClient):
+        return client
+    # motor clients delegate to a pymongo client.
+    return client.delegate
+
+
+def _track_client(client: Any) -> None:
+    """Marks every operation of ``client`` while it holds a connection, so its commands can be told
+    apart from those of other clients. pymongo checks out a connection with ``_get_socket``.
+    """
+    key = id(client)
+    get_socket = client._get_socket
+
+    @contextlib.contextmanager
+    def _get_socket(*args: Any, **kwargs: Any) -> Any:
+        token = _current_client.set(key)
+        try:
+            with get_socket(*args, **kwargs) as sock_info:
+                yield sock_info
+        finally:
+            _current_client.reset(token)
+
+    client._get_socket = _get_socket
+    weakref.finalize(client, _databases.pop, key, None)
+
+
+def supported(client: Any) -> bool:
+    """Returns True if the pymongo internals patched by :func:`install` are those of the pymongo 3.13+
+    releases this module was written for. pymongo 4 changed the signature of ``_op_msg`` and
+    the way connections are checked out.
+
+    :param client: The :class:`pymongo.mongo_client.MongoClient`, or motor client, of the database.
+    :type client: Any
+    :rtype: bool
+    """
+    return (3, 13) <= pymongo.version_tuple[:2] < (4, 0) and hasattr(
+        _pymongo_client(client), "_get_socket"
+    )
+
+
+def install(client: Any, dbname: str) -> None:
+    """Encodes every command sent to the database ``dbname`` of ``client`` with :func:`fix_op_msg`.
+    When the installed pymongo is not :func:`supported`, warns and leaves pymongo unpatched.
+
+    :param client: The :class:`pymongo.mongo_client.MongoClient`, or motor client, of the database.
+    :type client: Any
+    :param dbname: Name of the ProvenDB database.
+    :type dbname: str
+    """
+    global _original_op_msg
+    if not supported(client):
+        warnings.warn(
+            f"provendb_hack requires pymongo>=3.13,<4, not {pymongo.version}; "
+            "commands are encoded by pymongo unchanged.",
+            RuntimeWarning,
+            stacklevel=2,
+        )
+        return
+    client = _pymongo_client(client)
+    names = _databases.get(id(client))
+    if names is None:
+        names = _databases[id(client)] = set()
+        _track_client(client)
+    names.add(dbname)
+    if pymongo.message._op_msg is not _scoped_op_msg:
+        _original_op_msg = pymongo.message._op_msg
+        pymongo.message._op_msg = _scoped_op_msg
+
+
+def uninstall(client: Any = None, dbname: Optional[str] = None) -> None:
+    """Stops encoding commands sent to ``dbname`` of ``client`` with :func:`fix_op_msg`.
+
+    :param client: The client of the database, defaults to all clients.
+    :type client: Any, optional
+    :param dbname: Name of the ProvenDB database, defaults to all databases of the client.
+    :type dbname: Optional[str], optional
+    """
+    if client is None:
+        for names in _databases.values():
+            names.clear()
+    else:
+        names = _databases.get(id(_pymongo_client(client)), set())
+        if dbname is None:
+            names.clear()
+        else:
+            names.discard(dbname)
+    if not any(_databases.values()) and pymongo.message._op_msg is _scoped_op_msg:
+        pymongo.message._op_msg = _original_op_msg
@@ -0,0 +1,351 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import zlib
+from concurrent.futures import ProcessPoolExecutor
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Mapping,
+    Optional,
+    Tuple,
+    Union,
+)
+
+from pyproven.response import ProvenDocument
+
+AnchorRoots = Mapping[Tuple[str, str], str]
+#: Returns the hex anchor root of an (anchor type, anchor id), or None if it is not known yet.
+AnchorLookup = Callable[[str, str], Optional[str]]
+
+_HEX = re.compile(r"^([0-9a-fA-F]{2})+$")
+
+
+def _sha256_x2(data: bytes) -> bytes:
+    return hashlib.sha256(hashlib.sha256(data).digest()).digest()
+
+
+_HASH_OPS: Dict[str, Callable[[bytes], bytes]] = {
+    "sha-224": lambda data: hashlib.sha224(data).digest(),
+    "sha-256": lambda data: hashlib.sha256(data).digest(),
+    "sha-384": lambda data: hashlib.sha384(data).digest(),
+    "sha-512": lambda data: hashlib.sha512(data).digest(),
+    "sha3-224": lambda data: hashlib.sha3_224(data).digest(),
+    "sha3-256": lambda data: hashlib.sha3_256(data).digest(),
+    "sha3-384": lambda data: hashlib.sha3_384(data).digest(),
+    "sha3-512": lambda data: hashlib.sha3_512(data).digest(),
+    "sha-256-x2": _sha256_x2,
+}
+
+# anchors whose expected value is published in reversed byte order.
+_REVERSED_ANCHORS = frozenset(("btc", "tbtc"))
+
+
+class ReceiptAnchor(ProvenDocument):
+    """Dict-like object holding an anchor reached by a receipt and the value computed for it."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.type: str = self["type"]
+        self.anchorId: str = self["anchorId"]
+        self.expectedValue: str = self["expectedValue"]
+        self.verified: Optional[bool] = self["verified"]
+
+
+class ReceiptVerification(ProvenDocument):
+    """Dict-like object holding the result of verifying a receipt offline.
+
+    ``valid`` is True when at least one anchor could be checked against a known anchor root,
+    every checked anchor matched, and the receipt hash matched the expected hash if one was given.
+    """
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self["anchors"] = [ReceiptAnchor(anchor) for anchor in self["anchors"]]
+        self.hash: str = self["hash"]
+        self.valid: bool = self["valid"]
+        self.anchors: List[ReceiptAnchor] = self["anchors"]
+
+
+class AnchorRootCache(Mapping[Tuple[str, str], str]):
+    """Anchor roots keyed by (anchor type, anchor id), looked up once and then kept, since a confirmed
+    anchor never changes. Usable anywhere anchor roots are accepted, e.g. by :func:`verify_receipt`:
+
+    .. code-block:: python
+
+        roots = AnchorRootCache(lookup=lambda type, anchor_id: explorer.merkle_root(type, anchor_id),
+                                path="anchor-roots.json")
+        results = verify_receipts(proofs, roots)
+
+    Only roots missing from the cache are looked up, and misses are not cached, so anchors that are
+    not confirmed yet are looked up again next time. Safe to share between threads.
+
+    :param lookup: Called with the anchor type and id of roots missing from the cache, defaults to
+                   only using the roots already cached.
+    :type lookup: Optional[AnchorLookup], optional
+    :param path: Path of a JSON file the roots are loaded from and saved to, defaults to memory only.
+    :type path: Optional[str], optional
+    :param roots: Roots known in advance, keyed by (anchor type, anchor id).
+    :type roots: Optional[Mapping[Tuple[str, str], str]], optional
+    """
+
+    def __init__(
+        self,
+        lookup: Optional[AnchorLookup] = None,
+        path: Optional[str] = None,
+        roots: Optional[AnchorRoots] = None,
+    ):
+        self.lookup: Optional[AnchorLookup] = lookup
+        self.path: Optional[str] = path
+        self._lock = threading.Lock()
+        self._roots: Dict[Tuple[str, str], str] = {}
+        if path is not None and os.path.exists(path):
+            with open(path) as file:
+                for anchor_type, anchor_id, root in json.load(file):
+                    self._roots[(anchor_type, anchor_id)] = root
+        self._roots.update(roots or {})
+
+    def __getitem__(self, key: Tuple[str, str]) -> str:
+        with self._lock:
+            root = self._roots.get(key)
+        if root is not None:
+            return root
+        if self.lookup is not None:
+            root = self.lookup(*key)
+        if root is None:
+            raise KeyError(key)
+        with self._lock:
+            self._roots[key] = root
+            self._save()
+        return root
+
+    def __iter__(self) -> Iterator[Tuple[str, str]]:
+        with self._lock:
+            return iter(list(self._roots))
+
+    def __len__(self) -> int:
+        return len(self._roots)
+
+    def snapshot(self) -> Dict[Tuple[str, str], str]:
+        """Returns a copy of the roots cached so far, without looking up any.
+
+        :rtype: Dict[Tuple[str, str], str]
+        """
+        with self._lock:
+            return dict(self._roots)
+
+    def _save(self) -> None:
+        if self.path is None:
+            return
+        # written to a temporary file first, so an interrupted write leaves the saved roots intact.
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w") as file:
+            json.dump([[*key, root] for key, root in self._roots.items()], file)
+        os.replace(temporary, self.path)
+
+
+def decode_receipt(proof: Union[bytes, Mapping[str, Any]]) -> Mapping[str, Any]:
+    """Returns the JSON form of a receipt, decoding binary proofs if needed.
+
+    Binary proofs are zlib compressed msgpack documents, and require the optional ``msgpack`` package.
+
+    :param proof: A proof in json or binary format.
+    :type proof: Union[bytes, Mapping[str, Any]]
+    :raises ImportError: When decoding a binary proof without ``msgpack`` installed.
+    :rtype: Mapping[str, Any]
+    """
+    if isinstance(proof, Mapping):
+        return proof
+    try:
+        import msgpack  # type: ignore
+    except ImportError:
+        raise ImportError(
+            "msgpack is required to verify binary proofs, request proofs in 'json' format instead."
+        ) from None
+    return msgpack.unpackb(zlib.decompress(bytes(proof)), raw=False)
+
+
+def _operand(value: str) -> bytes:
+    if _HEX.match(value):
+        return bytes.fromhex(value)
+    return value.encode("utf-8")
+
+
+def _walk(
+    value: bytes, branches: Iterable[Mapping[str, Any]], anchors: List[Dict[str, Any]]
+) -> None:
+    for branch in branches:
+        current = value
+        for op in branch.get("ops", []):
+            if "l" in op:
+                current = _operand(op["l"]) + current
+            elif "r" in op:
+                current = current + _operand(op["r"])
+            elif "op" in op:
+                try:
+                    current = _HASH_OPS[op["op"]](current)
+                except KeyError:
+                    raise ValueError(f"Unsupported receipt operation {op['op']!r}")
+            elif "anchors" in op:
+                for anchor in op["anchors"]:
+                    anchor_type = anchor["type"]
+                    expected = (
+                        current[::-1] if anchor_type in _REVERSED_ANCHORS else current
+                    )
+                    anchors.append(
+                        {
+                            "type": anchor_type,
+                            "anchorId": str(anchor["anchor_id"]),
+                            "expectedValue": expected.hex(),
+                        }
+                    )
+        _walk(current, branch.get("branches", []), anchors)
+
+
+def evaluate_receipt(proof: Union[bytes, Mapping[str, Any]]) -> List[Dict[str, Any]]:
+    """Recomputes the hash path of a receipt and returns the value expected at each anchor.
+
+    :param proof: A proof in json or binary format.
+    :type proof: Union[bytes, Mapping[str, Any]]
+    :raises ValueError: When the receipt uses an unsupported hash operation.
+    :return: A list of {'type', 'anchorId', 'expectedValue'} documents, one per anchor.
+    :rtype: List[Dict[str, Any]]
+    """
+    receipt = decode_receipt(proof)
+    anchors: List[Dict[str, Any]] = []
+    _walk(bytes.fromhex(receipt["hash"]), receipt.get("branches", []), anchors)
+    return anchors
+
+
+def _extract_proof(proof: Any) -> Union[bytes, Mapping[str, Any]]:
+    """Accepts a receipt, or any response document holding one in its 'proof' field."""
+    if isinstance(proof, Mapping) and "proof" in proof:
+        proof = proof["proof"]
+    if isinstance(proof, ProvenDocument):
+        proof = proof.data
+    return proof
+
+
+def verify_receipt(
+    proof: Any,
+    anchor_roots: Optional[AnchorRoots] = None,
+    expected_hash: Optional[str] = None,
+) -> ReceiptVerification:
+    """Verifies a receipt locally against known anchor roots, without any network calls.
+    The hash path from the receipt hash to each blockchain anchor is recomputed and compared
+    with the supplied anchor root, or the root held by an :class:`AnchorRootCache`.
+
+    :param proof: A json or binary receipt, or a document holding one in its 'proof' field
+                  such as :class:`pyproven.proofs.VersionProof` or :class:`pyproven.proofs.VerifyProofResponse`.
+    :type proof: Any
+    :param anchor_roots: Known anchor roots as hex strings, keyed by (anchor type, anchor id).
+                         Anchors missing from the mapping are reported with ``verified`` None.
+    :type anchor_roots: Optional[Mapping[Tuple[str, str], str]], optional
+    :param expected_hash: Hash the receipt must start from, e.g. a versionHash or documentHash.
+    :type expected_hash: Optional[str], optional
+    :return: A dict-like object holding the result for each anchor and overall validity.
+    :rtype: ReceiptVerification
+    """
+    receipt = decode_receipt(_extract_proof(proof))
+    return ReceiptVerification(
+        _check_anchors(
+            receipt["hash"], evaluate_receipt(receipt), anchor_roots, expected_hash
+        )
+    )
+
+
+def _check_anchors(
+    receipt_hash: str,
+    anchors: List[Dict[str, Any]],
+    anchor_roots: Optional[AnchorRoots],
+    expected_hash: Optional[str],
+) -> Dict[str, Any]:
+    """Compares evaluated anchors with the known anchor roots, returning a verification document."""
+    # an empty AnchorRootCache is falsy, but may still look roots up.
+    if anchor_roots is None:
+        anchor_roots = {}
+    for anchor in anchors:
+        root = anchor_roots.get((anchor["type"], anchor["anchorId"]))
+        anchor["verified"] = (
+            None if root is None else root.lower() == anchor["expectedValue"]
+        )
+    checked = [
+        anchor["verified"] for anchor in anchors if anchor["verified"] is not None
+    ]
+    valid = bool(checked) and all(checked)
+    if expected_hash is not None:
+        valid = valid and expected_hash.lower() == receipt_hash.lower()
+    return {"hash": receipt_hash, "valid": valid, "anchors": anchors}
+
+
+def _verify_chunk(
+    args: Tuple[List[Any], Optional[AnchorRoots], Optional[List[Optional[str]]]],
+) -> List[Dict[str, Any]]:
+    proofs, anchor_roots, expected_hashes = args
+    hashes = expected_hashes or [None] * len(proofs)
+    return [
+        verify_receipt(proof, anchor_roots, expected_hash).data
+        for proof, expected_hash in zip(proofs, hashes)
+    ]
+
+
+def verify_receipts(
+    proofs: Iterable[Any],
+    anchor_roots: Optional[AnchorRoots] = None,
+    expected_hashes: Optional[Iterable[Optional[str]]] = None,
+    processes: Optional[int] = None,
+    chunk_size: int = 256,
+) -> List[ReceiptVerification]:
+    """Verifies many receipts offline, spreading the work over a process pool.
+    See :func:`verify_receipt`.
+
+    :param proofs: The receipts, or documents holding them, to verify.
+    :type proofs: Iterable[Any]
+    :param anchor_roots: Known anchor roots as hex strings, keyed by (anchor type, anchor id).
+                         With an :class:`AnchorRootCache`, workers receive the roots cached so far,
+                         and roots they are missing are looked up in this process.
+    :type anchor_roots: Optional[Mapping[Tuple[str, str], str]], optional
+    :param expected_hashes: Hash each receipt must start from, in the same order as ``proofs``.
+    :type expected_hashes: Optional[Iterable[Optional[str]]], optional
+    :param processes: Number of worker processes, defaults to the number of CPUs.
+    :type processes: Optional[int], optional
+    :param chunk_size: Number of receipts sent to a worker at a time, defaults to 256
+    :type chunk_size: int, optional
+    :return: One result per receipt, in input order.
+    :rtype: List[ReceiptVerification]
+    """
+    receipts = [_extract_proof(proof) for proof in proofs]
+    hashes = list(expected_hashes) if expected_hashes is not None else None
+    if isinstance(anchor_roots, AnchorRootCache):
+        roots: Optional[Dict[Tuple[str, str], str]] = anchor_roots.snapshot()
+    else:
+        roots = dict(anchor_roots) if anchor_roots else None
+    chunks = [
+        (
+            receipts[i : i + chunk_size],
+            roots,
+            hashes[i : i + chunk_size] if hashes is not None else None,
+        )
+        for i in range(0, len(receipts), chunk_size)
+    ]
+    documents: List[Dict[str, Any]] = []
+    with ProcessPoolExecutor(max_workers=processes) as executor:
+        for chunk in executor.map(_verify_chunk, chunks):
+            documents.extend(chunk)
+    if isinstance(anchor_roots, AnchorRootCache):
+        # anchors the workers had no root for are looked up here, and their receipts checked again.
+        for index, document in enumerate(documents):
+            if any(anchor["verified"] is None for anchor in document["anchors"]):
+                documents[index] = _check_anchors(
+                    document["hash"],
+                    document["anchors"],
+                    anchor_roots,
+                    hashes[index] if hashes is not None else None,
+                )
+    return [ReceiptVerification(document) for document in documents]
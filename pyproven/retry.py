@@ -0,0 +1,192 @@
+import random
+import time
+from typing import Any, Iterable, Mapping, Optional, Union
+
+from pymongo.errors import PyMongoError
+
+from pyproven.exceptions import (
+    TRANSIENT_ERRORS,
+    UNSENT_ERRORS,
+    classify_error,
+    translate_error,
+)
+
+#: Commands that are safe to run more than once, and so are retried on any transient error.
+#: setVersion is left out: it changes the version of the session, and a retry on a new
+#: connection could pin a different "current" version than the attempt that failed.
+IDEMPOTENT_COMMANDS = frozenset(
+    (
+        "getVersion",
+        "listVersions",
+        "getProof",
+        "verifyProof",
+        "docHistory",
+        "getDocumentProof",
+        "listStorage",
+        "showMetadata",
+    )
+)
+
+
+def command_name(command: Union[str, Mapping[str, Any]]) -> str:
+    """Returns the name of a command given as a string or a command document."""
+    if isinstance(command, str):
+        return command
+    return next(iter(command))
+
+
+class RetryPolicy:
+    """Decides whether, and after how long, a failed ProvenDB command is retried.
+
+    Commands are retried on transient errors caused by failovers or network failures, see
+    :data:`pyproven.exceptions.TRANSIENT_ERRORS`. Idempotent commands are retried on any transient error,
+    other commands, unless ``retry_writes`` is False, only when the error shows the command never ran,
+    such as a not primary error.
+    Delays grow exponentially from ``base_delay`` up to ``max_delay`` with full jitter, so clients
+    recovering from the same election do not retry in step.
+    ProvenDB uses :data:`DEFAULT_RETRY` unless given a policy, which retries idempotent commands only.
+
+    :param max_attempts: Maximum number of attempts for a command, including the first. 1 disables retries.
+    :type max_attempts: int, optional
+    :param base_delay: Upper bound in seconds of the delay before the first retry, defaults to 0.1
+    :type base_delay: float, optional
+    :param max_delay: Upper bound in seconds of any delay, defaults to 5.0
+    :type max_delay: float, optional
+    :param deadline: Seconds after the first attempt past which no retry is started, defaults to 30.0.
+                     None for no deadline.
+    :type deadline: Optional[float], optional
+    :param idempotent_commands: Names of commands retried on any transient error,
+                                defaults to :data:`IDEMPOTENT_COMMANDS`.
+    :type idempotent_commands: Optional[Iterable[str]], optional
+    :param retry_writes: If False, commands that are not idempotent always run once. Defaults to True.
+    :type retry_writes: bool, optional
+    """
+
+    def __init__(
+        self,
+        max_attempts: int = 5,
+        base_delay: float = 0.1,
+        max_delay: float = 5.0,
+        deadline: Optional[float] = 30.0,
+        idempotent_commands: Optional[Iterable[str]] = None,
+        retry_writes: bool = True,
+    ):
+        self.max_attempts: int = max_attempts
+        self.base_delay: float = base_delay
+        self.max_delay: float = max_delay
+        self.deadline: Optional[float] = deadline
+        self.idempotent_commands: frozenset = (
+            IDEMPOTENT_COMMANDS
+            if idempotent_commands is None
+            else frozenset(idempotent_commands)
+        )
+        self.retry_writes: bool = retry_writes
+
+    def is_idempotent(self, command: Union[str, Mapping[str, Any]]) -> bool:
+        """Returns True if the command is safe to run more than once."""
+        return command_name(command) in self.idempotent_commands
+
+    def backoff(self, attempt: int) -> float:
+        """Returns a jittered delay in seconds before retrying after the given failed attempt.
+
+        :param attempt: Number of attempts made so far, starting from 1.
+        :type attempt: int
+        :rtype: float
+        """
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        )
+
+    def retry_delay(
+        self,
+        err: PyMongoError,
+        attempt: int,
+        started: float,
+        idempotent: bool,
+    ) -> Optional[float]:
+        """Returns the delay before retrying a failed command, or None if it should not be retried.
+
+        :param err: The error raised by the failed attempt.
+        :type err: PyMongoError
+        :param attempt: Number of attempts made so far, starting from 1.
+        :type attempt: int
+        :param started: :func:`time.monotonic` time of the first attempt.
+        :type started: float
+        :param idempotent: Whether the command is safe to run more than once.
+        :type idempotent: bool
+        :rtype: Optional[float]
+        """
+        if attempt >= self.max_attempts or not (idempotent or self.retry_writes):
+            return None
+        error_class = classify_error(err)
+        if error_class not in (TRANSIENT_ERRORS if idempotent else UNSENT_ERRORS):
+            return None
+        delay = self.backoff(attempt)
+        if (
+            self.deadline is not None
+            and time.monotonic() + delay - started > self.deadline
+        ):
+            return None
+        return delay
+
+
+class RetryState:
+    """Attempts of one command under a :class:`RetryPolicy`, shared by the synchronous and asynchronous clients:
+
+    .. code-block:: python
+
+        state = RetryState(policy, command)
+        while True:
+            try:
+                return database.command(command)
+            except PyMongoError as err:
+                delay = state.failed(err)
+            time.sleep(delay)
+
+    :param policy: The policy deciding whether to retry.
+    :type policy: RetryPolicy
+    :param command: Name of the command, or a command document.
+    :type command: Union[str, Mapping[str, Any]]
+    :param idempotent: Whether the command is safe to run more than once,
+                       defaults to :meth:`RetryPolicy.is_idempotent`.
+    :type idempotent: Optional[bool], optional
+    """
+
+    def __init__(
+        self,
+        policy: RetryPolicy,
+        command: Union[str, Mapping[str, Any]],
+        idempotent: Optional[bool] = None,
+    ):
+        self.policy: RetryPolicy = policy
+        self.idempotent: bool = (
+            policy.is_idempotent(command) if idempotent is None else idempotent
+        )
+        self.attempt: int = 1
+        self.started: float = time.monotonic()
+
+    def failed(self, err: PyMongoError) -> float:
+        """Returns the delay before the next attempt after a failed one. When the command is not
+        retried, raises the error translated by :func:`pyproven.exceptions.translate_error` instead.
+
+        :param err: The error raised by the failed attempt.
+        :type err: PyMongoError
+        :rtype: float
+        """
+        delay = self.policy.retry_delay(
+            err, self.attempt, self.started, self.idempotent
+        )
+        if delay is None:
+            error = translate_error(err)
+            if error is err:
+                raise err
+            raise error from err
+        self.attempt += 1
+        return delay
+
+
+#: The policy used by ProvenDB unless given one: idempotent commands are retried on transient errors,
+#: for up to 5 attempts and 30 seconds, and every other command runs once.
+DEFAULT_RETRY = RetryPolicy(retry_writes=False)
+#: A policy that never retries.
+NO_RETRY = RetryPolicy(max_attempts=1)
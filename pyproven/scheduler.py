@@ -0,0 +1,194 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from pyproven.database import ProvenDB
+from pyproven.proofs import SubmitProofResponse
+
+
+class ProofScheduler:
+    """Coalesces requests to prove versions into as few ``submitProof`` commands as possible.
+
+    A proof of a version also proves every earlier version, so each request only asks for a proof of
+    *at least* a version. Requests are held for up to ``window`` seconds and then answered by a single
+    proof of the highest requested version. A proof is submitted early when the highest requested version is
+    ``version_interval`` or more versions past the last submitted proof, and never more often than
+    ``max_per_minute`` times in any minute. Proofs are submitted from a background thread:
+
+    .. code-block:: python
+
+        with ProofScheduler(pdb, window=30) as scheduler:
+            future = scheduler.request(pdb.get_version().version)
+            ...
+        proof_id = future.result().proofId
+
+    :param pdb: The ProvenDB object used to submit proofs.
+    :type pdb: ProvenDB
+    :param window: Longest time in seconds a request waits before a proof is submitted, defaults to 10.0
+    :type window: float, optional
+    :param version_interval: Number of versions past the last submitted proof that triggers a proof
+                             without waiting for the window, defaults to never.
+    :type version_interval: Optional[int], optional
+    :param max_per_minute: Most proofs submitted in any 60 second period, defaults to 6
+    :type max_per_minute: int, optional
+    :param collections: The collections to be included in every proof, defaults to all.
+    :type collections: Optional[List[str]], optional
+    :param filter: A MongoDB filter that selects documents within the collections, defaults to all documents.
+    :type filter: Optional[Dict[str, Any]], optional
+    :param anchor_type: The blockchain used to anchor the proofs, defaults to ETH_MAINNET.
+    :type anchor_type: Optional[str], optional
+    :param n_checks: Number of times the proof hash will be recalculated.
+    :type n_checks: Optional[int], optional
+    """
+
+    def __init__(
+        self,
+        pdb: ProvenDB,
+        window: float = 10.0,
+        version_interval: Optional[int] = None,
+        max_per_minute: int = 6,
+        collections: Optional[List[str]] = None,
+        filter: Optional[Dict[str, Any]] = None,
+        anchor_type: Optional[str] = None,
+        n_checks: Optional[int] = None,
+    ):
+        if max_per_minute < 1:
+            raise ValueError("max_per_minute must be at least 1.")
+        self.pdb: ProvenDB = pdb
+        self.window: float = window
+        self.version_interval: Optional[int] = version_interval
+        self.max_per_minute: int = max_per_minute
+        self._submit_args: Dict[str, Any] = {
+            "collections": collections,
+            "filter": filter,
+            "anchor_type": anchor_type,
+            "n_checks": n_checks,
+        }
+        #: Number of proofs submitted so far.
+        self.submitted: int = 0
+        self._condition = threading.Condition()
+        self._pending: List[Tuple[int, Future]] = []
+        self._first_request: float = 0.0
+        self._flush = False
+        self._closed = False
+        # version and futures of the proof being submitted, which later requests can join.
+        self._in_flight_version: Optional[int] = None
+        self._in_flight: List[Future] = []
+        self._last_response: Optional[SubmitProofResponse] = None
+        self._submit_times: Deque[float] = deque(maxlen=max_per_minute)
+        self._thread = threading.Thread(
+            target=self._run, name="pyproven-proof-scheduler", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self) -> "ProofScheduler":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def request(self, version: int) -> Future:
+        """Requests a proof of at least ``version``.
+
+        :param version: The lowest version number the proof must cover.
+        :type version: int
+        :raises RuntimeError: When the scheduler is closed.
+        :return: A future resolving to the :class:`pyproven.proofs.SubmitProofResponse` of a proof
+                 covering ``version``, or raising the error of the failed submission.
+        :rtype: Future
+        """
+        future: Future = Future()
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot request a proof from a closed scheduler.")
+            if (
+                self._last_response is not None
+                and self._last_response.version >= version
+            ):
+                future.set_result(self._last_response)
+                return future
+            if (
+                self._in_flight_version is not None
+                and self._in_flight_version >= version
+            ):
+                self._in_flight.append(future)
+                return future
+            if not self._pending:
+                self._first_request = time.monotonic()
+            self._pending.append((version, future))
+            self._condition.notify()
+        return future
+
+    def flush(self) -> None:
+        """Submits a proof for all pending requests as soon as the rate limit allows."""
+        with self._condition:
+            self._flush = True
+            self._condition.notify()
+
+    def close(self, wait: bool = True) -> None:
+        """Stops accepting requests and submits a final proof for any pending requests.
+
+        :param wait: If True, blocks until the final proof is submitted, defaults to True
+        :type wait: bool, optional
+        """
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+        if wait:
+            self._thread.join()
+
+    def _due(self, now: float) -> float:
+        """Returns the monotonic time at which the pending requests should be submitted."""
+        due = self._first_request + self.window
+        if self._flush or self._closed:
+            due = now
+        elif self.version_interval is not None:
+            proven = (
+                self._last_response.version if self._last_response is not None else 0
+            )
+            highest = max(version for version, _ in self._pending)
+            if highest - proven >= self.version_interval:
+                due = now
+        if len(self._submit_times) == self.max_per_minute:
+            due = max(due, self._submit_times[0] + 60.0)
+        return due
+
+    def _run(self) -> None:
+        while True:
+            with self._condition:
+                while True:
+                    if not self._pending:
+                        self._flush = False
+                        if self._closed:
+                            return
+                        self._condition.wait()
+                        continue
+                    now = time.monotonic()
+                    due = self._due(now)
+                    if due <= now:
+                        break
+                    self._condition.wait(due - now)
+                version = max(version for version, _ in self._pending)
+                self._in_flight = [future for _, future in self._pending]
+                self._in_flight_version = version
+                self._pending = []
+                self._flush = False
+                self._submit_times.append(now)
+            try:
+                response = self.pdb.submit_proof(version, **self._submit_args)
+            except Exception as err:
+                with self._condition:
+                    futures, self._in_flight = self._in_flight, []
+                    self._in_flight_version = None
+                for future in futures:
+                    future.set_exception(err)
+                continue
+            with self._condition:
+                futures, self._in_flight = self._in_flight, []
+                self._in_flight_version = None
+                self._last_response = response
+                self.submitted += 1
+            for future in futures:
+                future.set_result(response)
@@ -0,0 +1,207 @@
+import functools
+import struct
+from typing import Any, Dict, FrozenSet, Iterable, Optional, Tuple
+
+import bson
+from bson.codec_options import DEFAULT_CODEC_OPTIONS, CodecOptions
+from bson.son import SON
+
+from pyproven.enums import BulkLoadEnums
+
+_pack_int = struct.Struct("<i").pack
+_pack_long = struct.Struct("<q").pack
+_INT32_MIN, _INT32_MAX = -(2**31), 2**31 - 1
+
+
+def encode_element(
+    name: str, value: Any, opts: CodecOptions = DEFAULT_CODEC_OPTIONS
+) -> bytes:
+    """Returns the BSON encoding of a single ``name: value`` element, without a document around it.
+    Strings, integers and booleans are encoded directly, anything else through :func:`bson.encode`.
+
+    :param name: The field name.
+    :type name: str
+    :param value: The field value.
+    :type value: Any
+    :param opts: Codec options used for values that are not encoded directly.
+    :type opts: CodecOptions, optional
+    :rtype: bytes
+    """
+    key = name.encode("utf-8") + b"\x00"
+    kind = type(value)
+    if kind is str:
+        data = value.encode("utf-8")
+        return b"\x02" + key + _pack_int(len(data) + 1) + data + b"\x00"
+    if kind is bool:
+        return b"\x08" + key + (b"\x01" if value else b"\x00")
+    if kind is int:
+        if _INT32_MIN <= value <= _INT32_MAX:
+            return b"\x10" + key + _pack_int(value)
+        return b"\x12" + key + _pack_long(value)
+    return bson.encode({name: value}, codec_options=opts)[4:-1]
+
+
+class CommandTemplate:
+    """A ProvenDB command whose constant fields are BSON encoded once, and reused by every
+    command built from it. Only the command value, e.g. a version number or proofId, varies per call:
+
+    .. code-block:: python
+
+        GET_PROOF_JSON = CommandTemplate("getProof", format="json")
+        pdb._command(GetVersionProofResponse, GET_PROOF_JSON.command(proof_id))
+
+    Commands built from a template are ordinary :class:`bson.son.SON` documents, accepted by
+    :meth:`pymongo.database.Database.command` and any stand-in for it. When the
+    :mod:`pyproven.provendb_hack` encoder is installed they are sent without encoding the
+    constant fields again.
+
+    :param name: Name of the command, e.g. 'getProof'.
+    :type name: str
+    :param value: Value of the command when it is constant, e.g. 1 for 'getVersion'. When omitted
+                  the value is given to :meth:`command` on every call.
+    :type value: Any, optional
+    :param fields: Constant fields that follow the command name, in order.
+    """
+
+    _VARIABLE = object()
+
+    def __init__(self, name: str, value: Any = _VARIABLE, **fields: Any):
+        self.name: str = name
+        self.value: Any = value
+        self.fields: Dict[str, Any] = fields
+        # the encoded constant fields, and the encoded command element when its value is constant.
+        self._fields_bytes: bytes = b"".join(
+            encode_element(key, item) for key, item in fields.items()
+        )
+        self._head_bytes: Optional[bytes] = (
+            None if value is self._VARIABLE else encode_element(name, value)
+        )
+        self.n_fields: int = len(fields) + 1
+
+    def command(self, value: Any = _VARIABLE) -> "TemplateCommand":
+        """Returns a new command document from this template.
+        pymongo adds session fields to a command as it is sent, so a document is built for every call.
+
+        :param value: Value of the command, required when the template has no constant value.
+        :type value: Any, optional
+        :rtype: TemplateCommand
+        """
+        if value is self._VARIABLE:
+            value = self.value
+            if value is self._VARIABLE:
+                raise TypeError(f"The {self.name} template requires a command value.")
+        return TemplateCommand(self, value)
+
+    def encoded_fields(self, value: Any, opts: CodecOptions) -> bytes:
+        """Returns the encoded elements of a command built from this template with ``value``."""
+        if (
+            self._head_bytes is not None
+            and type(value) is type(self.value)
+            and value == self.value
+        ):
+            return self._head_bytes + self._fields_bytes
+        return encode_element(self.name, value, opts) + self._fields_bytes
+
+    def encoded_size(self, value: Any) -> int:
+        """Returns the size of a command built from this template once BSON encoded."""
+        return 5 + len(self.encoded_fields(value, DEFAULT_CODEC_OPTIONS))
+
+
+class TemplateCommand(SON):
+    """Command document built by :meth:`CommandTemplate.command`. Fields pymongo appends to it,
+    such as the session id, are encoded as usual."""
+
+    def __init__(self, template: CommandTemplate, value: Any):
+        super().__init__()
+        self[template.name] = value
+        for key, item in template.fields.items():
+            self[key] = item
+        self.template: CommandTemplate = template
+        self.value: Any = value
+
+
+def _copy(value: Any) -> Any:
+    """Copies the documents and lists of a value, keeping their types and leaving its scalars shared."""
+    if isinstance(value, dict):
+        return type(value)((key, _copy(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [_copy(item) for item in value]
+    return value
+
+
+def _same(value: Any, other: Any) -> bool:
+    """Returns True if two values encode alike: equal, with the same types and field order throughout.
+    Plain equality is not enough, as ``1 == 1.0 == True`` while each is encoded differently.
+    """
+    if type(value) is not type(other):
+        return False
+    if isinstance(value, dict):
+        return list(value) == list(other) and all(
+            _same(item, other[key]) for key, item in value.items()
+        )
+    if isinstance(value, list):
+        return len(value) == len(other) and all(map(_same, value, other))
+    return value == other
+
+
+#: Fields pymongo adds to commands that rarely change between them.
+SESSION_FIELDS = ("lsid", "$clusterTime")
+
+
+class ElementCache:
+    """Remembers the last encoding of each named field, so fields that rarely change between
+    commands, like the session id, are not encoded again. Safe to share between threads.
+
+    A cached encoding is only reused for a value of the same types and field order, encoded with
+    the same codec options.
+
+    :param names: The fields whose encoding is cached, defaults to :data:`SESSION_FIELDS`.
+    :type names: Iterable[str], optional
+    """
+
+    def __init__(self, names: Iterable[str] = SESSION_FIELDS) -> None:
+        self.names: FrozenSet[str] = frozenset(names)
+        self._elements: Dict[str, Tuple[CodecOptions, Any, bytes]] = {}
+
+    def encode(self, name: str, value: Any, opts: CodecOptions) -> bytes:
+        """Returns the encoding of a ``name: value`` element, see :func:`encode_element`."""
+        if name not in self.names or not isinstance(value, dict):
+            return encode_element(name, value, opts)
+        cached = self._elements.get(name)
+        if cached is not None and cached[0] == opts and _same(cached[1], value):
+            return cached[2]
+        element = encode_element(name, value, opts)
+        # keep a copy, as pymongo may modify the same document before the next command.
+        self._elements[name] = (opts, _copy(value), element)
+        return element
+
+
+#: Templates of the commands sent most often, e.g. by monitoring loops.
+GET_VERSION = CommandTemplate("getVersion", 1)
+SET_VERSION = CommandTemplate("setVersion")
+SHOW_METADATA = CommandTemplate("showMetadata", True)
+HIDE_METADATA = CommandTemplate("showMetadata", False)
+BULK_LOAD: Dict[BulkLoadEnums, CommandTemplate] = {
+    option: CommandTemplate("bulkLoad", option.value) for option in BulkLoadEnums
+}
+
+
+@functools.lru_cache(maxsize=None)
+def get_proof_template(
+    proof_format: Optional[str], list_collections: Optional[bool]
+) -> CommandTemplate:
+    """Returns the getProof template for a combination of options."""
+    fields: Dict[str, Any] = {}
+    if proof_format:
+        fields["format"] = proof_format
+    if list_collections:
+        fields["listCollections"] = list_collections
+    return CommandTemplate("getProof", **fields)
+
+
+@functools.lru_cache(maxsize=None)
+def verify_proof_template(format: Optional[str]) -> CommandTemplate:
+    """Returns the verifyProof template for a proof format."""
+    if format:
+        return CommandTemplate("verifyProof", format=format)
+    return CommandTemplate("verifyProof")
@@ -2,6 +2,9 @@ from typing import Any, Dict, List
 from collections import UserDict
 from pyproven.response import ProvenDocument, ProvenResponse
 
+#: Unversioned collection in which ProvenDB records every version proof and its status.
+VERSION_PROOFS_COLLECTION = "_provendb_versionProofs"
+
 
 class BulkLoadResponse(ProvenResponse):
     """ABC for bulk load response classes."""
@@ -32,6 +35,20 @@ class BulkLoadStatusResponse(BulkLoadResponse):
         self.status = self["status"]
 
 
+class BulkIngestSummary(ProvenDocument):
+    """Dict-like object summarising a :meth:`pyproven.database.ProvenDB.bulk_ingest` run,
+    including the version the bulk load was started at and the achieved throughput."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self.version = self["version"]
+        self.documentsInserted: int = self["documentsInserted"]
+        self.bytesInserted: int = self["bytesInserted"]
+        self.seconds: float = self["seconds"]
+        self.documentsPerSecond: float = self["documentsPerSecond"]
+        self.bytesPerSecond: float = self["bytesPerSecond"]
+
+
 class CreateIgnoredResponse(ProvenResponse):
     """ProvenDB response document when setting a collection to be ignored."""
 
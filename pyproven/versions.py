@@ -1,6 +1,6 @@
 from collections import UserDict
 
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 
 
 from pyproven.response import ProvenDocument, ProvenResponse
@@ -33,6 +33,19 @@ class ListVersionsResponse(ProvenDocument):
         self["versions"] = [ListVersionDocument(doc) for doc in document["versions"]]
 
 
+class VersionChange(ProvenDocument):
+    """A dict-like object holding the change to one document between two versions, yielded by
+    :meth:`pyproven.database.ProvenDB.diff_versions`. The 'operationType' is 'insert', 'update'
+    or 'delete', and 'before' or 'after' is None where the document does not exist."""
+
+    def __init__(self, document: Dict[str, Any]):
+        super().__init__(document)
+        self._id: Any = document["_id"]
+        self.operationType: str = document["operationType"]
+        self.before: Optional[Dict[str, Any]] = document["before"]
+        self.after: Optional[Dict[str, Any]] = document["after"]
+
+
 class VersionResponse(ProvenResponse):
     """ABC for get_version and set_version response documents."""
 
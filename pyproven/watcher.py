@@ -0,0 +1,248 @@
+import heapq
+import itertools
+import math
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from pymongo.errors import PyMongoError
+
+from pyproven.cache import is_final_status
+from pyproven.database import ProvenDB
+from pyproven.utilities import VERSION_PROOFS_COLLECTION
+
+
+class _WatchedProof:
+    __slots__ = ("proof_id", "future", "added", "deadline")
+
+    def __init__(self, proof_id: str, future: Future, added: float, deadline: float):
+        self.proof_id = proof_id
+        self.future = future
+        self.added = added
+        self.deadline = deadline
+
+
+class ProofWatcher:
+    """Watches submitted proofs from a background thread until they reach a final status.
+
+    Rather than polling each proof with :meth:`pyproven.database.ProvenDB.get_version_proof`, the status of
+    every due proof is read from the ``_provendb_versionProofs`` collection with one query per ``batch_size``
+    proofs. A proof is polled again after a delay of ``age_factor`` times its age, bounded by ``min_interval``
+    and ``max_interval``, so young proofs are polled often and old ones rarely. Only once a proof is final
+    is it fetched with :meth:`pyproven.database.ProvenDB.get_version_proof`:
+
+    .. code-block:: python
+
+        with ProofWatcher(pdb) as watcher:
+            future = watcher.watch(pdb.submit_proof(version).proofId)
+            print(future.result()["status"])
+
+    :param pdb: The ProvenDB object used to poll proofs.
+    :type pdb: ProvenDB
+    :param min_interval: Shortest delay in seconds between polls of a proof, defaults to 5.0
+    :type min_interval: float, optional
+    :param max_interval: Longest delay in seconds between polls of a proof, defaults to 300.0
+    :type max_interval: float, optional
+    :param age_factor: Delay between polls as a fraction of the proof's age, defaults to 0.25
+    :type age_factor: float, optional
+    :param batch_size: Most proofs polled by a single query, defaults to 500
+    :type batch_size: int, optional
+    :param max_age: Seconds after which a proof that is still not final fails with :class:`TimeoutError`,
+                    defaults to never.
+    :type max_age: Optional[float], optional
+    :param proof_format: Format of final proofs, see :meth:`pyproven.database.ProvenDB.get_version_proof`.
+    :type proof_format: Optional[str], optional
+    """
+
+    def __init__(
+        self,
+        pdb: ProvenDB,
+        min_interval: float = 5.0,
+        max_interval: float = 300.0,
+        age_factor: float = 0.25,
+        batch_size: int = 500,
+        max_age: Optional[float] = None,
+        proof_format: Optional[str] = None,
+    ):
+        self.pdb: ProvenDB = pdb
+        self.min_interval: float = min_interval
+        self.max_interval: float = max_interval
+        self.age_factor: float = age_factor
+        self.batch_size: int = batch_size
+        self.max_age: Optional[float] = max_age
+        self.proof_format: Optional[str] = proof_format
+        #: Number of status queries sent so far.
+        self.polls: int = 0
+        self._condition = threading.Condition()
+        self._watched: Dict[str, _WatchedProof] = {}
+        # (next poll time, tie breaker, proof id) for every watched proof.
+        self._schedule: List[Tuple[float, int, str]] = []
+        self._counter = itertools.count()
+        self._closed = False
+        self._thread = threading.Thread(
+            target=self._run, name="pyproven-proof-watcher", daemon=True
+        )
+        self._thread.start()
+
+    def __enter__(self) -> "ProofWatcher":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def __len__(self) -> int:
+        with self._condition:
+            return len(self._watched)
+
+    def watch(
+        self,
+        proof_id: str,
+        callback: Optional[Callable[[Future], Any]] = None,
+    ) -> Future:
+        """Starts watching a proof. Watching a proof already being watched returns the same future.
+
+        :param proof_id: The id of the proof, e.g. :attr:`pyproven.proofs.SubmitProofResponse.proofId`.
+        :type proof_id: str
+        :param callback: Called with the future once it is done, see :meth:`concurrent.futures.Future.add_done_callback`.
+        :type callback: Optional[Callable[[Future], Any]], optional
+        :raises RuntimeError: When the watcher is closed.
+        :return: A future resolving to the final :class:`pyproven.proofs.VersionProof`, whose status may be
+                 'valid', 'invalid' or 'failed'. It raises :class:`TimeoutError` if the proof exceeds ``max_age``,
+                 or the error of a status query that failed with anything but a :class:`pymongo.errors.PyMongoError`,
+                 which are retried at the next poll.
+        :rtype: Future
+        """
+        with self._condition:
+            if self._closed:
+                raise RuntimeError("Cannot watch a proof with a closed watcher.")
+            watched = self._watched.get(proof_id)
+            if watched is None:
+                now = time.monotonic()
+                deadline = (
+                    now + self.max_age if self.max_age is not None else float("inf")
+                )
+                watched = _WatchedProof(proof_id, Future(), now, deadline)
+                self._watched[proof_id] = watched
+                self._push(now + self.min_interval, proof_id)
+                self._condition.notify()
+            future = watched.future
+        if callback is not None:
+            future.add_done_callback(callback)
+        return future
+
+    def close(self, wait: bool = True) -> None:
+        """Stops watching, cancelling the futures of proofs that are not final yet.
+
+        :param wait: If True, blocks until the background thread has stopped, defaults to True
+        :type wait: bool, optional
+        """
+        with self._condition:
+            self._closed = True
+            watched = list(self._watched.values())
+            self._watched.clear()
+            self._schedule.clear()
+            self._condition.notify()
+        for proof in watched:
+            proof.future.cancel()
+        if wait:
+            self._thread.join()
+
+    def _push(self, when: float, proof_id: str) -> None:
+        # polls are aligned to multiples of min_interval so proofs watched at different times share queries.
+        when = math.ceil(when / self.min_interval) * self.min_interval
+        heapq.heappush(self._schedule, (when, next(self._counter), proof_id))
+
+    def _interval(self, age: float) -> float:
+        return max(self.min_interval, min(self.max_interval, age * self.age_factor))
+
+    def _due(self) -> Optional[List[_WatchedProof]]:
+        """Waits for proofs to be due and pops them, returning None once closed."""
+        with self._condition:
+            while True:
+                if self._closed:
+                    return None
+                if not self._schedule:
+                    self._condition.wait()
+                    continue
+                now = time.monotonic()
+                if self._schedule[0][0] > now:
+                    self._condition.wait(self._schedule[0][0] - now)
+                    continue
+                due = []
+                while self._schedule and self._schedule[0][0] <= now:
+                    proof = self._watched.get(heapq.heappop(self._schedule)[2])
+                    if proof is not None:
+                        due.append(proof)
+                if due:
+                    return due
+
+    def _poll(self, batch: List[_WatchedProof]) -> Dict[str, Any]:
+        """Returns the status of each proof in a batch that could be found."""
+        self.polls += 1
+        cursor = self.pdb[VERSION_PROOFS_COLLECTION].find(
+            {"proofId": {"$in": [proof.proof_id for proof in batch]}},
+            {"_id": 0, "proofId": 1, "status": 1},
+        )
+        return {document["proofId"]: document.get("status") for document in cursor}
+
+    def _finish(self, proof: _WatchedProof) -> None:
+        try:
+            response = self.pdb.get_version_proof(
+                proof.proof_id, proof_format=self.proof_format
+            )
+            proof.future.set_result(response.proofs[0])
+        except Exception as err:
+            proof.future.set_exception(err)
+
+    def _fail(self, batch: List[_WatchedProof], err: BaseException) -> None:
+        """Stops watching a batch whose poll failed unexpectedly, failing its futures with the error."""
+        with self._condition:
+            failed = [
+                proof for proof in batch if self._watched.get(proof.proof_id) is proof
+            ]
+            for proof in failed:
+                del self._watched[proof.proof_id]
+        for proof in failed:
+            proof.future.set_exception(err)
+
+    def _run(self) -> None:
+        while True:
+            due = self._due()
+            if due is None:
+                return
+            for start in range(0, len(due), self.batch_size):
+                batch = due[start : start + self.batch_size]
+                try:
+                    statuses = self._poll(batch)
+                except PyMongoError:
+                    # transient, so the batch is polled again when next due.
+                    statuses = {}
+                except Exception as err:
+                    self._fail(batch, err)
+                    continue
+                now = time.monotonic()
+                finished = []
+                expired = []
+                with self._condition:
+                    for proof in batch:
+                        if self._watched.get(proof.proof_id) is not proof:
+                            continue
+                        if is_final_status(statuses.get(proof.proof_id)):
+                            del self._watched[proof.proof_id]
+                            finished.append(proof)
+                        elif now >= proof.deadline:
+                            del self._watched[proof.proof_id]
+                            expired.append(proof)
+                        else:
+                            self._push(
+                                now + self._interval(now - proof.added), proof.proof_id
+                            )
+                for proof in expired:
+                    proof.future.set_exception(
+                        TimeoutError(
+                            f"Proof {proof.proof_id} is not final after {self.max_age} seconds."
+                        )
+                    )
+                for proof in finished:
+                    self._finish(proof)
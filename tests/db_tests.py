@@ -8,7 +8,26 @@ import os
 
 from pymongo import MongoClient
 
-from pyproven import ProvenDB
+from pyproven import AsyncProvenDB, MemoryProofCache, ProvenDB
+from pyproven.versions import GetVersionResponse
+from pyproven.enums import ErrorClassEnums
+from pyproven.exceptions import BulkLoadAlreadyStartedError, classify_error
+from pyproven.receipts import evaluate_receipt
+from pyproven.metrics import InMemoryMetrics, prometheus_text
+from pyproven.scheduler import ProofScheduler
+from pyproven.watcher import ProofWatcher
+from pyproven.fleet import ProvenDBFleet
+from pyproven.hashing import document_hashes_from_proofs, find_tampered_documents
+from bson.codec_options import CodecOptions
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+
+import asyncio
+
+try:
+    from motor import motor_asyncio
+except ImportError:
+    motor_asyncio = None
 
 import time
 if os.getenv("PROVENDB_URI"):
@@ -43,6 +62,38 @@ class ProvenDBTests(unittest.TestCase):
         except Exception as err:
             self.pdb.bulk_load_kill()
             raise err
+    def test_bulk_load_already_started(self):
+        """PyProven raises BulkLoadAlreadyStartedError when starting a second bulk load."""
+        self.pdb.bulk_load_start()
+        try:
+            with self.assertRaises(BulkLoadAlreadyStartedError) as context:
+                self.pdb.bulk_load_start()
+            self.assertTrue(
+                classify_error(context.exception) == ErrorClassEnums.BULK_LOAD_ALREADY_STARTED
+            )
+        finally:
+            self.pdb.bulk_load_kill()
+
+    def test_bulk_ingest(self):
+        """PyProven can stream a generator of documents into a single bulk load."""
+        try:
+            summary = self.pdb.bulk_ingest(
+                "unit-test-bulk", ({"x": i} for i in range(50)), batch_size=10
+            )
+        except Exception as err:
+            self.pdb.bulk_load_kill()
+            raise err
+        self.assertTrue(summary.documentsInserted == 50)
+        self.assertTrue(self.pdb.bulk_load_status().status == "off")
+
+    def test_get_document_proofs(self):
+        """PyProven returns batched document proofs in input order, sending duplicates once."""
+        version = self.pdb.set_version("current").version
+        requests = [("unit-test", {"x": i % 3}, version) for i in range(6)]
+        responses = self.pdb.get_document_proofs(requests, workers=3)
+        self.assertTrue(len(responses) == 6)
+        self.assertTrue(responses[0] is responses[3])
+
     def test_get_version(self):
         """PyProven can get the version the DB is set to."""
         version = self.pdb.get_version()
@@ -65,6 +116,14 @@ class ProvenDBTests(unittest.TestCase):
         with self.assertRaises(PyMongoError):
             self.pdb.set_version(impossible_version)
 
+    def test_at_version_restores(self):
+        """PyProven can temporarily set a version and restore the previous one on exit."""
+        self.pdb.set_version("current")
+        with self.pdb.at_version(1) as version:
+            self.assertTrue(version.version == 1)
+            self.assertTrue(self.pdb.get_version(refresh=True).version == 1)
+        self.assertTrue("current" in self.pdb.get_version(refresh=True).response)
+
     def test_list_versions_noargs(self):
         """PyProven can call list_versions with no arguments and always presents at least the current version."""
         versions = self.pdb.list_versions()
@@ -75,11 +134,54 @@ class ProvenDBTests(unittest.TestCase):
         versions = self.pdb.list_versions(limit=1)
         self.assertTrue(len(versions["versions"]) == 1)
 
+    def test_iter_versions(self):
+        """PyProven pages through versions without duplicating any."""
+        versions = [version.version for version in self.pdb.iter_versions(page_size=2)]
+        self.assertTrue(versions)
+        self.assertTrue(len(versions) == len(set(versions)))
+
+    def test_list_versions_columns(self):
+        """PyProven can export a version list as columns of equal length."""
+        columns = self.pdb.list_versions_columns()
+        self.assertTrue(len(columns["version"]) == len(columns["effectiveDate"]))
+        self.assertTrue(len(columns["version"]) == len(columns["status"]))
+
+    def test_command_metrics(self):
+        """PyProven reports the latency and response size of each command to a metrics sink."""
+        metrics = InMemoryMetrics()
+        pdb = ProvenDB(self.db, metrics=metrics)
+        pdb.get_version()
+        snapshot = metrics.snapshot()["getVersion"]
+        self.assertTrue(snapshot["latency"]["count"] == 1)
+        self.assertTrue(snapshot["response_bytes"]["sum"] > 0)
+        self.assertTrue(snapshot["in_flight"] == 0)
+        self.assertTrue("pyproven_command_duration_seconds" in prometheus_text(metrics))
+
     def test_doc_history(self):
         """Pyproven can correctly get the history of documents in a filtered collection"""
         history = self.pdb.doc_history("unit-test", {"x": 1})
         self.assertTrue(history.history)
 
+    def test_doc_history_compact(self):
+        """PyProven can return a compact, read-only document history."""
+        history = self.pdb.doc_history("unit-test", {"x": 1}, compact=True)
+        self.assertTrue(history.history[0].versions)
+        self.assertTrue(history["history"][0]["_id"] == history.history[0]._id)
+
+    def test_doc_history_lazy(self):
+        """PyProven can leave document bodies in a document history undecoded until accessed."""
+        history = self.pdb.doc_history("unit-test", {"x": 1}, lazy=True)
+        document = history.history[0].versions[0].document
+        self.assertIsInstance(document, RawBSONDocument)
+        self.assertTrue(document["x"] == 1)
+
+    def test_iter_doc_history(self):
+        """PyProven streams the same document history as a single docHistory command."""
+        history = self.pdb.doc_history("unit-test", {"x": {"$lt": 10}})
+        expected = sum(len(item.versions) for item in history.history)
+        streamed = list(self.pdb.iter_doc_history("unit-test", {"x": {"$lt": 10}}, window_size=3))
+        self.assertTrue(len(streamed) == expected)
+
     def test_list_storage(self):
         """Pyproven can correctly list the storage of all collections in the database."""
 
@@ -119,6 +221,73 @@ class ProvenDBTests(unittest.TestCase):
             proof = self.pdb.verify_proof(document['proofId'])
             self.assertTrue(proof.proofId == document['proofId'])
 
-        
+
+    def test_proof_scheduler_coalesces(self):
+        """PyProven answers several proof requests with a single submitted proof."""
+        version = self.pdb.get_version(refresh=True).version
+        with ProofScheduler(self.pdb, window=0.5) as scheduler:
+            futures = [scheduler.request(version) for _ in range(3)]
+        self.assertTrue(scheduler.submitted == 1)
+        self.assertTrue(len({future.result().proofId for future in futures}) == 1)
+
+    def test_proof_watcher(self):
+        """PyProven resolves a watched proof once its status is final."""
+        for document in self.pdb.db["_provendb_versionProofs"].find({"status": "valid"}).limit(1):
+            with ProofWatcher(self.pdb, min_interval=0.1) as watcher:
+                proof = watcher.watch(document["proofId"]).result(timeout=30)
+            self.assertTrue(proof["proofId"] == document["proofId"])
+
+    def test_evaluate_receipt(self):
+        """PyProven can walk the receipt of a verified proof offline."""
+        for document in self.pdb.db["_provendb_versionProofs"].find({"status": "valid"}).limit(1):
+            proof = self.pdb.verify_proof(document["proofId"])
+            self.assertTrue(evaluate_receipt(proof.proof))
+
+    def test_find_tampered_documents(self):
+        """PyProven recomputes the document hashes ProvenDB keeps in metadata and document proofs, for ObjectId _ids."""
+        collection = self.pdb["unit-test"].with_options(CodecOptions(RawBSONDocument))
+        self.pdb.show_metadata()
+        try:
+            documents = list(collection.find({}).limit(20))
+        finally:
+            self.pdb.hide_metadata()
+        self.assertTrue(documents and all(isinstance(document["_id"], ObjectId) for document in documents))
+        self.assertFalse(list(find_tampered_documents(documents, processes=2)))
+        for document in self.pdb.db["_provendb_versionProofs"].find({"status": "valid"}).limit(1):
+            version = document["version"]
+            expected = document_hashes_from_proofs(self.pdb.get_document_proof("unit-test", {}, version).proofs)
+            with self.pdb.at_version(version):
+                proven = list(collection.find({}))
+            self.assertTrue(set(expected) <= {str(document["_id"]) for document in proven})
+            self.assertFalse(list(find_tampered_documents(proven, expected, processes=2)))
+
+    def test_verify_proof_cached(self):
+        """PyProven serves verified proofs with a final status from the proof cache."""
+        pdb = ProvenDB(self.db, proof_cache=MemoryProofCache())
+        for document in pdb.db["_provendb_versionProofs"].find({"status": "valid"}).limit(1):
+            proof = pdb.verify_proof(document["proofId"])
+            cached = pdb.verify_proof(document["proofId"])
+            self.assertTrue(cached.proofId == proof.proofId)
+            self.assertTrue(cached is not proof)
+
+    def test_fleet_run(self):
+        """ProvenDBFleet runs a ProvenDB method on each database and reuses its ProvenDB objects."""
+        with ProvenDBFleet(self.client, [PROVENDB_DATABASE], max_workers=4) as fleet:
+            outcomes = fleet.run_all("get_version")
+            self.assertTrue(isinstance(outcomes[PROVENDB_DATABASE].unwrap(), GetVersionResponse))
+            self.assertTrue(fleet.provendb(PROVENDB_DATABASE) is fleet.provendb(PROVENDB_DATABASE))
+
+    @unittest.skipUnless(motor_asyncio, "motor is required for AsyncProvenDB tests.")
+    def test_async_get_version(self):
+        """AsyncProvenDB can run many commands concurrently on one event loop."""
+
+        async def _get_versions():
+            client = motor_asyncio.AsyncIOMotorClient(PROVENDB_URI)
+            apdb = AsyncProvenDB(client[PROVENDB_DATABASE])
+            return await asyncio.gather(*[apdb.get_version() for _ in range(10)])
+
+        versions = asyncio.run(_get_versions())
+        self.assertTrue(all(isinstance(v, GetVersionResponse) for v in versions))
+
 if __name__ == "__main__":
     unittest.main()
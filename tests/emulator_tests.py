@@ -0,0 +1,461 @@
+"""Tests that run against the in-process ProvenDB emulator, and need no ProvenDB credentials."""
+import asyncio
+import datetime
+import hashlib
+import itertools
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from collections.abc import Mapping
+
+from bson import BSON
+from bson.codec_options import DEFAULT_CODEC_OPTIONS
+from bson.objectid import ObjectId
+from bson.raw_bson import RawBSONDocument
+from bson.son import SON
+import pymongo
+from pymongo import MongoClient, ReadPreference
+from pymongo.errors import NotPrimaryError
+from pymongo import message
+
+from pyproven import AsyncProvenDB, ProvenDB
+from pyproven.columnar import document_proof_columns, save_npz, to_numpy
+from pyproven.compaction import _start_date, plan_compaction, run_compaction
+from pyproven.emulator import ProvenDBEmulator
+from pyproven.exceptions import CompactProofError
+from pyproven.forget import ForgetPipeline
+from pyproven.hashing import document_hashes_from_proofs, find_tampered_documents, hash_document
+from pyproven.metrics import InMemoryMetrics
+from pyproven.proofs import SubmitProofResponse
+from pyproven.receipts import AnchorRootCache, verify_receipt, verify_receipts
+from pyproven import provendb_hack
+from pyproven.provendb_hack import fix_op_msg
+from pyproven.templates import ElementCache, encode_element, get_proof_template
+from pyproven.watcher import ProofWatcher
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class EmulatorTests(unittest.TestCase):
+    def test_emulator_versions(self):
+        """ProvenDB runs against the in-process emulator, which keeps every version of a document."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["emulated"].insert_one({"_id": 1, "x": 1})
+        pdb["emulated"].update_one({"_id": 1}, {"$set": {"x": 2}})
+        history = pdb.doc_history("emulated", {"_id": 1}).history[0]
+        self.assertTrue([v.document["x"] for v in history.versions] == [1, 2])
+        pdb.set_version(history.versions[0].minVersion)
+        self.assertTrue(pdb["emulated"].find_one({"_id": 1})["x"] == 1)
+
+
+    def test_delete_in_bulk_load_keeps_history(self):
+        """Deleting a document updated in the same bulk-loaded version keeps its earlier versions."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["bulk"].insert_one({"_id": 1, "x": 1})
+        pdb.bulk_load_start()
+        pdb["bulk"].update_one({"_id": 1}, {"$set": {"x": 2}})
+        pdb["bulk"].delete_one({"_id": 1})
+        pdb.bulk_load_stop()
+        history = pdb.doc_history("bulk", {"_id": 1}).history
+        self.assertTrue([v.document["x"] for v in history[0].versions] == [1])
+        self.assertTrue(pdb["bulk"].find_one({"_id": 1}) is None)
+
+
+    def test_chunked_compaction(self):
+        """A compaction run in chunks deletes as many versions as compacting the whole range at once."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        for i in range(50):
+            pdb["compacted"].insert_one({"_id": i})
+        pdb.submit_proof(pdb.get_version().version)
+        plan = plan_compaction(pdb, 1, 40, max_versions=8)
+        progress = run_compaction(pdb, plan, pause_ratio=0)
+        self.assertTrue(len(plan.chunks) == 5 and progress.nVersionsDeleted == 40 and progress.done)
+
+
+    def test_compaction_plan_anchor_and_start(self):
+        """Compaction is only planned above a proof of every collection, and without listing versions before the range."""
+        hours = (datetime.datetime(2020, 1, 1) + datetime.timedelta(hours=i) for i in itertools.count())
+        pdb = ProvenDB(ProvenDBEmulator(clock=lambda: next(hours)))
+        for i in range(60):
+            pdb["planned"].insert_one({"_id": i})
+        pdb["other"].insert_one({"_id": 0})
+        pdb.submit_proof(pdb.get_version().version, collections=["planned"])
+        with self.assertRaises(CompactProofError):
+            plan_compaction(pdb, 40, 50)
+        pdb.submit_proof(pdb.get_version().version)
+        plan = plan_compaction(pdb, 40, 50, max_versions=100)
+        first = pdb.list_versions(_start_date(pdb, 40), None, 1, 1)["versions"][0]
+        self.assertTrue([(c.startVersion, c.endVersion) for c in plan.chunks] == [(40, 50)] and first["version"] == 40)
+
+
+    def test_forget_pipeline(self):
+        """ForgetPipeline merges subjects into $in filters and skips chunks whose counts are unexpected."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["subjects"].insert_many([{"_id": i, "subject": i % 10} for i in range(30)])
+        pipeline = ForgetPipeline(pdb, chunk_size=5)
+        for subject in range(9):
+            pipeline.add("subjects", {"subject": subject}, expected=3)
+        pipeline.add("subjects", {"subject": 9}, expected=4)
+        summary = pipeline.run()
+        self.assertTrue(summary.nChunks == 2 and summary.uniqueDocuments == 15 and len(summary.failures) == 1)
+
+
+    def test_forget_pipeline_parallel(self):
+        """ForgetPipeline run with many chunks and workers forgets exactly the documents of its subjects."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["subjects"].insert_many([{"_id": i, "subject": i, "name": f"n{i}"} for i in range(400)])
+        pipeline = ForgetPipeline(pdb, chunk_size=1, workers=8)
+        for subject in range(0, 400, 2):
+            pipeline.add("subjects", {"subject": subject}, expected=1)
+        summary = pipeline.run()
+        forgotten = {document["_id"] for document in pdb["subjects"].find({}) if "name" not in document}
+        self.assertTrue(summary.nExecuted == 200 and not summary.failures)
+        self.assertTrue(forgotten == set(range(0, 400, 2)))
+
+    def test_find_tampered_documents(self):
+        """PyProven reports a document changed after its proof, matching proofs to documents by str(_id)."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        ids = [ObjectId() for _ in range(5)]
+        pdb["tamper"].insert_many([{"_id": _id, "x": 0} for _id in ids])
+        version = pdb.get_version().version
+        pdb.submit_proof(version)
+        expected = document_hashes_from_proofs(pdb.get_document_proof("tamper", {}, version).proofs)
+        pdb["tamper"].update_one({"_id": ids[2]}, {"$set": {"x": 1}})
+        tampered = list(find_tampered_documents(pdb["tamper"].find({}), expected, processes=1))
+        self.assertTrue(len(expected) == 5 and [t._id for t in tampered] == [ids[2]])
+
+
+    def test_hash_document_known_answer(self):
+        """A document hash is the SHA-256 of its BSON bytes without _provendb_metadata, wherever that field is."""
+        document = bytes.fromhex(
+            "2d000000075f6964005f2b6a3e9d1c4a0b8e7f6d5c10780001000000026e616d65000600000070726f6f660000"
+        )
+        with_metadata = bytes.fromhex(
+            "67000000075f6964005f2b6a3e9d1c4a0b8e7f6d5c10780001000000035f70726f76656e64625f6d657461646174610026000000"
+            "126d696e56657273696f6e0003000000000000000268617368000300000030300000026e616d65000600000070726f6f660000"
+        )
+        expected = "06f3a5e5d5f820c94e762714e36d04a95263a2682e421c9ab2d0f62c0165cbf0"
+        self.assertTrue(hash_document(document) == expected and hash_document(with_metadata) == expected)
+
+
+    def test_iter_versions_short_pages(self):
+        """iter_versions keeps paging when the server returns fewer versions than asked for, from a timezone-aware date."""
+
+        class CappedEmulator(ProvenDBEmulator):
+            def _list_versions(self, value, arguments):
+                return super()._list_versions(dict(value, limit=min(value.get("limit", 10), 3)), arguments)
+
+        hours = (datetime.datetime(2020, 1, 1) + datetime.timedelta(hours=i) for i in itertools.count())
+        pdb = ProvenDB(CappedEmulator(clock=lambda: next(hours)))
+        for i in range(10):
+            pdb["paged"].insert_one({"_id": i})
+        start = datetime.datetime(2020, 1, 1, 3, tzinfo=datetime.timezone(datetime.timedelta(hours=1)))
+        versions = [version["version"] for version in pdb.iter_versions(start, page_size=5)]
+        descending = [version["version"] for version in pdb.iter_versions(start, page_size=5, sort_direction=-1)]
+        self.assertTrue(versions == list(range(3, 12)) and descending == versions[::-1])
+
+
+    def test_iter_doc_history_version_spans(self):
+        """A document with many versions has its history fetched in several docHistory commands, each version once."""
+        metrics = InMemoryMetrics()
+        pdb = ProvenDB(ProvenDBEmulator(), metrics=metrics)
+        pdb["spans"].insert_one({"_id": 1, "x": 0})
+        for x in range(1, 20):
+            pdb["spans"].update_one({"_id": 1}, {"$set": {"x": x}})
+        streamed = [version.document["x"] for _, version in pdb.iter_doc_history("spans", {}, version_span=5)]
+        self.assertTrue(streamed == list(range(20)) and metrics.snapshot()["docHistory"]["latency"]["count"] > 3)
+        start = pdb.doc_history("spans", {"_id": 1}).history[0].versions[5].minVersion
+        ranged = [version.document["x"] for _, version in pdb.iter_doc_history("spans", {}, min_version=start, max_version=start + 3, version_span=2)]
+        self.assertTrue(ranged == [5, 6, 7, 8])
+
+
+    def test_diff_versions(self):
+        """diff_versions streams the documents inserted, updated and deleted between two versions."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["diffed"].insert_many([{"_id": i, "x": 0} for i in range(3)])
+        start = pdb.get_version().version
+        pdb["diffed"].update_one({"_id": 0}, {"$set": {"x": 1}})
+        pdb["diffed"].delete_one({"_id": 1})
+        pdb["diffed"].insert_one({"_id": 3, "x": 0})
+        changes = pdb.diff_versions("diffed", start, pdb.get_version().version)
+        self.assertTrue([(c._id, c.operationType) for c in changes] == [(0, "update"), (1, "delete"), (3, "insert")])
+
+
+    def test_diff_versions_metadata(self):
+        """diff_versions leaves the metadata setting of the session as it was, and projects the metadata it needs."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["diffed"].insert_one({"_id": 0, "x": 0, "y": 0})
+        start = pdb.get_version().version
+        pdb["diffed"].update_one({"_id": 0}, {"$set": {"x": 1}})
+        end = pdb.get_version().version
+        pdb.show_metadata()
+        changes = list(pdb.diff_versions("diffed", start, end, projection={"x": 1, "_provendb_metadata": 0}))
+        abandoned = pdb.diff_versions("diffed", start, end)
+        next(abandoned)
+        del abandoned
+        self.assertTrue([c.after["x"] for c in changes] == [1] and "y" not in changes[0].after)
+        self.assertTrue("_provendb_metadata" in pdb["diffed"].find_one({"_id": 0}))
+
+
+    def test_diff_versions_projection(self):
+        """diff_versions pairs versions by _id whatever the projection, leaving _id out of the documents when excluded."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["diffed"].insert_many([{"_id": i, "x": 0, "y": 0} for i in range(2)])
+        start = pdb.get_version().version
+        pdb["diffed"].update_one({"_id": 0}, {"$set": {"x": 1}})
+        end = pdb.get_version().version
+        for projection, fields in (
+            ({"_id": 0}, {"x", "y"}),
+            ({"y": 0}, {"_id", "x"}),
+            ({"_id": 0, "y": 0}, {"x"}),
+            ({"_id": 0, "x": 1}, {"x"}),
+        ):
+            changes = list(pdb.diff_versions("diffed", start, end, projection=projection))
+            self.assertTrue([(c._id, c.operationType, c.after["x"]) for c in changes] == [(0, "update", 1)])
+            self.assertTrue(set(changes[0].after) - {"_provendb_metadata"} == fields)
+
+
+    def test_find_at_version(self):
+        """find_at_version reads documents as they were at a version without changing the session version."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["pit"].insert_one({"_id": 1, "x": 1})
+        version = pdb.get_version().version
+        pdb["pit"].update_one({"_id": 1}, {"$set": {"x": 2}})
+        documents = list(pdb.find_at_version("pit", {"_id": 1}, version))
+        self.assertTrue(documents == [{"_id": 1, "x": 1}] and pdb.get_version().status == "current")
+
+
+    def test_bulk_ingest_failure(self):
+        """A failed or interrupted bulk ingest kills the bulk load, and raises its own error even when the kill fails."""
+
+        def documents(error):
+            yield {"_id": 1}
+            raise error
+
+        class StuckEmulator(ProvenDBEmulator):
+            def command(self, command, value=1, **kwargs):
+                if isinstance(command, Mapping) and command.get("bulkLoad") == "kill":
+                    raise NotPrimaryError("not primary")
+                return super().command(command, value, **kwargs)
+
+        pdb = ProvenDB(ProvenDBEmulator())
+        with self.assertRaises(KeyboardInterrupt):
+            pdb.bulk_ingest("ingested", documents(KeyboardInterrupt()))
+        self.assertTrue(pdb.bulk_load_status().status == "off")
+        pdb = ProvenDB(StuckEmulator())
+        with self.assertLogs("pyproven.database", "ERROR"), self.assertRaises(ValueError):
+            pdb.bulk_ingest("ingested", documents(ValueError("bad document")))
+
+
+    def test_async_provendb(self):
+        """AsyncProvenDB awaits ProvenDB commands, here on the emulator behind a trivial asynchronous facade."""
+
+        class AsyncEmulator:
+            def __init__(self, emulator):
+                self.emulator = emulator
+
+            def __getitem__(self, name):
+                return self.emulator[name]
+
+            async def command(self, *args, **kwargs):
+                return self.emulator.command(*args, **kwargs)
+
+        async def run(pdb):
+            pdb["async"].insert_one({"_id": 1, "x": 1})
+            version = (await pdb.get_version()).version
+            pdb["async"].update_one({"_id": 1}, {"$set": {"x": 2}})
+            history, proof = await asyncio.gather(
+                pdb.doc_history("async", {"_id": 1}), pdb.submit_proof(version)
+            )
+            return history, proof, list(pdb.find_at_version("async", {"_id": 1}, version))
+
+        history, proof, documents = asyncio.run(run(AsyncProvenDB(AsyncEmulator(ProvenDBEmulator()))))
+        self.assertTrue([v.document["x"] for v in history.history[0].versions] == [1, 2])
+        self.assertTrue(isinstance(proof, SubmitProofResponse) and documents == [{"_id": 1, "x": 1}])
+
+
+    def test_lazy_responses(self):
+        """A lazy client leaves nested documents as raw BSON, decoded when accessed, behind the usual response classes."""
+        pdb = ProvenDB(ProvenDBEmulator(), lazy=True)
+        pdb["lazy"].insert_one({"_id": 1, "nested": {"a": [1, 2]}})
+        version = pdb.get_version().version
+        pdb.submit_proof(version)
+        history = pdb.doc_history("lazy", {"_id": 1}).history[0]
+        document = history.versions[0].document
+        self.assertTrue(isinstance(document, RawBSONDocument) and history._id == 1 and history.versions[0].minVersion == version)
+        self.assertTrue(isinstance(document["nested"], RawBSONDocument) and document["nested"]["a"] == [1, 2])
+        compact = pdb.doc_history("lazy", {"_id": 1}, compact=True).history[0].versions[0]
+        self.assertTrue(isinstance(compact.document, RawBSONDocument) and compact.document["nested"]["a"] == [1, 2])
+        proof = pdb.get_document_proof("lazy", {"_id": 1}, version).proofs[0]
+        self.assertTrue(isinstance(proof.proof, RawBSONDocument) and proof.proof["hash"] == proof.documentHash)
+
+
+    def test_metrics(self):
+        """Commands and the insert batches of bulk_ingest are reported to the metrics sink, failed commands with their error class."""
+        metrics = InMemoryMetrics()
+        pdb = ProvenDB(ProvenDBEmulator(), metrics=metrics)
+        pdb.bulk_ingest("metered", ({"_id": i} for i in range(10)), batch_size=5)
+        with self.assertRaises(Exception):
+            pdb.bulk_load_stop()
+        snapshot = metrics.snapshot()
+        self.assertTrue(snapshot["insert"]["latency"]["count"] == 2 and snapshot["insert"]["request_bytes"] == 140)
+        self.assertTrue(snapshot["bulkLoad"]["latency"]["count"] == 3 and sum(snapshot["bulkLoad"]["errors"].values()) == 1)
+
+
+    def test_default_retry(self):
+        """By default reads are retried after a transient error, and writes and setVersion run once."""
+
+        class FailoverEmulator(ProvenDBEmulator):
+            def command(self, command, value=1, **kwargs):
+                name = command if isinstance(command, str) else next(iter(command))
+                calls.append(name)
+                if calls.count(name) == 1:
+                    raise NotPrimaryError("not primary")
+                return super().command(command, value, **kwargs)
+
+        calls = []
+        pdb = ProvenDB(FailoverEmulator())
+        self.assertTrue(pdb.get_version().status == "current" and calls.count("getVersion") == 2)
+        with self.assertRaises(NotPrimaryError):
+            pdb.set_version("current")
+        with self.assertRaises(NotPrimaryError):
+            pdb.bulk_load_start()
+        self.assertTrue(calls.count("setVersion") == 1 and calls.count("bulkLoad") == 1)
+
+
+    def test_watcher_poll_error(self):
+        """A proof watcher fails the futures of a batch whose status query raises an unexpected error, and keeps running."""
+
+        class BrokenWatcher(ProofWatcher):
+            def _poll(self, batch):
+                if any(proof.proof_id == "broken" for proof in batch):
+                    raise ValueError("unreadable status")
+                return super()._poll(batch)
+
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["watched"].insert_one({"_id": 1})
+        with BrokenWatcher(pdb, min_interval=0.05) as watcher:
+            broken = watcher.watch("broken")
+            self.assertTrue(isinstance(broken.exception(timeout=5), ValueError))
+            proof = watcher.watch(pdb.submit_proof(pdb.get_version().version).proofId).result(timeout=5)
+        self.assertTrue(proof["status"] == "valid")
+
+
+    def test_command_template_encoding(self):
+        """Commands built from templates encode to the same message as the equivalent SON command."""
+        template = get_proof_template("json", True).command("proof")
+        plain = SON([("getProof", "proof"), ("format", "json"), ("listCollections", True)])
+        for command in (template, plain):
+            command["lsid"] = {"id": b"session"}
+        encoded = [fix_op_msg(0, command, "db", None, False, False, DEFAULT_CODEC_OPTIONS) for command in (template, plain)]
+        self.assertTrue(encoded[0][1][16:] == encoded[1][1][16:])
+        self.assertTrue(encoded[0][2] == encoded[0][3] == len(BSON.encode(SON(plain, **{"$db": "db"}))))
+        checked = fix_op_msg(0, template, "db", None, False, True, DEFAULT_CODEC_OPTIONS)
+        self.assertTrue(checked[1][16:] == encoded[1][1][16:] and checked[3] == 0)
+
+
+    def test_element_cache_types(self):
+        """Cached session fields are only reused for values of the same types, encoded with the same options."""
+        cache = ElementCache()
+        for value in ({"n": 1}, {"n": True}, {"n": 1.0}, SON([("n", 1)])):
+            self.assertTrue(cache.encode("lsid", value, DEFAULT_CODEC_OPTIONS) == encode_element("lsid", value))
+        self.assertTrue(cache.names == {"lsid", "$clusterTime"})
+
+
+    def test_provendb_hack_scoped_to_client(self):
+        """The ProvenDB encoder is only used for the databases of the client it was installed for."""
+        hacked, other = MongoClient(connect=False), MongoClient(connect=False)
+        provendb_hack.install(hacked, "db")
+        try:
+            encoded = {}
+            for name, client in (("hacked", hacked), ("other", other)):
+                token = provendb_hack._current_client.set(id(client))
+                try:
+                    encoded[name] = message._op_msg(0, {"ping": 1}, "db", ReadPreference.SECONDARY_PREFERRED, False, False, DEFAULT_CODEC_OPTIONS)[1]
+                finally:
+                    provendb_hack._current_client.reset(token)
+        finally:
+            provendb_hack.uninstall(hacked)
+        self.assertTrue(b"$readPreference" not in encoded["hacked"] and b"$readPreference" in encoded["other"])
+        self.assertTrue(message._op_msg is not provendb_hack._scoped_op_msg)
+
+
+    def test_provendb_hack_unsupported_pymongo(self):
+        """The ProvenDB encoder is not installed, with a warning, on pymongo releases it was not written for."""
+        client = MongoClient(connect=False)
+        version_tuple = pymongo.version_tuple
+        pymongo.version_tuple = (4, 0, 0)
+        try:
+            with self.assertWarns(RuntimeWarning):
+                provendb_hack.install(client, "db")
+        finally:
+            pymongo.version_tuple = version_tuple
+        self.assertTrue(message._op_msg is not provendb_hack._scoped_op_msg and id(client) not in provendb_hack._databases)
+
+
+    @unittest.skipIf(numpy is None, "numpy is not installed")
+    def test_hash_columns_round_trip(self):
+        """Hash columns keep every digest byte, trailing NULs included, as S32 through numpy and .npz files loaded without pickle."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["hashed"].insert_many([{"_id": i} for i in range(3)])
+        version = pdb.get_version().version
+        pdb.submit_proof(version)
+        columns = pdb.get_document_proof_columns("hashed", {}, version)
+        columns["documentHash"] += [bytes(31) + b"\x01", b"\x01" + bytes(31), b""]
+        columns["documentId"] += [None, None, None]
+        expected = [digest.ljust(32, b"\x00") for digest in columns["documentHash"]]
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "proofs.npz")
+            save_npz(columns, path)
+            with numpy.load(path) as loaded:
+                hashes, ids = loaded["documentHash"], loaded["documentId"]
+        self.assertTrue(to_numpy(columns)["documentHash"].dtype == numpy.dtype("S32"))
+        self.assertTrue([digest.tobytes() for digest in hashes.view("V32")] == expected and list(ids[-3:]) == ["", "", ""])
+        with self.assertRaises(ValueError):
+            document_proof_columns({"proofs": [{"documentHash": "not a digest"}]})
+
+
+    def test_verify_receipt_offline(self):
+        """Receipts are verified offline against a known anchor root, looked up once and then cached."""
+        pdb = ProvenDB(ProvenDBEmulator())
+        pdb["receipts"].insert_one({"_id": 1})
+        submitted = pdb.submit_proof(pdb.get_version().version)
+        proof = pdb.get_version_proof(submitted.proofId).proofs[0]
+        # the emulator anchors sha-256(sha-256("anchor" + proofId) + versionHash) on "eth".
+        left = hashlib.sha256(("anchor" + submitted.proofId).encode()).digest()
+        root = hashlib.sha256(left + bytes.fromhex(submitted.hash)).hexdigest()
+        lookups = []
+
+        def lookup(anchor_type, anchor_id):
+            lookups.append((anchor_type, anchor_id))
+            return root if (anchor_type, anchor_id) == ("eth", submitted.proofId) else None
+
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "roots.json")
+            roots = AnchorRootCache(lookup, path)
+            results = verify_receipts([proof] * 3, roots, [submitted.hash] * 3, processes=1)
+            self.assertTrue(all(result.valid for result in results) and lookups == [("eth", submitted.proofId)])
+            saved = AnchorRootCache(path=path)
+            self.assertTrue(verify_receipt(proof, saved, submitted.hash).valid)
+        tampered = verify_receipt(proof, {("eth", submitted.proofId): "00" * 32})
+        self.assertTrue(not tampered.valid and tampered.anchors[0].verified is False)
+
+
+    def test_lazy_import(self):
+        """Importing pyproven does not load pymongo until ProvenDB is used, nor ProvenDB the modules only some of its methods need."""
+        probe = "import sys, pyproven; print('pymongo' in sys.modules)"
+        output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True).stdout
+        self.assertTrue(output.strip() == "False")
+        modules = ["pyproven.hashing", "pyproven.columnar", "pyproven.compact", "pyproven.templates"]
+        probe = f"import sys; from pyproven import ProvenDB; print([m for m in {modules!r} if m in sys.modules])"
+        output = subprocess.run([sys.executable, "-c", probe], capture_output=True, text=True).stdout
+        self.assertTrue(output.strip() == "[]")
+
+
+if __name__ == "__main__":
+    unittest.main()